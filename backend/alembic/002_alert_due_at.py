@@ -0,0 +1,44 @@
+"""knowledge_items.alert_due_at
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "knowledge_items",
+        sa.Column("alert_due_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("idx_alert_due_at", "knowledge_items", ["alert_due_at"])
+
+    # Backfill: t = (1/k) × ln((K₀ - M) / (60 - M)) days after the last review
+    # (or creation). K₀ ≤ 60 is due immediately; k ≤ 0 never is (stays NULL).
+    op.execute(
+        """
+        UPDATE knowledge_items
+        SET alert_due_at = CASE
+            WHEN k0_initial_strength <= 60
+                THEN COALESCE(last_reviewed, created_at)
+            WHEN decay_rate > 0 AND memory_floor < 60
+                THEN COALESCE(last_reviewed, created_at) + make_interval(
+                    secs => ln((k0_initial_strength - memory_floor) / (60 - memory_floor))
+                            / decay_rate * 86400
+                )
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_alert_due_at", table_name="knowledge_items")
+    op.drop_column("knowledge_items", "alert_due_at")
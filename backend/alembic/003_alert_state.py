@@ -0,0 +1,30 @@
+"""knowledge_items alert suppression state
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "knowledge_items",
+        sa.Column("last_alerted_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "knowledge_items",
+        sa.Column("alerted_band", sa.Integer(), server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("knowledge_items", "alerted_band")
+    op.drop_column("knowledge_items", "last_alerted_at")
@@ -0,0 +1,32 @@
+"""retention_daily rollup table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # (user_id, day) primary key doubles as the index for timeline range reads
+    op.create_table(
+        "retention_daily",
+        sa.Column("user_id",        sa.Integer(), primary_key=True),
+        sa.Column("day",            sa.Date(),    primary_key=True),
+        sa.Column("item_count",     sa.Integer(), nullable=False),
+        sa.Column("avg_retention",  sa.Float(),   nullable=False),
+        sa.Column("items_below_60", sa.Integer(), nullable=False),
+        sa.Column("items_below_40", sa.Integer(), nullable=False),
+        sa.Column("avg_half_life",  sa.Float(),   nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("retention_daily")
@@ -0,0 +1,29 @@
+"""indexes for keyset-paginated item listing
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 14:00:00.000000
+"""
+
+from alembic import op
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_user_id",         "knowledge_items", ["user_id", "id"])
+    op.create_index("idx_user_created_at", "knowledge_items", ["user_id", "created_at", "id"])
+    # text_pattern_ops so `topic LIKE 'prefix%'` can use the index under any collation
+    op.create_index(
+        "idx_user_topic", "knowledge_items", ["user_id", "topic"],
+        postgresql_ops={"topic": "text_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_user_topic",      table_name="knowledge_items")
+    op.drop_index("idx_user_created_at", table_name="knowledge_items")
+    op.drop_index("idx_user_id",         table_name="knowledge_items")
@@ -0,0 +1,40 @@
+"""append-only review_events log and the deferred-aggregate queue
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 16:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "review_events",
+        sa.Column("id",      sa.BigInteger(), primary_key=True),
+        sa.Column("item_id", sa.Integer(),    nullable=False),
+        sa.Column("user_id", sa.Integer(),    nullable=False),
+        sa.Column("ts",      sa.DateTime(timezone=True), nullable=False),
+        sa.Column("kind",    sa.String(8),    nullable=False),
+    )
+    # Insert order follows ts, so BRIN summarises it in a few pages
+    op.create_index("idx_review_events_ts", "review_events", ["ts"], postgresql_using="brin")
+    op.create_index("idx_review_events_item_ts", "review_events", ["item_id", "ts"])
+
+    op.create_table(
+        "review_event_queue",
+        sa.Column("event_id", sa.BigInteger(), primary_key=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("review_event_queue")
+    op.drop_index("idx_review_events_item_ts", table_name="review_events")
+    op.drop_index("idx_review_events_ts",      table_name="review_events")
+    op.drop_table("review_events")
@@ -0,0 +1,32 @@
+"""idempotency_keys — database fallback for Idempotency-Key responses
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 18:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("key",          sa.String(),      primary_key=True),
+        sa.Column("fingerprint",  sa.String(64),    nullable=False),
+        sa.Column("status_code",  sa.Integer(),     nullable=True),
+        sa.Column("content_type", sa.String(),      nullable=True),
+        sa.Column("body",         sa.LargeBinary(), nullable=True),
+        sa.Column("expires_at",   sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_idempotency_keys_expires_at", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
@@ -0,0 +1,23 @@
+"""extend idx_alert_due_at with id for the keyset-paginated due scan
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 09:00:00.000000
+"""
+
+from alembic import op
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_alert_due_at_id", "knowledge_items", ["alert_due_at", "id"])
+    op.drop_index("idx_alert_due_at", table_name="knowledge_items")
+
+
+def downgrade() -> None:
+    op.create_index("idx_alert_due_at", "knowledge_items", ["alert_due_at"])
+    op.drop_index("idx_alert_due_at_id", table_name="knowledge_items")
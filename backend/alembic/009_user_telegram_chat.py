@@ -0,0 +1,22 @@
+"""users.telegram_chat_id — route decay alerts to each user's own chat
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("telegram_chat_id", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "telegram_chat_id")
@@ -0,0 +1,31 @@
+"""case-insensitive topic prefix index
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GET /items?topic= matches lower(topic) LIKE lower(prefix) || '%';
+    # text_pattern_ops so the LIKE can use the index under any collation
+    op.create_index(
+        "idx_user_topic_lower", "knowledge_items", ["user_id", sa.text("lower(topic) text_pattern_ops")],
+    )
+    op.drop_index("idx_user_topic", table_name="knowledge_items")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "idx_user_topic", "knowledge_items", ["user_id", "topic"],
+        postgresql_ops={"topic": "text_pattern_ops"},
+    )
+    op.drop_index("idx_user_topic_lower", table_name="knowledge_items")
@@ -0,0 +1,27 @@
+"""indexes for GET /items?sort=topic and sort=decay_rate
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 11:00:00.000000
+"""
+
+from alembic import op
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Default collation (not text_pattern_ops), so it can serve ORDER BY topic, id
+    op.create_index("idx_user_topic_id", "knowledge_items", ["user_id", "topic", "id"])
+    # id as the tie-breaker, so ORDER BY decay_rate, id needs no sort step
+    op.create_index("idx_user_decay_rate_id", "knowledge_items", ["user_id", "decay_rate", "id"])
+    op.drop_index("idx_user_decay_rate", table_name="knowledge_items")
+
+
+def downgrade() -> None:
+    op.create_index("idx_user_decay_rate", "knowledge_items", ["user_id", "decay_rate"])
+    op.drop_index("idx_user_decay_rate_id", table_name="knowledge_items")
+    op.drop_index("idx_user_topic_id", table_name="knowledge_items")
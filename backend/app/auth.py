@@ -66,14 +66,18 @@ async def get_current_user(
 
 # ── Optional: unauthenticated default user (dev convenience) ──────────────────
 
-async def get_current_user_id(
-    creds: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
-) -> int:
-    """Returns user_id from JWT, or 1 if no token (dev mode)."""
-    if creds is None:
+def user_id_from_token(token: Optional[str]) -> int:
+    """user_id from a bearer token, or 1 if missing/invalid (dev mode)."""
+    if token is None:
         return 1
     try:
-        token_data = decode_token(creds.credentials)
-        return token_data.user_id
+        return decode_token(token).user_id
     except HTTPException:
         return 1
+
+
+async def get_current_user_id(
+    creds: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+) -> int:
+    """Returns user_id from JWT, or 1 if no token (dev mode)."""
+    return user_id_from_token(creds.credentials if creds else None)
@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,7 +8,75 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost"
     SECRET_KEY: str = "supersecretkey_change_in_production"
     TELEGRAM_BOT_TOKEN: str = ""
-    TELEGRAM_CHAT_ID: str = ""
+    TELEGRAM_CHAT_ID: str = ""           # fallback for users without users.telegram_chat_id
+
+    # Items API
+    BULK_MAX_ITEMS: int = 10_000         # rows accepted by one POST /items/bulk
+    REVIEW_BATCH_MAX: int = 1000         # reviews accepted by one POST /items/reviews/batch
+    SETTINGS_CHUNK_SIZE: int = 5000      # items per transaction in PUT /users/me/settings?chunked=true
+
+    # Idempotency-Key (see app/idempotency.py)
+    IDEMPOTENCY_TTL_S: int = 86_400          # how long a stored response is replayed
+    IDEMPOTENCY_LOCK_TTL_S: int = 60         # reservation lifetime while the first attempt runs
+    IDEMPOTENCY_MAX_KEY_LEN: int = 255
+    IDEMPOTENCY_REDIS_RETRY_S: float = 5.0   # use the database this long after a Redis error
+
+    # Review log (see app/review_log.py): "inline" folds each review into its
+    # item immediately; "deferred" only appends and lets the flusher fold
+    REVIEW_AGGREGATES: str = "inline"
+    REVIEW_FLUSH_INTERVAL_S: float = 5.0
+    REVIEW_FLUSH_BATCH: int = 5000       # queued events claimed per flush transaction
+
+    # Scheduler
+    SCHEDULER_CHUNK_SIZE: int = 5000     # rows per keyset page in the decay scan
+    SCHEDULER_TRACE_MEMORY: bool = False # log tracemalloc peak per scan chunk (slows the whole process)
+    ROLLUP_HOUR_UTC: int = 0             # nightly retention_daily rollup (app/rollup.py)
+    ROLLUP_MINUTE: int = 10
+    ROLLUP_BACKFILL_DAYS: int = 730      # oldest day a first run reconstructs
+    TIMELINE_MAX_DAYS: int = 730         # longest /insights/timeline range
+
+    # decay_alerts stream
+    ALERT_BATCH_SIZE: int = 500              # XADDs per Redis pipeline round trip
+    ALERT_STREAM_MAXLEN: int = 100_000       # approximate MAXLEN trim (0 = off)
+    ALERT_STREAM_MAX_AGE_HOURS: int = 0      # MINID trim by entry age; overrides MAXLEN when > 0
+
+    # Alert suppression — an item is re-alerted only on entering a deeper
+    # band (60 % → escalation thresholds → near floor) or after the cool-down
+    ALERT_COOLDOWN_HOURS: float = 24.0
+    ALERT_ESCALATION_BANDS: List[float] = [40.0]   # retention % thresholds below ALERT_THRESHOLD
+    ALERT_FLOOR_MARGIN: float = 5.0                # "near floor" = within this many points of M
+
+    # Worker
+    WORKER_CONCURRENCY: int = 32            # alerts handled in parallel per process
+    WORKER_CONSUMER_NAME: str = ""          # default: <hostname>-<pid>
+    WORKER_READ_COUNT: int = 100            # entries per XREADGROUP
+    WORKER_CLAIM_IDLE_MS: int = 60_000      # reclaim pending entries idle this long (or longer, see claim_idle_ms)
+    WORKER_CLAIM_INTERVAL_S: float = 30.0   # how often to run XAUTOCLAIM
+    WORKER_HANDLER_TIMEOUT_S: float = 30.0  # a send slower than this counts as failed
+    WORKER_MAX_ATTEMPTS: int = 5            # then the alert moves to decay_alerts:dead
+    RETRY_BASE_DELAY_S: float = 30.0        # backoff: base × 2^(attempt-1), jittered
+    RETRY_MAX_DELAY_S: float = 3600.0
+    RETRY_POLL_INTERVAL_S: float = 1.0      # how often due retries are moved back
+
+    # Alert delivery: "item" = one message per alert, "digest" = one summary
+    # per user every DIGEST_WINDOW_S listing the DIGEST_TOP_N weakest items
+    ALERT_DELIVERY_MODE: str = "item"
+    DIGEST_WINDOW_S: float = 300.0
+    DIGEST_TOP_N: int = 10
+
+    # Notifier (see app/notifier.py)
+    NOTIFIER_TRANSPORT: str = "telegram"    # telegram | http | memory
+    NOTIFIER_HTTP_URL: str = "http://localhost:8081/send"
+    NOTIFY_POOL_SIZE: int = 32              # pooled HTTP connections
+    NOTIFY_GLOBAL_RATE: float = 25.0        # messages/s across all chats (Telegram: ~30)
+    NOTIFY_PER_CHAT_RATE: float = 1.0       # messages/s per chat       (Telegram: ~1)
+    NOTIFY_MAX_RETRIES: int = 3             # retries after a 429 / Retry-After
+
+    # Insight cache (see app/insight_cache.py)
+    INSIGHT_CACHE_BUCKET_S: float = 300.0   # time bucket in the key; also the Redis TTL
+    INSIGHT_CACHE_LOCAL_SIZE: int = 1024    # in-process LRU entries
+    INSIGHT_CACHE_RETRY_S: float = 5.0      # bypass Redis this long after an error
+    INSIGHT_CACHE_GEN_TTL_S: float = 1.0    # reuse a user's generation this long without a GET
 
     class Config:
         env_file = ".env"
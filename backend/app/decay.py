@@ -6,15 +6,24 @@ Equations:
   k   = k₀ × (D / (I+S+B+A)) × exp(-(α·Rf + β·U))
   K(t) = M + (K₀ - M) × exp(-k·t)
   t½  = ln(2) / k
+
+Every scalar function has a column-wise twin (``*_batch``) operating on NumPy
+arrays, so routes and jobs can evaluate thousands of items in one call.
 """
 
 import math
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
 
 # ── Constants ──────────────────────────────────────────────────────────────────
 K0_BASE = 0.7   # Base forgetting rate constant
 ALPHA   = 1.2   # Revision-frequency weight
 BETA    = 2.0   # Usage-frequency weight  (2× more effective than passive review)
 
+ALERT_THRESHOLD = 60.0   # Retention % below which an item is alerted on
+
 
 # ── Core functions ─────────────────────────────────────────────────────────────
 
@@ -116,6 +125,28 @@ def compute_time_to_forget(
     return (1.0 / decay_rate) * math.log(numerator / denom)
 
 
+def compute_alert_due_at(
+    k0: float,
+    decay_rate: float,
+    memory_floor: float,
+    anchor: datetime,
+    threshold: float = ALERT_THRESHOLD,
+) -> Optional[datetime]:
+    """
+    Moment K(t) first drops below `threshold`, counting from `anchor`
+    (last review, or creation if never reviewed).
+
+    Returns `anchor` itself when K₀ already starts at or below the threshold,
+    and None when retention never gets there (k ≤ 0 or floor ≥ threshold).
+    """
+    if k0 <= threshold:
+        return anchor
+    days = compute_time_to_forget(k0, decay_rate, memory_floor, threshold)
+    if math.isinf(days):
+        return None
+    return anchor + timedelta(days=days)
+
+
 def update_ema(current: float, new_event: float = 1.0, alpha: float = 0.1) -> float:
     """
     Exponential moving average update for Rf and U.
@@ -124,3 +155,197 @@ def update_ema(current: float, new_event: float = 1.0, alpha: float = 0.1) -> fl
     Call with new_event=1 when review/usage occurs.
     """
     return (1.0 - alpha) * current + alpha * new_event
+
+
+# ── Batch (column-wise) functions ──────────────────────────────────────────────
+#
+# Same equations and guards as the scalar versions above, evaluated over whole
+# columns at once. Inputs may be NumPy arrays, ``array('d')`` buffers, plain
+# sequences or scalars (broadcast against the other arguments).
+
+class DecayBatch(NamedTuple):
+    """Computed decay fields for a batch of items, one array per field."""
+    days_elapsed:   np.ndarray
+    retention:      np.ndarray
+    half_life:      np.ndarray
+    time_to_forget: np.ndarray
+
+
+def compute_k0_batch(attention, interest, base_memory) -> np.ndarray:
+    """Column-wise :func:`compute_k0`."""
+    return 100.0 * (
+        0.4 * np.asarray(attention, dtype=np.float64)
+        + 0.3 * np.asarray(interest, dtype=np.float64)
+        + 0.3 * np.asarray(base_memory, dtype=np.float64)
+    )
+
+
+def compute_decay_rate_batch(
+    difficulty,
+    interest,
+    sleep_quality,
+    base_memory,
+    attention,
+    revision_frequency,
+    usage_frequency,
+) -> np.ndarray:
+    """Column-wise :func:`compute_decay_rate`."""
+    numerator   = np.asarray(difficulty, dtype=np.float64)
+    denominator = (
+        np.asarray(interest, dtype=np.float64)
+        + np.asarray(sleep_quality, dtype=np.float64)
+        + np.asarray(base_memory, dtype=np.float64)
+        + np.asarray(attention, dtype=np.float64)
+    )
+    denominator = np.where(denominator < 0.1, 0.1, denominator)
+
+    suppression = np.exp(
+        -(ALPHA * np.asarray(revision_frequency, dtype=np.float64)
+          + BETA * np.asarray(usage_frequency, dtype=np.float64))
+    )
+    return K0_BASE * (numerator / denominator) * suppression
+
+
+def compute_retention_batch(k0, decay_rate, days_elapsed, memory_floor) -> np.ndarray:
+    """Column-wise :func:`compute_retention`."""
+    k0           = np.asarray(k0, dtype=np.float64)
+    memory_floor = np.asarray(memory_floor, dtype=np.float64)
+    exponent     = -np.asarray(decay_rate, dtype=np.float64) * np.asarray(days_elapsed, dtype=np.float64)
+    return memory_floor + (k0 - memory_floor) * np.exp(exponent)
+
+
+def compute_half_life_batch(decay_rate) -> np.ndarray:
+    """Column-wise :func:`compute_half_life` (k ≤ 0 → inf)."""
+    k = np.asarray(decay_rate, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(k > 0, math.log(2) / k, np.inf)
+
+
+def compute_time_to_forget_batch(k0, decay_rate, memory_floor, threshold=10.0) -> np.ndarray:
+    """
+    Column-wise :func:`compute_time_to_forget`.
+
+    k ≤ 0, threshold ≤ floor or K₀ ≤ floor → inf, exactly as the scalar version.
+    """
+    k         = np.asarray(decay_rate, dtype=np.float64)
+    floor     = np.asarray(memory_floor, dtype=np.float64)
+    numerator = np.asarray(k0, dtype=np.float64) - floor
+    denom     = np.asarray(threshold, dtype=np.float64) - floor
+
+    valid = (k > 0) & (denom > 0) & (numerator > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (1.0 / k) * np.log(numerator / denom)
+    return np.where(valid, t, np.inf)
+
+
+def compute_alert_due_at_batch(
+    k0,
+    decay_rate,
+    memory_floor,
+    anchor: datetime,
+    threshold: float = ALERT_THRESHOLD,
+) -> List[Optional[datetime]]:
+    """Column-wise :func:`compute_alert_due_at` for items sharing one `anchor`."""
+    if anchor.tzinfo is None:
+        anchor = anchor.replace(tzinfo=timezone.utc)
+    k0   = np.asarray(k0, dtype=np.float64)
+    days = compute_time_to_forget_batch(k0, decay_rate, memory_floor, threshold)
+    days = np.where(k0 <= threshold, 0.0, days)
+    return [None if math.isinf(d) else anchor + timedelta(days=d) for d in days.tolist()]
+
+
+def epoch_seconds(timestamps: Sequence[datetime]) -> np.ndarray:
+    """POSIX timestamps as a float array; naive datetimes are treated as UTC (SQLite drops tzinfo)."""
+    return np.fromiter(
+        (
+            (ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)).timestamp()
+            for ts in timestamps
+        ),
+        dtype=np.float64,
+        count=len(timestamps),
+    )
+
+
+def days_since_batch(timestamps: Sequence[datetime], now: Optional[datetime] = None) -> np.ndarray:
+    """
+    Days elapsed since each timestamp, clamped at 0.
+
+    Naive datetimes are treated as UTC (SQLite drops tzinfo).
+    """
+    now = now or datetime.now(timezone.utc)
+    return np.maximum((now.timestamp() - epoch_seconds(timestamps)) / 86400, 0)
+
+
+def iter_retention_grid(
+    k0,
+    decay_rate,
+    memory_floor,
+    anchor_ts,
+    start_ts: float,
+    n_days: int,
+    max_cells: int = 1_000_000,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Retention of every item at `start_ts`, `start_ts` + 1 day, … (`n_days`
+    points), counting whole days since each item's `anchor_ts`.
+
+    Whole-day offsets are shared by every point, so each item's elapsed days
+    on day d is just `floor((start_ts − anchor) / 86400) + d` — no per-day
+    datetime work. Yields `(first_day_offset, grid)` with grid shaped
+    (days × items), at most `max_cells` cells at a time.
+    """
+    k0     = np.asarray(k0, dtype=np.float64)
+    k      = np.asarray(decay_rate, dtype=np.float64)
+    floor  = np.asarray(memory_floor, dtype=np.float64)
+    base   = np.floor((start_ts - np.asarray(anchor_ts, dtype=np.float64)) / 86400)
+
+    step = max(1, max_cells // max(base.size, 1))
+    for lo in range(0, n_days, step):
+        offsets = np.arange(lo, min(lo + step, n_days), dtype=np.float64)[:, None]
+        yield lo, compute_retention_batch(k0, k, np.maximum(base + offsets, 0), floor)
+
+
+def retention_series_batch(
+    k0,
+    decay_rate,
+    memory_floor,
+    anchor_ts,
+    start_ts: float,
+    n_days: int,
+    max_cells: int = 1_000_000,
+) -> np.ndarray:
+    """Mean over items of :func:`iter_retention_grid`, one value per day."""
+    series = np.empty(n_days, dtype=np.float64)
+    for lo, grid in iter_retention_grid(k0, decay_rate, memory_floor, anchor_ts, start_ts, n_days, max_cells):
+        series[lo:lo + len(grid)] = grid.mean(axis=1)
+    return series
+
+
+def column(rows: Sequence, name: str) -> np.ndarray:
+    """Pull one float attribute out of a sequence of rows as a NumPy array."""
+    return np.fromiter((getattr(r, name) for r in rows), dtype=np.float64, count=len(rows))
+
+
+def compute_item_batch(
+    items: Sequence,
+    now: Optional[datetime] = None,
+    threshold: float = 10.0,
+) -> DecayBatch:
+    """
+    Evaluate retention, half-life and time-to-forget for many items at once.
+
+    ``items`` may be ORM instances or Core rows; they only need the
+    ``k0_initial_strength``, ``decay_rate``, ``memory_floor``,
+    ``last_reviewed`` and ``created_at`` attributes.
+    """
+    k0     = column(items, "k0_initial_strength")
+    k      = column(items, "decay_rate")
+    floor  = column(items, "memory_floor")
+    days   = days_since_batch([i.last_reviewed or i.created_at for i in items], now)
+
+    return DecayBatch(
+        days_elapsed   = days,
+        retention      = compute_retention_batch(k0, k, days, floor),
+        half_life      = compute_half_life_batch(k),
+        time_to_forget = compute_time_to_forget_batch(k0, k, floor, threshold),
+    )
@@ -0,0 +1,156 @@
+"""
+Decay equations as SQL expressions, so filters and updates run in the database.
+
+Mirrors the scalar functions in decay.py:
+
+    retention:     M + (K₀ - M) · exp(-k · t)      t = days since last review / creation
+    EMA:           (1 - α) · x + α
+    decay rate:    k₀ · D / max(I+S+B+A, 0.1) · exp(-(α·Rf + β·U))
+    alert due at:  anchor + ln((K₀ - M) / (60 - M)) / k days
+
+Date arithmetic is dialect-specific — `EXTRACT(EPOCH FROM …)` and interval
+multiplication on Postgres, `julianday()` / `datetime()` on SQLite (the test
+backend). SQLite builds without the math extension lack `exp()` and `ln()`,
+so both are registered on every SQLite connection.
+
+Postgres raises "value out of range: underflow" for float8 exp() of about
+-745 or less instead of returning 0, so the retention exponent is clamped at
+EXP_FLOOR. exp(-700) is already 0 at retention precision.
+"""
+
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Float, and_, case, event, func, literal
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement, FunctionElement
+
+from app.decay import ALERT_THRESHOLD, ALPHA, BETA, K0_BASE
+from app.models import KnowledgeItem
+
+EXP_FLOOR = -700.0      # exp() of anything lower underflows float8 on Postgres
+
+
+# ── Dialect-specific building blocks ───────────────────────────────────────────
+
+class days_between(FunctionElement):
+    """`days_between(end, start)` → (end − start) in fractional days."""
+    type          = Float()
+    name          = "days_between"
+    inherit_cache = True
+
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return "(EXTRACT(EPOCH FROM (%s - %s)) / 86400.0)" % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return "(julianday(%s) - julianday(%s))" % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+class greatest(FunctionElement):
+    type          = Float()
+    name          = "greatest"
+    inherit_cache = True
+
+
+@compiles(greatest)
+def _greatest_default(element, compiler, **kw):
+    return "greatest(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(greatest, "sqlite")
+def _greatest_sqlite(element, compiler, **kw):
+    return "max(%s)" % compiler.process(element.clauses, **kw)
+
+
+class add_days(FunctionElement):
+    """`add_days(ts, days)` → ts shifted by fractional `days`."""
+    type          = DateTime(timezone=True)
+    name          = "add_days"
+    inherit_cache = True
+
+
+@compiles(add_days)
+def _add_days_default(element, compiler, **kw):
+    ts, days = list(element.clauses)
+    return "(%s + (%s) * INTERVAL '1 day')" % (compiler.process(ts, **kw), compiler.process(days, **kw))
+
+
+@compiles(add_days, "sqlite")
+def _add_days_sqlite(element, compiler, **kw):
+    ts, days = list(element.clauses)
+    return "datetime(%s, '+' || ((%s) * 86400.0) || ' seconds')" % (
+        compiler.process(ts, **kw), compiler.process(days, **kw),
+    )
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_math(dbapi_connection, _record):
+    # Only the SQLite drivers expose create_function
+    if hasattr(dbapi_connection, "create_function"):
+        dbapi_connection.create_function("exp", 1, math.exp)
+        dbapi_connection.create_function("ln", 1, math.log)
+
+
+# ── Decay expressions ──────────────────────────────────────────────────────────
+
+def timestamp_literal(now: datetime) -> ColumnElement:
+    # UTC, because SQLite stores datetimes without their offset
+    now = now.replace(tzinfo=timezone.utc) if now.tzinfo is None else now.astimezone(timezone.utc)
+    return literal(now, DateTime(timezone=True))
+
+
+def days_elapsed_expr(now: datetime) -> ColumnElement:
+    """Days since last review (or creation), clamped at 0 — like days_since_batch."""
+    anchor = func.coalesce(KnowledgeItem.last_reviewed, KnowledgeItem.created_at)
+    return greatest(days_between(timestamp_literal(now), anchor), 0.0)
+
+
+def retention_expr(now: datetime) -> ColumnElement:
+    """K(t) for each row as of `now` — compute_retention in SQL."""
+    m = KnowledgeItem.memory_floor
+    return m + (KnowledgeItem.k0_initial_strength - m) * func.exp(
+        greatest(-KnowledgeItem.decay_rate * days_elapsed_expr(now), EXP_FLOOR)
+    )
+
+
+def ema_expr(current: ColumnElement, alpha: float = 0.1) -> ColumnElement:
+    """update_ema(current) — one event — in SQL."""
+    return (1.0 - alpha) * current + alpha
+
+
+def decay_rate_expr(
+    difficulty:         ColumnElement,
+    interest:           ColumnElement,
+    sleep_quality:      ColumnElement,
+    base_memory:        ColumnElement,
+    attention:          ColumnElement,
+    revision_frequency: ColumnElement,
+    usage_frequency:    ColumnElement,
+) -> ColumnElement:
+    """compute_decay_rate in SQL; arguments may be columns or expressions over them."""
+    denominator = greatest(interest + sleep_quality + base_memory + attention, 0.1)
+    suppression = func.exp(-(ALPHA * revision_frequency + BETA * usage_frequency))
+    return K0_BASE * (difficulty / denominator) * suppression
+
+
+def alert_due_at_expr(
+    k0:           ColumnElement,
+    decay_rate:   ColumnElement,
+    memory_floor: ColumnElement,
+    anchor:       ColumnElement,
+    threshold:    float = ALERT_THRESHOLD,
+) -> ColumnElement:
+    """compute_alert_due_at in SQL — same guards, NULL where it returns None."""
+    days = func.ln((k0 - memory_floor) / (threshold - memory_floor)) / decay_rate
+    return case(
+        (k0 <= threshold, anchor),
+        (and_(decay_rate > 0, threshold - memory_floor > 0, k0 - memory_floor > 0), add_days(anchor, days)),
+        else_=None,
+    )
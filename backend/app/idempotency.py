@@ -0,0 +1,317 @@
+"""
+Idempotency-Key support for non-idempotent POSTs.
+
+A client that may retry (or a load balancer retrying for it) sends the same
+`Idempotency-Key` header on every attempt. The first attempt runs normally
+and its response is stored for IDEMPOTENCY_TTL_S; later attempts get the
+stored response back (with `Idempotent-Replayed: true`) without the handler
+running again, so a retried review never applies its EMA step twice and a
+retried create never makes a duplicate item.
+
+    reserve key ──► run handler ──► store status + body      (first attempt)
+         │
+         ├── stored response  → replay it
+         ├── still running    → 409, retry later
+         └── different body   → 422, keys can't be reused for another request
+
+Entries live in Redis (`idem:{user_id}:{key}`, SET NX for the reservation).
+When Redis is unreachable the idempotency_keys table is used instead, with
+the same semantics, for IDEMPOTENCY_REDIS_RETRY_S before Redis is tried
+again. A request completes or releases its key in the store that reserved
+it; a response that can't be written to Redis goes to the table. While
+table entries may be live (FALLBACK_MARKER in Redis), new Redis
+reservations check the table too, so retries after an outage still replay.
+A reservation expires after IDEMPOTENCY_LOCK_TTL_S, and responses with a
+5xx status are not stored, so a crashed or failed attempt can be retried.
+Replays carry the stored body and content type only.
+
+Only the routes in IDEMPOTENT_ROUTES are affected, and only when the header
+is present.
+"""
+
+import base64
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth import user_id_from_token
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import IdempotencyKey
+from app.redis_client import get_redis
+
+HEADER          = "idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# (method, path) pairs whose retries must not repeat work
+IDEMPOTENT_ROUTES = [
+    ("POST", re.compile(r"^/api/items/?$")),
+    ("POST", re.compile(r"^/api/items/bulk$")),
+    ("POST", re.compile(r"^/api/items/\d+/review$")),
+    ("POST", re.compile(r"^/api/items/reviews/batch$")),
+]
+
+
+class StoredResponse(NamedTuple):
+    fingerprint:  str
+    status_code:  Optional[int]       # None while the first attempt is running
+    content_type: Optional[str] = None
+    body:         bytes         = b""
+
+
+# ── Storage: Redis, falling back to the database ──────────────────────────────
+
+REDIS, DATABASE = "redis", "database"
+
+# Set in Redis while entries written to the database during an outage may be live
+FALLBACK_MARKER = "idem:fallback"
+
+
+class IdempotencyStore:
+    def __init__(self):
+        self._down_until   = 0.0
+        self._db_written   = 0.0    # wall clock of this process's last database write
+        self._db_announced = 0.0    # … the last one announced through FALLBACK_MARKER
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _mark_down(self, e: Exception) -> None:
+        self._down_until = time.monotonic() + settings.IDEMPOTENCY_REDIS_RETRY_S
+        print(f"[IDEMPOTENCY] Redis unavailable, using the database: {e}")
+
+    async def reserve(self, key: str, fingerprint: str) -> Tuple[Optional[StoredResponse], str]:
+        """
+        Claim `key` for a first attempt (→ None) or return what is already
+        stored under it, along with the backend holding the key. complete()
+        and release() must be given that backend.
+        """
+        if self._available():
+            try:
+                existing = await self._reserve_redis(key, fingerprint)
+                check_db = existing is None and await self._fallback_live()
+            except Exception as e:
+                self._mark_down(e)
+            else:
+                stored = await self._get_db(key) if check_db else None
+                if stored is None:
+                    return existing, REDIS
+                # Reserved or answered in the database while Redis was down
+                await self.release(key, REDIS)
+                return stored, DATABASE
+        return await self._reserve_db(key, fingerprint), DATABASE
+
+    async def complete(self, key: str, stored: StoredResponse, backend: str) -> None:
+        if backend == REDIS:
+            try:
+                await get_redis().set(key, _dump(stored), ex=settings.IDEMPOTENCY_TTL_S)
+                return
+            except Exception as e:
+                # The Redis reservation expires on its own, and reserve()
+                # then finds the response in the database
+                self._mark_down(e)
+        await self._complete_db(key, stored)
+
+    async def release(self, key: str, backend: str) -> None:
+        """Drop a reservation so the request can be retried (failed attempt)."""
+        if backend == REDIS:
+            try:
+                await get_redis().delete(key)
+            except Exception as e:
+                self._mark_down(e)      # the reservation expires after IDEMPOTENCY_LOCK_TTL_S
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+            await db.commit()
+
+    # ── Redis ──────────────────────────────────────────────────────────────
+
+    async def _reserve_redis(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        r       = get_redis()
+        pending = StoredResponse(fingerprint, None)
+        for _ in range(2):                  # the entry may expire between SET NX and GET
+            if await r.set(key, _dump(pending), nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL_S):
+                return None
+            raw = await r.get(key)
+            if raw is not None:
+                return _load(raw)
+        return pending
+
+    async def _fallback_live(self) -> bool:
+        """True if database entries from a Redis outage (any process's) may still be live."""
+        if time.time() - self._db_written < settings.IDEMPOTENCY_TTL_S:
+            if self._db_written > self._db_announced:
+                await get_redis().set(FALLBACK_MARKER, "1", ex=settings.IDEMPOTENCY_TTL_S)
+                self._db_announced = self._db_written
+            return True
+        return bool(await get_redis().exists(FALLBACK_MARKER))
+
+    # ── Database fallback ──────────────────────────────────────────────────
+
+    async def _reserve_db(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        self._db_written = time.time()
+        async with AsyncSessionLocal() as db:
+            for _ in range(3):              # the conflicting row may expire or be purged meanwhile
+                now = datetime.now(timezone.utc)
+                await db.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+                )
+                try:
+                    await db.execute(insert(IdempotencyKey).values(
+                        key         = key,
+                        fingerprint = fingerprint,
+                        expires_at  = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TTL_S),
+                    ))
+                    await db.commit()
+                    return None
+                except IntegrityError:
+                    await db.rollback()
+                row = (await db.execute(
+                    select(IdempotencyKey).where(IdempotencyKey.key == key)
+                )).scalar_one_or_none()
+                if row is not None:
+                    return _from_row(row)
+        return StoredResponse(fingerprint, None)
+
+    async def _get_db(self, key: str) -> Optional[StoredResponse]:
+        async with AsyncSessionLocal() as db:
+            now = datetime.now(timezone.utc)
+            row = (await db.execute(
+                select(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at > now)
+            )).scalar_one_or_none()
+        return _from_row(row) if row is not None else None
+
+    async def _complete_db(self, key: str, stored: StoredResponse) -> None:
+        self._db_written = time.time()
+        values = dict(
+            status_code  = stored.status_code,
+            content_type = stored.content_type,
+            body         = stored.body,
+            expires_at   = datetime.now(timezone.utc) + timedelta(seconds=settings.IDEMPOTENCY_TTL_S),
+        )
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(update(IdempotencyKey).where(IdempotencyKey.key == key).values(**values))
+            if result.rowcount == 0:        # reserved in Redis, which then failed
+                await db.execute(insert(IdempotencyKey).values(key=key, fingerprint=stored.fingerprint, **values))
+            await db.commit()
+
+
+def _from_row(row: IdempotencyKey) -> StoredResponse:
+    return StoredResponse(row.fingerprint, row.status_code, row.content_type, row.body or b"")
+
+
+def _dump(stored: StoredResponse) -> str:
+    return json.dumps({**stored._asdict(), "body": base64.b64encode(stored.body).decode()})
+
+
+def _load(raw: bytes) -> StoredResponse:
+    d = json.loads(raw)
+    return StoredResponse(d["fingerprint"], d["status_code"], d["content_type"], base64.b64decode(d["body"]))
+
+
+async def purge_expired_keys() -> int:
+    """Delete expired database fallback entries (Redis expires its own)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc)))
+        await db.commit()
+    return result.rowcount
+
+
+idempotency_store = IdempotencyStore()
+
+
+# ── Middleware ─────────────────────────────────────────────────────────────────
+
+def _applies(method: str, path: str) -> bool:
+    return any(method == m and pattern.match(path) for m, pattern in IDEMPOTENT_ROUTES)
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware, so the exact response bytes can be stored and replayed."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _applies(scope["method"], scope["path"]):
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        raw_key = headers.get(HEADER)
+        if raw_key is None:
+            return await self.app(scope, receive, send)
+        if not raw_key or len(raw_key) > settings.IDEMPOTENCY_MAX_KEY_LEN:
+            return await JSONResponse(
+                {"detail": f"Idempotency-Key must be 1-{settings.IDEMPOTENCY_MAX_KEY_LEN} characters"},
+                status_code=400,
+            )(scope, receive, send)
+
+        # The body is part of the fingerprint, so read it and replay it to the app
+        chunks: List[bytes] = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body        = b"".join(chunks)
+        fingerprint = hashlib.sha256(b"\n".join([
+            scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body,
+        ])).hexdigest()
+
+        authorization = headers.get("authorization", "")
+        token         = authorization[7:] if authorization.lower().startswith("bearer ") else None
+        key           = f"idem:{user_id_from_token(token)}:{raw_key}"
+
+        existing, backend = await idempotency_store.reserve(key, fingerprint)
+        if existing is not None:
+            return await self._answer_existing(existing, fingerprint)(scope, receive, send)
+
+        replayed = False
+
+        async def replay_body() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code, content_type, sent = 500, None, []
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code  = message["status"]
+                content_type = Headers(raw=message["headers"]).get("content-type")
+            elif message["type"] == "http.response.body":
+                sent.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, capture)
+        except Exception:
+            await idempotency_store.release(key, backend)
+            raise
+        if status_code >= 500:
+            await idempotency_store.release(key, backend)
+        else:
+            stored = StoredResponse(fingerprint, status_code, content_type, b"".join(sent))
+            await idempotency_store.complete(key, stored, backend)
+
+    @staticmethod
+    def _answer_existing(existing: StoredResponse, fingerprint: str) -> Response:
+        if existing.fingerprint != fingerprint:
+            return JSONResponse({"detail": "Idempotency-Key was already used for a different request"}, status_code=422)
+        if existing.status_code is None:
+            return JSONResponse({"detail": "A request with this Idempotency-Key is still in progress"}, status_code=409)
+        headers = {REPLAYED_HEADER: "true"}
+        if existing.content_type:
+            headers["content-type"] = existing.content_type
+        return Response(existing.body, status_code=existing.status_code, headers=headers)
@@ -0,0 +1,158 @@
+"""
+Per-user cache for insight sections.
+
+    in-process LRU  →  Redis  →  InsightEngine (DB load + compute)
+
+Keys are `insights:{user_id}:g{generation}:t{time bucket}:{section}`. The
+generation is a Redis counter bumped after every committed write to the
+user's items, so an entry can never outlive the data it was computed from;
+the time bucket (INSIGHT_CACHE_BUCKET_S) bounds how stale retention values
+get purely from the passage of time.
+
+Each process keeps a user's generation for INSIGHT_CACHE_GEN_TTL_S, so a
+local LRU hit costs no Redis round trip; a bump from another process is seen
+within that TTL. Bumps made here update the local copy at once.
+
+If Redis is unreachable the cache steps aside for INSIGHT_CACHE_RETRY_S and
+every request is computed directly — slower, never wrong. Writes during that
+window only drop local entries; their bumps are sent once Redis is back, so
+entries cached before the outage are not served afterwards.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+from app.redis_client import get_redis
+
+
+def _gen_key(user_id: int) -> str:
+    return f"insights:gen:{user_id}"
+
+
+class InsightCache:
+    def __init__(self, local_size: int):
+        self.local_size = local_size
+        self.local: "OrderedDict[str, Any]" = OrderedDict()
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "errors": 0}
+        self.generations: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()   # user → (gen, expires)
+        self._unsent_bumps: Set[int] = set()
+        self._down_until = 0.0
+
+    # ── Redis availability ─────────────────────────────────────────────────
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _mark_down(self, e: Exception) -> None:
+        self.stats["errors"] += 1
+        self._down_until = time.monotonic() + settings.INSIGHT_CACHE_RETRY_S
+        print(f"[CACHE] Redis unavailable, bypassing insight cache: {e}")
+
+    # ── Keys ───────────────────────────────────────────────────────────────
+
+    async def generation(self, user_id: int) -> Optional[int]:
+        """Current generation for the user, or None when the cache is bypassed."""
+        if not self._available():
+            return None
+        cached = self.generations.get(user_id)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        try:
+            await self._send_unsent_bumps()
+            generation = int(await get_redis().get(_gen_key(user_id)) or 0)
+        except Exception as e:
+            self._mark_down(e)
+            return None
+        return self._remember_generation(user_id, generation)
+
+    def _remember_generation(self, user_id: int, generation: int) -> int:
+        self.generations[user_id] = (generation, time.monotonic() + settings.INSIGHT_CACHE_GEN_TTL_S)
+        self.generations.move_to_end(user_id)
+        while len(self.generations) > self.local_size:
+            self.generations.popitem(last=False)
+        return generation
+
+    @staticmethod
+    def key(user_id: int, generation: int, section: str) -> str:
+        bucket = int(time.time() // settings.INSIGHT_CACHE_BUCKET_S)
+        return f"insights:{user_id}:g{generation}:t{bucket}:{section}"
+
+    # ── Read / write ───────────────────────────────────────────────────────
+
+    async def get_many(self, keys: Dict[str, str]) -> Dict[str, Any]:
+        """`{name: key}` → `{name: value}` for the names that are cached."""
+        found, remote = {}, {}
+        for name, key in keys.items():
+            if key in self.local:
+                self.local.move_to_end(key)
+                found[name] = self.local[key]
+                self.stats["local_hits"] += 1
+            else:
+                remote[name] = key
+
+        if remote:
+            try:
+                values = await get_redis().mget(list(remote.values()))
+            except Exception as e:
+                self._mark_down(e)
+                values = [None] * len(remote)
+            for (name, key), raw in zip(remote.items(), values):
+                if raw is None:
+                    self.stats["misses"] += 1
+                    continue
+                found[name] = self._remember(key, json.loads(raw))
+                self.stats["redis_hits"] += 1
+        return found
+
+    async def set_many(self, entries: Dict[str, Any]) -> Dict[str, Any]:
+        """Store `{key: value}`; returns the JSON-ready values that were stored."""
+        stored = {key: jsonable_encoder(value) for key, value in entries.items()}
+        for key, value in stored.items():
+            self._remember(key, value)
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for key, value in stored.items():
+                pipe.set(key, json.dumps(value), ex=int(settings.INSIGHT_CACHE_BUCKET_S))
+            await pipe.execute()
+        except Exception as e:
+            self._mark_down(e)
+        return stored
+
+    def _remember(self, key: str, value: Any) -> Any:
+        self.local[key] = value
+        self.local.move_to_end(key)
+        while len(self.local) > self.local_size:
+            self.local.popitem(last=False)
+        return value
+
+    # ── Invalidation ───────────────────────────────────────────────────────
+
+    async def bump(self, user_id: int) -> None:
+        """Invalidate every cached section for the user. Call after commit."""
+        prefix = f"insights:{user_id}:"
+        for key in [k for k in self.local if k.startswith(prefix)]:
+            del self.local[key]
+        self.generations.pop(user_id, None)
+        if not self._available():
+            self._unsent_bumps.add(user_id)
+            return
+        try:
+            self._remember_generation(user_id, await get_redis().incr(_gen_key(user_id)))
+        except Exception as e:
+            self._unsent_bumps.add(user_id)
+            self._mark_down(e)
+
+    async def _send_unsent_bumps(self) -> None:
+        """Bumps skipped while Redis was down, sent before anything is read from it again."""
+        while self._unsent_bumps:
+            user_id = next(iter(self._unsent_bumps))
+            await get_redis().incr(_gen_key(user_id))
+            self._unsent_bumps.discard(user_id)
+
+
+insight_cache = InsightCache(settings.INSIGHT_CACHE_LOCAL_SIZE)
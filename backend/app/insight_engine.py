@@ -0,0 +1,244 @@
+"""
+Insight engine — every dashboard insight computed from one load of a user's items.
+
+The per-item decay batch (retention, half-life, time-to-forget, days since
+review) is evaluated once and shared by all sections, so asking for seven
+insights costs one query and one vectorised pass instead of seven.
+"""
+
+import heapq
+from datetime import date, datetime, timedelta, timezone
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.decay import (
+    DecayBatch,
+    column,
+    compute_decay_rate_batch,
+    compute_item_batch,
+    epoch_seconds,
+    retention_series_batch,
+)
+from app.schemas import DailyRetention, InsightSummary, WeakItem
+
+GRANULARITIES = ("daily", "weekly")
+
+SECTIONS = (
+    "summary",
+    "weakest",
+    "hardest",
+    "timeline",
+    "upcoming_forgets",
+    "most_reviewed",
+    "sleep_impact",
+)
+
+
+def parse_sections(raw: Optional[str]) -> List[str]:
+    """`"summary,upcoming-forgets"` → `["summary", "upcoming_forgets"]`; None/empty → all."""
+    if not raw:
+        return list(SECTIONS)
+    names   = [s.strip().replace("-", "_") for s in raw.split(",") if s.strip()]
+    unknown = [n for n in names if n not in SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown section(s): {', '.join(unknown)}. Valid: {', '.join(SECTIONS)}")
+    return names
+
+
+class InsightEngine:
+    def __init__(
+        self,
+        items:  Sequence,
+        now:    Optional[datetime] = None,
+        rollup: Optional[Dict[date, float]] = None,
+    ):
+        self.items  = items
+        self.now    = now or datetime.now(timezone.utc)
+        self.rollup = rollup or {}      # day → avg_retention from retention_daily
+
+    @cached_property
+    def batch(self) -> DecayBatch:
+        return compute_item_batch(self.items, self.now)
+
+    def _weak_item(self, idx: int) -> WeakItem:
+        item = self.items[idx]
+        return WeakItem(
+            id                = item.id,
+            topic             = item.topic,
+            retention         = round(float(self.batch.retention[idx]), 1),
+            half_life         = round(float(self.batch.half_life[idx]), 1),
+            days_since_review = round(float(self.batch.days_elapsed[idx]), 1),
+        )
+
+    def _smallest(self, values: np.ndarray, limit: int) -> List[WeakItem]:
+        """
+        WeakItems for the `limit` smallest values (rounded to 0.1, ties by id —
+        same as sorting every row), built only for the rows returned.
+        """
+        keys = list(zip((round(v, 1) for v in values.tolist()), (i.id for i in self.items)))
+        return [self._weak_item(i) for i in heapq.nsmallest(limit, range(len(keys)), key=keys.__getitem__)]
+
+    # ── Sections ───────────────────────────────────────────────────────────
+
+    def summary(self) -> InsightSummary:
+        if not self.items:
+            return InsightSummary(total_items=0, avg_retention=0, avg_half_life=0,
+                                  items_below_60=0, items_below_40=0, items_near_floor=0)
+
+        retentions = self.batch.retention
+        floors     = column(self.items, "memory_floor") * 100
+
+        return InsightSummary(
+            total_items      = len(self.items),
+            avg_retention    = round(float(retentions.mean()), 1),
+            avg_half_life    = round(float(self.batch.half_life.mean()), 1),
+            items_below_60   = int(np.count_nonzero(retentions < 60)),
+            items_below_40   = int(np.count_nonzero(retentions < 40)),
+            items_near_floor = int(np.count_nonzero(retentions < floors + 5)),
+        )
+
+    def weakest(self, limit: int) -> List[WeakItem]:
+        return self._smallest(self.batch.retention, limit)
+
+    def hardest(self, limit: int) -> List[WeakItem]:
+        return self._smallest(self.batch.half_life, limit)   # shortest half-life = hardest
+
+    def timeline(self, days: int = 30, granularity: str = "daily") -> List[DailyRetention]:
+        """
+        Average retention across all items for each of the past `days` days
+        (today included), optionally averaged into 7-day buckets.
+
+        Days present in the `retention_daily` rollup come from there; the
+        rest are computed from the items.
+        """
+        first  = self.now.date() - timedelta(days=days - 1)
+        dates  = [first + timedelta(days=d) for d in range(days)]
+        stored = self.rollup
+
+        if all(d in stored for d in dates):
+            series = [stored[d] for d in dates]
+        elif self.items:
+            # K(t) as of each midnight, using created_at as reference (whole days)
+            start  = datetime.combine(first, datetime.min.time()).replace(tzinfo=timezone.utc)
+            series = retention_series_batch(
+                column(self.items, "k0_initial_strength"),
+                column(self.items, "decay_rate"),
+                column(self.items, "memory_floor"),
+                epoch_seconds([i.created_at for i in self.items]),
+                start.timestamp(),
+                days,
+            ).tolist()
+            series = [stored.get(d, avg) for d, avg in zip(dates, series)]
+        else:
+            return []
+
+        if granularity == "weekly":
+            # Buckets end on today; the oldest may be shorter than 7 days
+            points = []
+            for end in range(days, 0, -7):
+                lo = max(end - 7, 0)
+                points.append(DailyRetention(
+                    date      = str(dates[lo]),
+                    retention = round(sum(series[lo:end]) / (end - lo), 1),
+                ))
+            return points[::-1]
+
+        return [
+            DailyRetention(date=str(d), retention=round(avg, 1))
+            for d, avg in zip(dates, series)
+        ]
+
+    def upcoming_forgets(self, days: int) -> List[dict]:
+        if not self.items:
+            return []
+
+        batch     = self.batch
+        remaining = batch.time_to_forget - batch.days_elapsed
+        due       = np.flatnonzero((remaining > 0) & (remaining <= days))
+
+        rows = []
+        for idx in due.tolist():
+            item           = self.items[idx]
+            days_remaining = float(remaining[idx])
+            forget_date    = (self.now + timedelta(days=days_remaining)).date()
+            rows.append({
+                "id":           item.id,
+                "topic":        item.topic,
+                "forget_date":  str(forget_date),
+                "days_left":    round(days_remaining, 1),
+                "retention":    round(float(batch.retention[idx]), 1),
+            })
+
+        rows.sort(key=lambda x: x["days_left"])
+        return rows
+
+    def most_reviewed(self, limit: int) -> List[dict]:
+        if not self.items:
+            return []
+
+        rows = [
+            {
+                "id":                 i.id,
+                "topic":              i.topic,
+                "revision_frequency": round(i.revision_frequency, 3),
+                "usage_frequency":    round(i.usage_frequency, 3),
+                "retention":          round(r, 1),
+            }
+            for i, r in zip(self.items, self.batch.retention.tolist())
+        ]
+        rows.sort(key=lambda x: -(x["revision_frequency"] + x["usage_frequency"]))
+        return rows[:limit]
+
+    def sleep_impact(self) -> List[dict]:
+        """Show how today's sleep quality affects decay rates across all items."""
+        if not self.items:
+            return []
+
+        factors = dict(
+            difficulty         = column(self.items, "difficulty"),
+            interest           = column(self.items, "interest"),
+            base_memory        = column(self.items, "base_memory"),
+            attention          = column(self.items, "attention"),
+            revision_frequency = column(self.items, "revision_frequency"),
+            usage_frequency    = column(self.items, "usage_frequency"),
+        )
+        k_good = compute_decay_rate_batch(sleep_quality=0.9, **factors).tolist()
+        k_poor = compute_decay_rate_batch(sleep_quality=0.3, **factors).tolist()
+
+        rows = []
+        for item, k_good_sleep, k_poor_sleep in zip(self.items, k_good, k_poor):
+            rows.append({
+                "id":              item.id,
+                "topic":           item.topic,
+                "current_k":       round(item.decay_rate, 4),
+                "k_good_sleep":    round(k_good_sleep, 4),
+                "k_poor_sleep":    round(k_poor_sleep, 4),
+                "decay_multiplier": round(k_poor_sleep / k_good_sleep, 2) if k_good_sleep > 0 else None,
+            })
+
+        rows.sort(key=lambda x: -(x["decay_multiplier"] or 0))
+        return rows
+
+    # ── All at once ────────────────────────────────────────────────────────
+
+    def compute(
+        self,
+        sections:      Iterable[str],
+        limit:         int = 10,
+        days:          int = 30,
+        timeline_days: int = 30,
+        granularity:   str = "daily",
+    ) -> Dict[str, object]:
+        """Evaluate the requested sections over the shared batch."""
+        handlers = {
+            "summary":          self.summary,
+            "weakest":          lambda: self.weakest(limit),
+            "hardest":          lambda: self.hardest(limit),
+            "timeline":         lambda: self.timeline(timeline_days, granularity),
+            "upcoming_forgets": lambda: self.upcoming_forgets(days),
+            "most_reviewed":    lambda: self.most_reviewed(limit),
+            "sleep_impact":     self.sleep_impact,
+        }
+        return {name: handlers[name]() for name in sections}
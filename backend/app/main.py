@@ -9,8 +9,10 @@ from app.config import settings
 from app.database import engine, Base, get_db
 from app.models import User
 from app.auth import hash_password, create_access_token, verify_password
+from app.idempotency import REPLAYED_HEADER, IdempotencyMiddleware
 from app.schemas import UserCreate, Token
-from app.routes import items, reviews, insights
+from app.routes import items, reviews, insights, users
+from app.redis_client import close_redis
 from app.scheduler import create_scheduler
 
 
@@ -27,6 +29,7 @@ async def lifespan(app: FastAPI):
     yield
 
     scheduler.shutdown()
+    await close_redis()
 
 
 app = FastAPI(
@@ -36,6 +39,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# ── Idempotency-Key replay (inside CORS, so replays get CORS headers too) ─────
+app.add_middleware(IdempotencyMiddleware)
+
 # ── CORS ───────────────────────────────────────────────────────────────────────
 app.add_middleware(
     CORSMiddleware,
@@ -43,12 +49,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", REPLAYED_HEADER],
 )
 
 # ── Routers ────────────────────────────────────────────────────────────────────
 app.include_router(items.router,    prefix="/api")
 app.include_router(reviews.router,  prefix="/api")
 app.include_router(insights.router, prefix="/api")
+app.include_router(users.router,    prefix="/api")
 
 
 # ── Auth routes ────────────────────────────────────────────────────────────────
@@ -1,6 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import BigInteger, Column, Integer, LargeBinary, String, Float, Date, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
+from app.decay import compute_alert_due_at
+
+CONTENT_PREVIEW_CHARS = 80   # characters of `content` shown on item cards
 
 
 class KnowledgeItem(Base):
@@ -33,12 +39,50 @@ class KnowledgeItem(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # ── Derived: when K(t) crosses the alert threshold (NULL = never) ───────
+    alert_due_at = Column(DateTime(timezone=True), nullable=True)
+
+    # ── Alert suppression state (reset on review) ───────────────────────────
+    last_alerted_at = Column(DateTime(timezone=True), nullable=True)
+    alerted_band    = Column(Integer, default=0)   # 0 = not alerted; see scheduler.alert_bands
+
     # ── Composite indexes for scheduler & analytics queries ─────────────────
     __table_args__ = (
         Index("idx_user_last_reviewed", "user_id", "last_reviewed"),
-        Index("idx_user_decay_rate",    "user_id", "decay_rate"),
+        Index("idx_user_decay_rate_id", "user_id", "decay_rate", "id"),
+        # Keyset-paginated due scan (scheduler.iter_due_chunks)
+        Index("idx_alert_due_at_id",    "alert_due_at", "id"),
+        # Keyset pagination of GET /items (sort key, then id as tie-breaker)
+        Index("idx_user_id",            "user_id", "id"),
+        Index("idx_user_created_at",    "user_id", "created_at", "id"),
+        Index("idx_user_topic_id",      "user_id", "topic", "id"),    # default collation, like ORDER BY
+        # Case-insensitive topic prefix filter: lower(topic) LIKE 'prefix%'
+        Index(
+            "idx_user_topic_lower", "user_id", func.lower(topic).label("topic_lower"),
+            postgresql_ops={"topic_lower": "text_pattern_ops"},
+        ),
     )
 
+    @property
+    def content_preview(self) -> Optional[str]:
+        """First CONTENT_PREVIEW_CHARS characters of content, with "…" if there is more."""
+        if self.content is None or len(self.content) <= CONTENT_PREVIEW_CHARS:
+            return self.content
+        return self.content[:CONTENT_PREVIEW_CHARS] + "…"
+
+    def reschedule_alert(self, anchor: datetime) -> None:
+        """Recompute alert_due_at — call whenever k, M or last_reviewed changes."""
+        if anchor.tzinfo is None:
+            anchor = anchor.replace(tzinfo=timezone.utc)
+        self.alert_due_at = compute_alert_due_at(
+            self.k0_initial_strength, self.decay_rate, self.memory_floor, anchor
+        )
+
+    def reset_alert_state(self) -> None:
+        """Forget previous alerts so the next band crossing alerts immediately."""
+        self.last_alerted_at = None
+        self.alerted_band    = 0
+
 
 class User(Base):
     """Minimal user model — expand with hashed_password for real auth."""
@@ -50,4 +94,59 @@ class User(Base):
     base_memory   = Column(Float, default=0.7)
     sleep_quality = Column(Float, default=0.8)
     memory_floor  = Column(Float, default=0.10)
+    telegram_chat_id = Column(String, nullable=True)   # decay alerts go here (else TELEGRAM_CHAT_ID)
     created_at    = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RetentionDaily(Base):
+    """One row per user per day — nightly rollup read by /insights/timeline."""
+    __tablename__ = "retention_daily"
+
+    user_id        = Column(Integer, primary_key=True)
+    day            = Column(Date, primary_key=True)
+    item_count     = Column(Integer, nullable=False)
+    avg_retention  = Column(Float, nullable=False)
+    items_below_60 = Column(Integer, nullable=False)
+    items_below_40 = Column(Integer, nullable=False)
+    avg_half_life  = Column(Float, nullable=True)    # NULL when every item has k = 0
+
+
+# SQLite only auto-increments INTEGER primary keys
+EventId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class ReviewEvent(Base):
+    """Append-only review log — knowledge_items aggregates are a fold of it (see app/review_log.py)."""
+    __tablename__ = "review_events"
+
+    id      = Column(EventId, primary_key=True)
+    item_id = Column(Integer, nullable=False)    # no FK: history outlives deleted items
+    user_id = Column(Integer, nullable=False)
+    ts      = Column(DateTime(timezone=True), nullable=False)   # when the review happened
+    kind    = Column(String(8), nullable=False)                 # "review" (Rf) | "usage" (U)
+
+    __table_args__ = (
+        # Rows arrive in roughly ts order, so a BRIN index keeps time-range scans
+        # cheap at a tiny fraction of a B-tree's size
+        Index("idx_review_events_ts", "ts", postgresql_using="brin"),
+        Index("idx_review_events_item_ts", "item_id", "ts"),
+    )
+
+
+class ReviewEventQueue(Base):
+    """Events not yet folded into knowledge_items (REVIEW_AGGREGATES=deferred)."""
+    __tablename__ = "review_event_queue"
+
+    event_id = Column(EventId, primary_key=True)
+
+
+class IdempotencyKey(Base):
+    """Stored responses for Idempotency-Key requests when Redis is unavailable (see app/idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+
+    key          = Column(String, primary_key=True)         # idem:{user_id}:{Idempotency-Key}
+    fingerprint  = Column(String(64), nullable=False)       # sha256 of method, path and body
+    status_code  = Column(Integer, nullable=True)           # NULL while the first request is running
+    content_type = Column(String, nullable=True)
+    body         = Column(LargeBinary, nullable=True)
+    expires_at   = Column(DateTime(timezone=True), nullable=False, index=True)
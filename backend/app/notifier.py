@@ -0,0 +1,279 @@
+"""
+Outbound notifications — one long-lived, rate-limited client per process.
+
+    Notifier  →  per-chat ChatLimit (TokenBucket + sends in flight), global TokenBucket  →  Transport
+
+Transports:
+  telegram  one pooled `telegram.Bot` (HTTPXRequest connection pool)
+  http      POSTs {"chat_id", "text"} JSON to NOTIFIER_HTTP_URL (local stub for load tests)
+  memory    keeps messages in a list (tests / offline throughput runs)
+
+A 429 from any transport is raised as `RateLimited`; the notifier pauses the
+buckets for the server's Retry-After and retries up to NOTIFY_MAX_RETRIES.
+
+Callers that must not wait on one chat (the worker's dispatcher) call
+`reserve(chat_id)` first: it takes the chat's token without blocking, or says
+how long to come back after, and `send(..., reserved=True)` then skips the
+chat's bucket and raises a 429 straight back instead of sleeping on it.
+
+Each alert goes to its user's own chat (users.telegram_chat_id, falling back
+to TELEGRAM_CHAT_ID), so per-chat buckets only throttle one user's messages
+and fleet throughput is bounded by NOTIFY_GLOBAL_RATE. Everything sent to a
+single chat still goes out at NOTIFY_PER_CHAT_RATE (Telegram allows about
+1 msg/s per chat); digest mode is the way to keep one busy user's queue short.
+Per-chat state is dropped once a chat is idle with a full bucket (checked
+every CHAT_SWEEP_INTERVAL_S), so memory follows active chats, not all users.
+"""
+
+import abc
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+CHAT_SWEEP_INTERVAL_S = 60.0
+
+
+class RateLimited(Exception):
+    """Downstream asked us to back off for `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+# ── Rate limiting ──────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/s, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate         = rate
+        self.capacity     = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens       = self.capacity
+        self.updated      = time.monotonic()
+        self.paused_until = 0.0
+        self._lock        = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Hold every acquirer for `seconds` (Retry-After)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_full(self, now: float) -> bool:
+        """Refilled to capacity, not paused, nobody waiting — indistinguishable from a new bucket."""
+        return (
+            not self._lock.locked()
+            and now >= self.paused_until
+            and self.tokens + (now - self.updated) * self.rate >= self.capacity
+        )
+
+    def try_acquire(self) -> float:
+        """Take a token if one is free (→ 0.0), else the seconds until one will be."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while wait := self.try_acquire():
+                await asyncio.sleep(wait)
+
+
+# ── Transports ─────────────────────────────────────────────────────────────────
+
+class Transport(abc.ABC):
+    @abc.abstractmethod
+    async def send(self, chat_id: str, text: str) -> None:
+        """Deliver one message; raise RateLimited on a 429."""
+
+    async def close(self) -> None:
+        pass
+
+
+class TelegramTransport(Transport):
+    def __init__(self, token: str, pool_size: int):
+        from telegram import Bot
+        from telegram.request import HTTPXRequest
+
+        self.bot = Bot(
+            token   = token,
+            request = HTTPXRequest(connection_pool_size=pool_size, pool_timeout=10.0),
+        )
+        self._initialized = False
+
+    async def send(self, chat_id: str, text: str) -> None:
+        from telegram.error import RetryAfter
+
+        if not self._initialized:
+            await self.bot.initialize()
+            self._initialized = True
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, parse_mode="Markdown")
+        except RetryAfter as e:
+            raise RateLimited(float(e.retry_after)) from e
+
+    async def close(self) -> None:
+        if self._initialized:
+            await self.bot.shutdown()
+
+
+class HttpTransport(Transport):
+    def __init__(self, url: str, pool_size: int):
+        import httpx
+
+        self.url    = url
+        self.client = httpx.AsyncClient(
+            limits  = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout = 10.0,
+        )
+
+    async def send(self, chat_id: str, text: str) -> None:
+        response = await self.client.post(self.url, json={"chat_id": chat_id, "text": text})
+        if response.status_code == 429:
+            raise RateLimited(float(response.headers.get("Retry-After", 1)))
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class MemoryTransport(Transport):
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.sent: List[Tuple[str, str]] = []
+
+    async def send(self, chat_id: str, text: str) -> None:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        self.sent.append((chat_id, text))
+
+
+# ── Notifier ───────────────────────────────────────────────────────────────────
+
+class ChatLimit:
+    """One chat's token bucket, its sends in flight, and the next time to offer a deferred send."""
+
+    def __init__(self, rate: float):
+        self.bucket    = TokenBucket(rate)
+        self.max_sends = max(int(self.bucket.capacity), 1)     # one burst in flight at a time
+        self.in_flight = 0
+        self.next_slot = 0.0
+
+    def idle(self, now: float) -> bool:
+        return self.in_flight == 0 and now >= self.next_slot and self.bucket.is_full(now)
+
+
+class Notifier:
+    def __init__(
+        self,
+        transport:     Transport,
+        global_rate:   float,
+        per_chat_rate: float,
+        max_retries:   int = 3,
+    ):
+        self.transport     = transport
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.chats: Dict[str, ChatLimit] = {}
+        self.swept_at      = time.monotonic()
+        self.max_retries   = max_retries
+
+    def _sweep(self, now: float) -> None:
+        """Forget chats that are idle with a full bucket; a new ChatLimit would be identical."""
+        self.chats    = {chat_id: chat for chat_id, chat in self.chats.items() if not chat.idle(now)}
+        self.swept_at = now
+
+    def _chat(self, chat_id: str) -> ChatLimit:
+        now = time.monotonic()
+        if now - self.swept_at >= CHAT_SWEEP_INTERVAL_S:
+            self._sweep(now)
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = ChatLimit(self.per_chat_rate)
+        return chat
+
+    def reserve(self, chat_id: str) -> float:
+        """
+        Take a send token for `chat_id` without waiting (→ 0.0), or return how
+        many seconds to hold the message before offering it again. While one
+        burst is in flight, or the bucket is empty or paused, callers are told
+        to come back one 1/rate slot after each other, so a deferred backlog
+        returns paced instead of all at once.
+        """
+        chat = self._chat(chat_id)
+        slot = 1 / self.per_chat_rate
+        if chat.in_flight < chat.max_sends:
+            wait = chat.bucket.try_acquire()
+            if not wait:
+                return 0.0
+        else:
+            wait = slot
+
+        now  = time.monotonic()
+        wait = max(chat.next_slot, now + wait) - now
+        chat.next_slot = now + wait + slot
+        return wait
+
+    async def send(
+        self,
+        chat_id:  str,
+        text:     str,
+        timeout:  Optional[float] = None,
+        reserved: bool = False,
+    ) -> None:
+        """
+        Send within both rate limits, honouring Retry-After; raises once retries
+        run out. `timeout` bounds each transport call only — waiting for a rate
+        limit token is never a failure.
+
+        With `reserved`, the chat's token was already taken by reserve() and a
+        429 is raised at once (buckets paused) for the caller to reschedule.
+        """
+        chat = self._chat(chat_id)
+        for attempt in range(self.max_retries + 1):
+            if attempt or not reserved:
+                await chat.bucket.acquire()
+            await self.global_bucket.acquire()
+            chat.in_flight += 1
+            try:
+                await asyncio.wait_for(self.transport.send(chat_id, text), timeout)
+                return
+            except RateLimited as e:
+                chat.bucket.pause(e.retry_after)
+                self.global_bucket.pause(e.retry_after)
+                if reserved or attempt == self.max_retries:
+                    raise
+            finally:
+                chat.in_flight -= 1
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+
+def build_notifier() -> Optional[Notifier]:
+    """Notifier for the configured transport, or None if Telegram isn't configured."""
+    kind = settings.NOTIFIER_TRANSPORT
+    if kind == "telegram":
+        if not settings.TELEGRAM_BOT_TOKEN:
+            return None
+        transport = TelegramTransport(settings.TELEGRAM_BOT_TOKEN, settings.NOTIFY_POOL_SIZE)
+    elif kind == "http":
+        transport = HttpTransport(settings.NOTIFIER_HTTP_URL, settings.NOTIFY_POOL_SIZE)
+    elif kind == "memory":
+        transport = MemoryTransport()
+    else:
+        raise ValueError(f"Unknown NOTIFIER_TRANSPORT: {kind!r}")
+
+    return Notifier(
+        transport,
+        global_rate   = settings.NOTIFY_GLOBAL_RATE,
+        per_chat_rate = settings.NOTIFY_PER_CHAT_RATE,
+        max_retries   = settings.NOTIFY_MAX_RETRIES,
+    )
@@ -0,0 +1,31 @@
+"""
+Process-wide Redis connection.
+
+`redis.asyncio.Redis` keeps its own connection pool, so one client per
+process is enough — callers should use `get_redis()` instead of calling
+`from_url` on every invocation.
+"""
+
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+_redis: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    """Return the shared client, creating it on first use."""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close the shared client (app shutdown / worker exit)."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
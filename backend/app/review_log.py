@@ -0,0 +1,355 @@
+"""
+Append-only review log and the item aggregates folded from it.
+
+Every review appends one `review_events` row (item_id, user_id, ts, kind).
+The review fields on knowledge_items are a fold of an item's events:
+
+    "review":  Rf ← EMA(Rf)
+    "usage":   U  ← EMA(U),  last_used ← max(last_used, ts)
+    both:      last_reviewed ← max(last_reviewed, ts), then k and
+               alert_due_at are recomputed and alert state is reset
+
+Every event is the same EMA step and timestamps only move forward, so the
+fold does not depend on how events are grouped or ordered. That allows three
+ways of applying them:
+
+  • inline   — the request folds its own events before committing
+               (REVIEW_AGGREGATES="inline", the default); a single review
+               is one atomic UPDATE … RETURNING (review_update), so
+               concurrent reviews of one item can't lose each other's EMA step
+  • deferred — single reviews only append their event and queue it in
+               review_event_queue, with no lock on the item row (responding
+               with the item's queued events folded in, see preview_review —
+               eventually consistent); flush_review_events() claims
+               queued events in bulk (FOR UPDATE SKIP LOCKED, so several
+               flushers can run) and folds them every REVIEW_FLUSH_INTERVAL_S
+  • replay   — rebuild_items() refolds an item's whole history from the
+               initial state, e.g. after a data repair
+
+Replay is exact for items whose whole history is in the log; reviews made
+before the log existed are not in it.
+
+Run:  python -m app.review_log flush
+      python -m app.review_log replay <item_id> [<item_id> ...]
+"""
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import ReturningUpdate
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.decay import compute_alert_due_at, compute_decay_rate, update_ema
+from app.decay_sql import alert_due_at_expr, decay_rate_expr, ema_expr, timestamp_literal
+from app.insight_cache import insight_cache
+from app.models import KnowledgeItem, ReviewEvent, ReviewEventQueue
+from app.serializers import ITEM_COLUMNS
+
+KINDS = ("review", "usage")
+
+Event = Tuple[str, datetime]    # (kind, ts)
+
+STATE_COLUMNS = ITEM_COLUMNS + (KnowledgeItem.last_alerted_at, KnowledgeItem.alerted_band)
+
+INITIAL_STATE = {
+    "revision_frequency": 0.0,
+    "usage_frequency":    0.0,
+    "last_reviewed":      None,
+    "last_used":          None,
+}
+
+
+def event_kind(used_in_practice: bool) -> str:
+    return "usage" if used_in_practice else "review"
+
+
+def as_utc(ts: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; everything here compares in UTC
+    if ts is None or ts.tzinfo is not None:
+        return ts
+    return ts.replace(tzinfo=timezone.utc)
+
+
+def _later(a: Optional[datetime], b: datetime) -> datetime:
+    return b if a is None or b > a else a
+
+
+# ── The fold ───────────────────────────────────────────────────────────────────
+
+def fold(state: dict, events: Sequence[Event]) -> dict:
+    """Apply `events` to one item's state dict in place and return it."""
+    for kind, ts in events:
+        ts = as_utc(ts)
+        if kind == "usage":
+            state["usage_frequency"] = update_ema(state["usage_frequency"])
+            state["last_used"]       = _later(state["last_used"], ts)
+        else:
+            state["revision_frequency"] = update_ema(state["revision_frequency"])
+        state["last_reviewed"] = _later(state["last_reviewed"], ts)
+
+    state["decay_rate"] = compute_decay_rate(
+        difficulty         = state["difficulty"],
+        interest           = state["interest"],
+        sleep_quality      = state["sleep_quality"],
+        base_memory        = state["base_memory"],
+        attention          = state["attention"],
+        revision_frequency = state["revision_frequency"],
+        usage_frequency    = state["usage_frequency"],
+    )
+    state["alert_due_at"] = compute_alert_due_at(
+        state["k0_initial_strength"], state["decay_rate"], state["memory_floor"],
+        state["last_reviewed"] or as_utc(state["created_at"]),
+    )
+    if events:
+        state["last_alerted_at"] = None
+        state["alerted_band"]    = 0
+    return state
+
+
+def _aggregate_row(state: dict) -> dict:
+    return {
+        "id":                 state["id"],
+        "revision_frequency": state["revision_frequency"],
+        "usage_frequency":    state["usage_frequency"],
+        "last_reviewed":      state["last_reviewed"],
+        "last_used":          state["last_used"],
+        "decay_rate":         state["decay_rate"],
+        "alert_due_at":       state["alert_due_at"],
+        "last_alerted_at":    state["last_alerted_at"],
+        "alerted_band":       state["alerted_band"],
+    }
+
+
+async def _load_states(
+    db: AsyncSession,
+    item_ids: Iterable[int],
+    user_id: Optional[int] = None,
+) -> Dict[int, dict]:
+    # Rows are locked in id order so concurrent batches can't deadlock
+    query = select(*STATE_COLUMNS).where(KnowledgeItem.id.in_(list(item_ids))).order_by(KnowledgeItem.id)
+    if user_id is not None:
+        query = query.where(KnowledgeItem.user_id == user_id)
+    query = query.with_for_update()
+
+    return {row.id: _state(row._asdict()) for row in await db.execute(query)}
+
+
+def _state(state: dict) -> dict:
+    state["last_reviewed"] = as_utc(state["last_reviewed"])
+    state["last_used"]     = as_utc(state["last_used"])
+    return state
+
+
+def review_update(item_id: int, user_id: int, kind: str, now: datetime) -> ReturningUpdate:
+    """
+    fold() of one event as a single UPDATE … RETURNING ITEM_COLUMNS. Every
+    SET expression reads the row's current values, so concurrent reviews
+    serialise on the row lock and each applies its own EMA step. Returns no
+    row if the item doesn't exist or isn't `user_id`'s.
+    """
+    item = KnowledgeItem.__table__.c
+    rf   = ema_expr(item.revision_frequency) if kind == "review" else item.revision_frequency
+    u    = ema_expr(item.usage_frequency)    if kind == "usage"  else item.usage_frequency
+    k    = decay_rate_expr(item.difficulty, item.interest, item.sleep_quality, item.base_memory, item.attention, rf, u)
+
+    values = {
+        "revision_frequency": rf,
+        "usage_frequency":    u,
+        "last_reviewed":      now,
+        "decay_rate":         k,
+        "alert_due_at":       alert_due_at_expr(item.k0_initial_strength, k, item.memory_floor, timestamp_literal(now)),
+        "last_alerted_at":    None,
+        "alerted_band":       0,
+    }
+    if kind == "usage":
+        values["last_used"] = now
+    return (
+        update(KnowledgeItem.__table__)
+        .where(item.id == item_id, item.user_id == user_id)
+        .values(**values)
+        .returning(*ITEM_COLUMNS)
+    )
+
+
+async def preview_review(db: AsyncSession, item_id: int, user_id: int, kind: str, now: datetime) -> Optional[dict]:
+    """
+    The item's state once its queued events and this one are folded, without
+    writing it (deferred mode). None if the item doesn't exist or isn't
+    `user_id`'s.
+
+    One plain read — the row outer-joined to its queued events, so it sees
+    one consistent snapshot even while the flusher commits — and no lock:
+    the preview is eventually consistent. A review of the same item running
+    at the same moment may be missing from it; the stored aggregates are
+    exact once the flusher has folded both.
+    """
+    queued = (
+        select(ReviewEvent.id, ReviewEvent.item_id, ReviewEvent.kind, ReviewEvent.ts)
+        .join(ReviewEventQueue, ReviewEventQueue.event_id == ReviewEvent.id)
+        .where(ReviewEvent.item_id == item_id)
+        .subquery()
+    )
+    rows = (await db.execute(
+        select(*STATE_COLUMNS, queued.c.kind.label("queued_kind"), queued.c.ts.label("queued_ts"))
+        .outerjoin(queued, queued.c.item_id == KnowledgeItem.id)
+        .where(KnowledgeItem.id == item_id, KnowledgeItem.user_id == user_id)
+        .order_by(queued.c.id)
+    )).all()
+    if not rows:
+        return None
+    state   = _state({k: v for k, v in rows[0]._asdict().items() if k not in ("queued_kind", "queued_ts")})
+    pending = [(r.queued_kind, r.queued_ts) for r in rows if r.queued_kind is not None]
+    return fold(state, [*pending, (kind, now)])
+
+
+# ── Writing ────────────────────────────────────────────────────────────────────
+
+async def apply_reviews(
+    db: AsyncSession,
+    events_by_item: Dict[int, List[Event]],
+    user_id: Optional[int] = None,
+) -> Dict[int, dict]:
+    """
+    Fold events onto their items and save the aggregates with one bulk
+    UPDATE. Items that don't exist (or aren't `user_id`'s) are left out of
+    the result.
+    """
+    states = await _load_states(db, events_by_item, user_id)
+    for item_id, state in states.items():
+        fold(state, events_by_item[item_id])
+    if states:
+        await db.execute(update(KnowledgeItem), [_aggregate_row(s) for s in states.values()])
+    return states
+
+
+async def record_events(
+    db: AsyncSession,
+    user_id: int,
+    events: Iterable[Tuple[int, str, datetime]],
+    queue: bool = False,
+) -> None:
+    """Append (item_id, kind, ts) events; `queue` leaves them for the flusher to fold."""
+    rows = [{"item_id": item_id, "user_id": user_id, "kind": kind, "ts": ts} for item_id, kind, ts in events]
+    if not rows:
+        return
+    if not queue:
+        await db.execute(insert(ReviewEvent.__table__), rows)
+        return
+    ids = (await db.execute(
+        insert(ReviewEvent.__table__).returning(ReviewEvent.id, sort_by_parameter_order=True), rows
+    )).scalars().all()
+    await db.execute(insert(ReviewEventQueue.__table__), [{"event_id": i} for i in ids])
+
+
+async def _bump(states: Dict[int, dict]) -> None:
+    for user_id in {s["user_id"] for s in states.values()}:
+        await insight_cache.bump(user_id)
+
+
+# ── Deferred flush ─────────────────────────────────────────────────────────────
+
+async def flush_review_events(limit: Optional[int] = None) -> int:
+    """Fold every queued event into its item; returns the number of events claimed."""
+    limit   = limit or settings.REVIEW_FLUSH_BATCH
+    started = time.perf_counter()
+    claimed = 0
+
+    async with AsyncSessionLocal() as db:
+        while True:
+            batch = (
+                select(ReviewEventQueue.event_id)
+                .order_by(ReviewEventQueue.event_id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            ids = (await db.execute(
+                delete(ReviewEventQueue)
+                .where(ReviewEventQueue.event_id.in_(batch))
+                .returning(ReviewEventQueue.event_id)
+            )).scalars().all()
+            if not ids:
+                break
+
+            events = defaultdict(list)
+            for e in await db.execute(
+                select(ReviewEvent.item_id, ReviewEvent.kind, ReviewEvent.ts).where(ReviewEvent.id.in_(ids))
+            ):
+                events[e.item_id].append((e.kind, e.ts))
+
+            # Events of deleted items are dropped along with their queue entries
+            states = await apply_reviews(db, events)
+            await db.commit()
+            await _bump(states)
+            claimed += len(ids)
+            if len(ids) < limit:
+                break
+
+    if claimed:
+        print(f"[REVIEWS] Folded {claimed} queued review events in {time.perf_counter() - started:.2f}s")
+    return claimed
+
+
+# ── Replay ─────────────────────────────────────────────────────────────────────
+
+async def rebuild_items(db: AsyncSession, item_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Recompute the review aggregates of `item_ids` from their full event
+    history, starting from INITIAL_STATE. Queued events are folded here too,
+    so they are taken off the queue.
+    """
+    states = await _load_states(db, item_ids)
+    if not states:
+        return states
+
+    history = defaultdict(list)
+    for e in await db.execute(
+        select(ReviewEvent.item_id, ReviewEvent.kind, ReviewEvent.ts)
+        .where(ReviewEvent.item_id.in_(list(states)))
+        .order_by(ReviewEvent.item_id, ReviewEvent.ts, ReviewEvent.id)
+    ):
+        history[e.item_id].append((e.kind, e.ts))
+
+    for item_id, state in states.items():
+        state.update(INITIAL_STATE)
+        fold(state, history[item_id])
+
+    await db.execute(
+        delete(ReviewEventQueue).where(ReviewEventQueue.event_id.in_(
+            select(ReviewEvent.id).where(ReviewEvent.item_id.in_(list(states)))
+        ))
+    )
+    await db.execute(update(KnowledgeItem), [_aggregate_row(s) for s in states.values()])
+    return states
+
+
+async def _replay(item_ids: List[int]) -> None:
+    async with AsyncSessionLocal() as db:
+        states = await rebuild_items(db, item_ids)
+        await db.commit()
+    await _bump(states)
+    print(f"[REVIEWS] Rebuilt {len(states)} of {len(item_ids)} items from the review log")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser   = argparse.ArgumentParser(prog="python -m app.review_log")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("flush", help="fold queued review events now")
+    replay = commands.add_parser("replay", help="rebuild items' review fields from the log")
+    replay.add_argument("item_ids", type=int, nargs="+")
+
+    args = parser.parse_args(argv)
+    if args.command == "flush":
+        asyncio.run(flush_review_events())
+    else:
+        asyncio.run(_replay(args.item_ids))
+
+
+if __name__ == "__main__":
+    main()
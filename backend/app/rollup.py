@@ -0,0 +1,239 @@
+"""
+Nightly retention rollup — one `retention_daily` row per user per day.
+
+The row for day D describes the user's items as of midnight (UTC) of D:
+average retention, how many are below 60 % / 40 %, and the average finite
+half-life. `/insights/timeline` serves long ranges from these rows with a
+single range read on the (user_id, day) key.
+
+Each run only fills the days after a user's latest stored row, capped at
+ROLLUP_BACKFILL_DAYS; days already stored are kept as they are.
+
+  • today      — snapshot of the live items (decay from last review)
+  • older gaps — rebuilt from review history: on day D an item decays from
+                 its latest review before D, with the k that review left it
+                 with (refolded from review_events, see app/review_log.py).
+                 From last_reviewed on, the live row is exact. Before an
+                 item's first logged review it decays from created_at.
+
+Reviews made before the log existed are missing from it, so an item reviewed
+only then decays from created_at until its last_reviewed. Rows are upserted
+on (user_id, day), so overlapping runs are harmless.
+"""
+
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Insert, Row, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.decay import (
+    column, compute_half_life_batch, compute_item_batch, compute_retention_batch, epoch_seconds,
+)
+from app.insight_cache import insight_cache
+from app.models import KnowledgeItem, RetentionDaily, ReviewEvent
+from app.review_log import INITIAL_STATE, Event, as_utc, fold
+
+ROLLUP_COLUMNS = (
+    KnowledgeItem.id,
+    KnowledgeItem.k0_initial_strength,
+    KnowledgeItem.decay_rate,
+    KnowledgeItem.memory_floor,
+    KnowledgeItem.last_reviewed,
+    KnowledgeItem.created_at,
+    # What fold() needs to recompute k after each logged review
+    KnowledgeItem.difficulty,
+    KnowledgeItem.interest,
+    KnowledgeItem.sleep_quality,
+    KnowledgeItem.base_memory,
+    KnowledgeItem.attention,
+)
+
+Segment = Tuple[float, float, float]    # (from_ts, anchor_ts, k)
+
+STAT_COLUMNS = ("item_count", "avg_retention", "items_below_60", "items_below_40", "avg_half_life")
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time()).replace(tzinfo=timezone.utc)
+
+
+def _avg_half_life(half_life: np.ndarray) -> Optional[float]:
+    finite = half_life[np.isfinite(half_life)]
+    return float(finite.mean()) if finite.size else None
+
+
+def _segments(item: Row, events: Sequence[Event]) -> List[Segment]:
+    """
+    Where `item` decays from over time: from `from_ts` on it decays from
+    `anchor_ts` at rate k. Replays its logged reviews from INITIAL_STATE.
+    """
+    state    = {**item._asdict(), **INITIAL_STATE}
+    created  = epoch_seconds([item.created_at])[0]
+    segments = [(-np.inf, created, fold(state, [])["decay_rate"])]
+    for kind, ts in events:
+        fold(state, [(kind, ts)])
+        reviewed = as_utc(ts).timestamp()
+        segments.append((reviewed, reviewed, state["decay_rate"]))
+    return segments
+
+
+def iter_history_grid(
+    items: Sequence[Row],
+    history: Dict[int, List[Event]],
+    start_ts: float,
+    n_days: int,
+    max_cells: int = 1_000_000,
+) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    Retention and k of every item at `start_ts`, `start_ts` + 1 day, …
+    (`n_days` points), following each item's review history. Like
+    iter_retention_grid, elapsed time is counted in whole days and
+    `(first_day_offset, retention, k)` grids (days × items) are yielded at
+    most `max_cells` cells at a time.
+    """
+    k0      = column(items, "k0_initial_strength")
+    k_now   = column(items, "decay_rate")
+    floor   = column(items, "memory_floor")
+    created = epoch_seconds([i.created_at for i in items])
+    last    = np.full(len(items), np.nan)
+    seen    = [j for j, i in enumerate(items) if i.last_reviewed is not None]
+    last[seen] = epoch_seconds([items[j].last_reviewed for j in seen])
+    logged  = [(j, _segments(i, history[i.id])) for j, i in enumerate(items) if history.get(i.id)]
+
+    step = max(1, max_cells // max(len(items), 1))
+    for lo in range(0, n_days, step):
+        day_ts = start_ts + 86400.0 * np.arange(lo, min(lo + step, n_days))
+        anchor = np.tile(created, (day_ts.size, 1))
+        k      = np.tile(k_now, (day_ts.size, 1))
+        for j, segments in logged:
+            for from_ts, anchor_ts, rate in segments:
+                since = np.searchsorted(day_ts, from_ts)
+                anchor[since:, j] = anchor_ts
+                k[since:, j]      = rate
+
+        # From the live last review on, the row itself is exact
+        with np.errstate(invalid="ignore"):
+            live = day_ts[:, None] >= last
+        anchor  = np.where(live, last, anchor)
+        k       = np.where(live, k_now, k)
+        elapsed = np.maximum(np.floor((day_ts[:, None] - anchor) / 86400), 0)
+        yield lo, compute_retention_batch(k0, k, elapsed, floor), k
+
+
+def _row(user_id: int, day: date, retention: np.ndarray, half_life: Optional[float]) -> dict:
+    return {
+        "user_id":        user_id,
+        "day":            day,
+        "item_count":     int(retention.size),
+        "avg_retention":  float(retention.mean()),
+        "items_below_60": int(np.count_nonzero(retention < 60)),
+        "items_below_40": int(np.count_nonzero(retention < 40)),
+        "avg_half_life":  half_life,
+    }
+
+
+def rollup_rows(
+    user_id: int,
+    items: Sequence[Row],
+    first: date,
+    today: date,
+    history: Optional[Dict[int, List[Event]]] = None,
+) -> List[dict]:
+    """
+    Rollup rows for first..today (inclusive); empty if first > today.
+    `history` maps item id → its logged (kind, ts) reviews before today.
+    """
+    if first > today or not items:
+        return []
+
+    rows  = []
+    grids = iter_history_grid(items, history or {}, _midnight(first).timestamp(), (today - first).days)
+    for lo, grid, k in grids:
+        half_life = compute_half_life_batch(k)
+        for offset in range(len(grid)):
+            rows.append(_row(user_id, first + timedelta(days=lo + offset), grid[offset],
+                             _avg_half_life(half_life[offset])))
+
+    live = compute_item_batch(items, _midnight(today))
+    rows.append(_row(user_id, today, live.retention, _avg_half_life(live.half_life)))
+    return rows
+
+
+async def load_history(db: AsyncSession, user_id: int, before: datetime) -> Dict[int, List[Event]]:
+    """Every logged review of the user's items before `before`, per item, oldest first."""
+    history = defaultdict(list)
+    for e in await db.execute(
+        select(ReviewEvent.item_id, ReviewEvent.kind, ReviewEvent.ts)
+        .where(
+            ReviewEvent.item_id.in_(select(KnowledgeItem.id).where(KnowledgeItem.user_id == user_id)),
+            ReviewEvent.ts < before,
+        )
+        .order_by(ReviewEvent.item_id, ReviewEvent.ts, ReviewEvent.id)
+    ):
+        history[e.item_id].append((e.kind, e.ts))
+    return history
+
+
+def upsert_rows(dialect: str) -> Insert:
+    """
+    INSERT into retention_daily that overwrites an existing (user_id, day) row,
+    so overlapping scheduler instances or a re-run can't fail on the key.
+    """
+    if dialect == "postgresql":
+        stmt = postgresql.insert(RetentionDaily)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(RetentionDaily)
+    else:
+        return insert(RetentionDaily)
+    return stmt.on_conflict_do_update(
+        index_elements = [RetentionDaily.user_id, RetentionDaily.day],
+        set_           = {c: stmt.excluded[c] for c in STAT_COLUMNS},
+    )
+
+
+async def run_retention_rollup(today: Optional[date] = None) -> int:
+    """Fill every user's missing days up to and including today; returns rows written."""
+    today   = today or datetime.now(timezone.utc).date()
+    oldest  = today - timedelta(days=settings.ROLLUP_BACKFILL_DAYS - 1)
+    started = time.perf_counter()
+    written = 0
+
+    async with AsyncSessionLocal() as db:
+        latest: Dict[int, date] = dict((await db.execute(
+            select(RetentionDaily.user_id, func.max(RetentionDaily.day)).group_by(RetentionDaily.user_id)
+        )).all())
+        user_ids = (await db.execute(select(KnowledgeItem.user_id).distinct())).scalars().all()
+
+        for user_id in user_ids:
+            if latest.get(user_id) and latest[user_id] >= today:
+                continue
+            items = (await db.execute(
+                select(*ROLLUP_COLUMNS).where(KnowledgeItem.user_id == user_id)
+            )).all()
+
+            if user_id in latest:
+                first = latest[user_id] + timedelta(days=1)
+            else:
+                created = epoch_seconds([i.created_at for i in items]).min()
+                first   = datetime.fromtimestamp(created, timezone.utc).date()
+            first   = max(first, oldest)
+            history = await load_history(db, user_id, _midnight(today)) if first < today else {}
+            rows    = rollup_rows(user_id, items, first, today, history)
+            if not rows:
+                continue
+
+            await db.execute(upsert_rows(db.get_bind().dialect.name), rows)
+            await db.commit()
+            await insight_cache.bump(user_id)
+            written += len(rows)
+
+    print(f"[ROLLUP] {written} retention_daily rows for {len(user_ids)} users "
+          f"in {time.perf_counter() - started:.2f}s")
+    return written
@@ -1,31 +1,138 @@
-from datetime import datetime, timezone, timedelta
-from typing import List
+import math
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.config import settings
 from app.database import get_db
-from app.models import KnowledgeItem
-from app.schemas import WeakItem, DailyRetention, InsightSummary
+from app.decay import compute_half_life
+from app.models import KnowledgeItem, RetentionDaily
+from app.schemas import WeakItem, DailyRetention, InsightSummary, InsightDashboard
 from app.auth import get_current_user_id
-from app.decay import compute_retention, compute_half_life, compute_time_to_forget
+from app.insight_cache import insight_cache
+from app.insight_engine import GRANULARITIES, InsightEngine, parse_sections
 
 router = APIRouter(prefix="/insights", tags=["insights"])
 
+# Everything the engine reads, as lightweight rows — never `content`
+INSIGHT_COLUMNS = tuple(c for c in KnowledgeItem.__table__.columns if c.name != "content")
 
-def _days_elapsed(item: KnowledgeItem) -> float:
-    now  = datetime.now(timezone.utc)
-    last = item.last_reviewed or item.created_at
-    if last and last.tzinfo is None:
-        last = last.replace(tzinfo=timezone.utc)
-    return max((now - last).total_seconds() / 86400, 0)
+GRANULARITY_PATTERN = f"^({'|'.join(GRANULARITIES)})$"
 
 
-def _retention(item: KnowledgeItem) -> float:
-    return compute_retention(
-        item.k0_initial_strength, item.decay_rate, _days_elapsed(item), item.memory_floor
+async def _load_rollup(db: AsyncSession, user_id: int, first: date, last: date) -> Dict[date, float]:
+    """Stored daily averages for first..last — one range read on the (user_id, day) key."""
+    result = await db.execute(
+        select(RetentionDaily.day, RetentionDaily.avg_retention)
+        .where(RetentionDaily.user_id == user_id, RetentionDaily.day.between(first, last))
     )
+    return dict(result.all())
+
+
+async def _load_engine(db: AsyncSession, user_id: int, names: List[str], **params) -> InsightEngine:
+    """
+    Engine for the given sections. The timeline reads the rollup first, and
+    items are only loaded if some section still needs them.
+    """
+    now, items, rollup = datetime.now(timezone.utc), [], {}
+    if "timeline" in names:
+        days   = params.get("timeline_days", 30)
+        rollup = await _load_rollup(db, user_id, now.date() - timedelta(days=days - 1), now.date())
+
+    query = select(*INSIGHT_COLUMNS).where(KnowledgeItem.user_id == user_id)
+    if names == ["hardest"]:
+        items = await _hardest_candidates(db, query, params.get("limit", 10))
+    elif names != ["timeline"] or len(rollup) < days:
+        items = (await db.execute(query)).all()
+    return InsightEngine(items, now=now, rollup=rollup)
+
+
+async def _hardest_candidates(db: AsyncSession, query, limit: int) -> list:
+    """
+    Enough rows for InsightEngine.hardest(limit) to return exactly what it
+    would from every row. Shortest half-life = largest k, so the top `limit`
+    come from a walk of idx_user_decay_rate_id; the engine ranks by half-life
+    rounded to 0.1 and then id, so rows past the limit whose rounded
+    half-life ties the last one are added — one of them may have a lower id.
+    """
+    top = (await db.execute(
+        query.order_by(KnowledgeItem.decay_rate.desc(), KnowledgeItem.id).limit(limit)
+    )).all()
+    if len(top) < limit:
+        return top
+
+    last      = top[-1].decay_rate
+    half_life = round(compute_half_life(last), 1)
+    ties      = query.where(KnowledgeItem.decay_rate <= last, KnowledgeItem.id.not_in([r.id for r in top]))
+    if math.isfinite(half_life):
+        # Every k whose half-life rounds to `half_life` (with float slack; the engine re-checks)
+        ties = ties.where(KnowledgeItem.decay_rate >= math.log(2) / (half_life + 0.05) * (1 - 1e-9))
+    return top + (await db.execute(ties)).all()
+
+
+# Parameters each section's result depends on (part of its cache key)
+SECTION_PARAMS = {
+    "weakest":          ("limit",),
+    "hardest":          ("limit",),
+    "most_reviewed":    ("limit",),
+    "upcoming_forgets": ("days",),
+    "timeline":         ("timeline_days", "granularity"),
+}
+
+
+def _section_id(name: str, params: Dict[str, object]) -> str:
+    """Section name plus the parameters its result depends on."""
+    return ":".join([name] + [f"{p}={params[p]}" for p in SECTION_PARAMS.get(name, ()) if p in params])
+
+
+async def _sections(db: AsyncSession, user_id: int, names: List[str], **params) -> Dict[str, object]:
+    """Cached sections where possible; the rest computed from one load of the items."""
+    generation = await insight_cache.generation(user_id)
+    if generation is None:
+        return (await _load_engine(db, user_id, names, **params)).compute(names, **params)
+
+    keys    = {n: insight_cache.key(user_id, generation, _section_id(n, params)) for n in names}
+    found   = await insight_cache.get_many(keys)
+    missing = [n for n in names if n not in found]
+    if missing:
+        computed = (await _load_engine(db, user_id, missing, **params)).compute(missing, **params)
+        stored   = await insight_cache.set_many({keys[n]: v for n, v in computed.items()})
+        found.update({n: stored[keys[n]] for n in missing})
+    return {n: found[n] for n in names}
+
+
+async def _section(db: AsyncSession, user_id: int, name: str, **params) -> object:
+    return (await _sections(db, user_id, [name], **params))[name]
+
+
+# ── 0. Dashboard (every section, one load) ─────────────────────────────────────
+
+@router.get("/dashboard", response_model=InsightDashboard, response_model_exclude_none=True)
+async def get_dashboard(
+    sections: Optional[str] = Query(None, description="Comma-separated, e.g. summary,weakest,upcoming-forgets"),
+    limit:    int = Query(10, ge=1, le=100),
+    days:     int = Query(30, ge=1, le=90),
+    timeline_days: int = Query(30, ge=1, le=settings.TIMELINE_MAX_DAYS),
+    granularity:   str = Query("daily", pattern=GRANULARITY_PATTERN),
+    db:       AsyncSession = Depends(get_db),
+    user_id:  int          = Depends(get_current_user_id),
+):
+    try:
+        names = parse_sections(sections)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return await _sections(db, user_id, names, limit=limit, days=days,
+                           timeline_days=timeline_days, granularity=granularity)
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss counters for this process's insight cache."""
+    return {**insight_cache.stats, "local_entries": len(insight_cache.local)}
 
 
 # ── 1. Weakest topics ──────────────────────────────────────────────────────────
@@ -36,21 +143,7 @@ async def get_weakest_topics(
     db:      AsyncSession = Depends(get_db),
     user_id: int          = Depends(get_current_user_id),
 ):
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.user_id == user_id))
-    items  = result.scalars().all()
-
-    rows = [
-        WeakItem(
-            id                = i.id,
-            topic             = i.topic,
-            retention         = round(_retention(i), 1),
-            half_life         = round(compute_half_life(i.decay_rate), 1),
-            days_since_review = round(_days_elapsed(i), 1),
-        )
-        for i in items
-    ]
-    rows.sort(key=lambda x: x.retention)
-    return rows[:limit]
+    return await _section(db, user_id, "weakest", limit=limit)
 
 
 # ── 2. Summary stats ───────────────────────────────────────────────────────────
@@ -60,57 +153,20 @@ async def get_summary(
     db:      AsyncSession = Depends(get_db),
     user_id: int          = Depends(get_current_user_id),
 ):
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.user_id == user_id))
-    items  = result.scalars().all()
-
-    if not items:
-        return InsightSummary(total_items=0, avg_retention=0, avg_half_life=0,
-                              items_below_60=0, items_below_40=0, items_near_floor=0)
-
-    retentions = [_retention(i) for i in items]
-    half_lives = [compute_half_life(i.decay_rate) for i in items]
-    floors     = [i.memory_floor * 100 for i in items]
-
-    return InsightSummary(
-        total_items      = len(items),
-        avg_retention    = round(sum(retentions) / len(retentions), 1),
-        avg_half_life    = round(sum(half_lives) / len(half_lives), 1),
-        items_below_60   = sum(1 for r in retentions if r < 60),
-        items_below_40   = sum(1 for r in retentions if r < 40),
-        items_near_floor = sum(1 for r, m in zip(retentions, floors) if r < m + 5),
-    )
+    return await _section(db, user_id, "summary")
 
 
-# ── 3. Retention timeline (last 30 days) ──────────────────────────────────────
+# ── 3. Retention timeline (last 30 days by default, up to TIMELINE_MAX_DAYS) ──
 
 @router.get("/timeline", response_model=List[DailyRetention])
 async def get_retention_timeline(
-    db:      AsyncSession = Depends(get_db),
-    user_id: int          = Depends(get_current_user_id),
+    days:        int = Query(30, ge=1, le=settings.TIMELINE_MAX_DAYS),
+    granularity: str = Query("daily", pattern=GRANULARITY_PATTERN),
+    db:          AsyncSession = Depends(get_db),
+    user_id:     int          = Depends(get_current_user_id),
 ):
-    """Average retention across all items for each of the past 30 days."""
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.user_id == user_id))
-    items  = result.scalars().all()
-    if not items:
-        return []
-
-    today  = datetime.now(timezone.utc).date()
-    points = []
-    for day_offset in range(29, -1, -1):
-        target = today - timedelta(days=day_offset)
-        # Compute K(t) as of that date using created_at as reference
-        day_retentions = []
-        for item in items:
-            created = item.created_at
-            if created and created.tzinfo is None:
-                created = created.replace(tzinfo=timezone.utc)
-            elapsed = max((datetime.combine(target, datetime.min.time()).replace(tzinfo=timezone.utc) - created).days, 0)
-            r = compute_retention(item.k0_initial_strength, item.decay_rate, elapsed, item.memory_floor)
-            day_retentions.append(r)
-        avg = sum(day_retentions) / len(day_retentions)
-        points.append(DailyRetention(date=str(target), retention=round(avg, 1)))
-
-    return points
+    """Average retention across all items for each of the past `days` days (or 7-day buckets)."""
+    return await _section(db, user_id, "timeline", timeline_days=days, granularity=granularity)
 
 
 # ── 4. Hardest topics (highest k) ─────────────────────────────────────────────
@@ -121,20 +177,7 @@ async def get_hardest_topics(
     db:      AsyncSession = Depends(get_db),
     user_id: int          = Depends(get_current_user_id),
 ):
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.user_id == user_id))
-    items  = result.scalars().all()
-    rows   = [
-        WeakItem(
-            id                = i.id,
-            topic             = i.topic,
-            retention         = round(_retention(i), 1),
-            half_life         = round(compute_half_life(i.decay_rate), 1),
-            days_since_review = round(_days_elapsed(i), 1),
-        )
-        for i in items
-    ]
-    rows.sort(key=lambda x: x.half_life)   # shortest half-life = hardest
-    return rows[:limit]
+    return await _section(db, user_id, "hardest", limit=limit)
 
 
 # ── 5. Upcoming forgets (next 30 days) ────────────────────────────────────────
@@ -145,29 +188,7 @@ async def get_upcoming_forgets(
     db:      AsyncSession = Depends(get_db),
     user_id: int          = Depends(get_current_user_id),
 ):
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.user_id == user_id))
-    items  = result.scalars().all()
-
-    now  = datetime.now(timezone.utc)
-    rows = []
-    for item in items:
-        t_forget = compute_time_to_forget(
-            item.k0_initial_strength, item.decay_rate, item.memory_floor
-        )
-        elapsed = _days_elapsed(item)
-        days_remaining = t_forget - elapsed
-        if 0 < days_remaining <= days:
-            forget_date = (now + timedelta(days=days_remaining)).date()
-            rows.append({
-                "id":           item.id,
-                "topic":        item.topic,
-                "forget_date":  str(forget_date),
-                "days_left":    round(days_remaining, 1),
-                "retention":    round(_retention(item), 1),
-            })
-
-    rows.sort(key=lambda x: x["days_left"])
-    return rows
+    return await _section(db, user_id, "upcoming_forgets", days=days)
 
 
 # ── 6. Most reviewed items ─────────────────────────────────────────────────────
@@ -178,20 +199,7 @@ async def get_most_reviewed(
     db:      AsyncSession = Depends(get_db),
     user_id: int          = Depends(get_current_user_id),
 ):
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.user_id == user_id))
-    items  = result.scalars().all()
-    rows   = [
-        {
-            "id":                 i.id,
-            "topic":              i.topic,
-            "revision_frequency": round(i.revision_frequency, 3),
-            "usage_frequency":    round(i.usage_frequency, 3),
-            "retention":          round(_retention(i), 1),
-        }
-        for i in items
-    ]
-    rows.sort(key=lambda x: -(x["revision_frequency"] + x["usage_frequency"]))
-    return rows[:limit]
+    return await _section(db, user_id, "most_reviewed", limit=limit)
 
 
 # ── 7. Sleep quality impact ────────────────────────────────────────────────────
@@ -202,25 +210,4 @@ async def get_sleep_impact(
     user_id: int          = Depends(get_current_user_id),
 ):
     """Show how today's sleep quality affects decay rates across all items."""
-    from app.decay import compute_decay_rate as cdr
-
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.user_id == user_id))
-    items  = result.scalars().all()
-
-    rows = []
-    for item in items:
-        k_good_sleep = cdr(item.difficulty, item.interest, 0.9, item.base_memory, item.attention,
-                           item.revision_frequency, item.usage_frequency)
-        k_poor_sleep = cdr(item.difficulty, item.interest, 0.3, item.base_memory, item.attention,
-                           item.revision_frequency, item.usage_frequency)
-        rows.append({
-            "id":              item.id,
-            "topic":           item.topic,
-            "current_k":       round(item.decay_rate, 4),
-            "k_good_sleep":    round(k_good_sleep, 4),
-            "k_poor_sleep":    round(k_poor_sleep, 4),
-            "decay_multiplier": round(k_poor_sleep / k_good_sleep, 2) if k_good_sleep > 0 else None,
-        })
-
-    rows.sort(key=lambda x: -(x["decay_multiplier"] or 0))
-    return rows
+    return await _section(db, user_id, "sleep_impact")
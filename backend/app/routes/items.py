@@ -1,44 +1,110 @@
+import base64
+import json
+import math
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, insert, literal, select, tuple_
+from sqlalchemy.sql.expression import ColumnElement
 
+from app.config import settings
 from app.database import get_db
 from app.models import KnowledgeItem
-from app.schemas import ItemCreate, ItemOut, ItemUpdate
+from app.schemas import ItemBulkResult, ItemCreate, ItemOut, ItemUpdate
 from app.auth import get_current_user_id
+from app.insight_cache import insight_cache
+from app.decay_sql import retention_expr
+from app.serializers import (
+    ITEM_COLUMNS,
+    FastJSONResponse,
+    encode_items,
+    enrich_rows,
+    item_columns,
+    orjson_safe,
+)
 from app.decay import (
+    column,
     compute_k0,
+    compute_k0_batch,
     compute_decay_rate,
-    compute_retention,
-    compute_half_life,
-    compute_time_to_forget,
+    compute_decay_rate_batch,
+    compute_alert_due_at_batch,
 )
 
 router = APIRouter(prefix="/items", tags=["items"])
 
+DECAYING_SLACK = 0.01   # retention points added to the SQL threshold
+
+# GET /items sort keys. Each is served by a (user_id, key, id) index except
+# retention, which is evaluated in SQL at query time (see decay_sql.py)
+SORT_KEYS = {
+    "id":         KnowledgeItem.id,
+    "created_at": KnowledgeItem.created_at,
+    "decay_rate": KnowledgeItem.decay_rate,
+    "topic":      KnowledgeItem.topic,
+    "retention":  None,
+}
+SORT_PATTERN = "^-?(" + "|".join(SORT_KEYS) + ")$"
+
+# JSON type of each sort key's cursor value (created_at travels as ISO 8601)
+CURSOR_VALUE_TYPES = {
+    "id":         int,
+    "created_at": str,
+    "decay_rate": (int, float),
+    "topic":      str,
+    "retention":  (int, float),
+}
+
+# List endpoints leave `content` out (null) unless asked for
+INCLUDE_PATTERN = "^content$"
+
+
+def _encode_cursor(position: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def _checked(position: dict, field: str, types) -> Any:
+    value = position[field]
+    if isinstance(value, bool) or not isinstance(value, types):
+        raise TypeError(f"{field!r} has the wrong type")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"{field!r} is not finite")
+    return value
 
-def _enrich(item: KnowledgeItem) -> dict:
-    """Add computed decay fields to a KnowledgeItem dict."""
-    now = datetime.now(timezone.utc)
-    last = item.last_reviewed or item.created_at
-    # Ensure timezone-aware comparison
-    if last and last.tzinfo is None:
-        last = last.replace(tzinfo=timezone.utc)
-    days_elapsed = max((now - last).total_seconds() / 86400, 0)
 
-    retention    = compute_retention(item.k0_initial_strength, item.decay_rate, days_elapsed, item.memory_floor)
-    half_life    = compute_half_life(item.decay_rate)
-    days_forget  = compute_time_to_forget(item.k0_initial_strength, item.decay_rate, item.memory_floor)
+def _decode_cursor(cursor: str, sort: str) -> dict:
+    """
+    The cursor's position — `v` (sort value), `id`, and for retention `t`
+    (the first page's snapshot time) — parsed into the types `sort` compares
+    with. Anything else, including a cursor from another sort, is a 400.
+    """
+    key = sort.lstrip("-")
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(position, dict) or position.get("s") != sort:
+            raise ValueError("cursor was issued for a different sort")
+        value = _checked(position, "v", CURSOR_VALUE_TYPES[key])
+        if key == "created_at":
+            value = datetime.fromisoformat(value)
+        snapshot = None
+        if key == "retention":
+            snapshot = datetime.fromisoformat(_checked(position, "t", str))
+        return {"v": value, "id": _checked(position, "id", int), "t": snapshot}
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
 
-    d = {c.name: getattr(item, c.name) for c in item.__table__.columns}
-    d["current_retention"]  = round(retention, 2)
-    d["half_life_days"]     = round(half_life, 2)
-    d["days_to_forget"]     = round(days_forget, 2)
-    d["days_since_review"]  = round(days_elapsed, 2)
-    return d
+
+def topic_prefix_filter(prefix: str) -> ColumnElement:
+    """Case-insensitive `topic` prefix match; served by idx_user_topic_lower."""
+    return func.lower(KnowledgeItem.topic).startswith(prefix.lower(), autoescape=True)
+
+
+def _enrich(item: KnowledgeItem, status_code: int = 200):
+    """Single item with its computed decay fields, encoded for the response."""
+    return encode_items(enrich_rows([item])[0], status_code)
 
 
 # ── POST /api/items ────────────────────────────────────────────────────────────
@@ -73,36 +139,149 @@ async def create_item(
         sleep_quality       = payload.sleep_quality,
         memory_floor        = payload.memory_floor,
     )
+    item.reschedule_alert(datetime.now(timezone.utc))
     db.add(item)
     await db.flush()
     await db.refresh(item)
-    return _enrich(item)
+    await db.commit()
+    await insight_cache.bump(user_id)
+    return _enrich(item, status_code=201)
+
+
+# ── POST /api/items/bulk ───────────────────────────────────────────────────────
+
+@router.post("/bulk", response_model=ItemBulkResult, status_code=201)
+async def create_items_bulk(
+    payload: List[Dict[str, Any]] = Body(..., max_length=settings.BULK_MAX_ITEMS),
+    atomic:  bool                 = Query(False, description="Reject the whole batch if any row is invalid"),
+    db:      AsyncSession         = Depends(get_db),
+    user_id: int                  = Depends(get_current_user_id),
+):
+    """
+    Create many items with one multi-row INSERT … RETURNING; K₀, k and
+    alert_due_at are computed column-wise for the whole batch.
+
+    Each row is validated as an ItemCreate on its own. Invalid rows are
+    skipped and reported in `errors` by array index — or, with atomic=true,
+    reject the whole request (422) so nothing is inserted.
+    """
+    valid:  List[ItemCreate] = []
+    errors: List[dict]       = []
+    for index, raw in enumerate(payload):
+        try:
+            valid.append(ItemCreate.model_validate(raw))
+        except ValidationError as e:
+            errors.append({
+                "index":  index,
+                "errors": e.errors(include_url=False, include_context=False, include_input=False),
+            })
+    if errors and atomic:
+        raise HTTPException(status_code=422, detail=errors)
+
+    created = []
+    if valid:
+        now = datetime.now(timezone.utc)
+        attention, interest, difficulty = (column(valid, f) for f in ("attention", "interest", "difficulty"))
+        base_memory, sleep_quality      = column(valid, "base_memory"), column(valid, "sleep_quality")
+        memory_floor                    = column(valid, "memory_floor")
+
+        k0  = compute_k0_batch(attention, interest, base_memory)
+        k   = compute_decay_rate_batch(difficulty, interest, sleep_quality, base_memory, attention, 0.0, 0.0)
+        due = compute_alert_due_at_batch(k0, k, memory_floor, now)
+
+        rows = [
+            {**p.model_dump(), "user_id": user_id, "k0_initial_strength": k0_i, "decay_rate": k_i, "alert_due_at": due_i}
+            for p, k0_i, k_i, due_i in zip(valid, k0.tolist(), k.tolist(), due)
+        ]
+        result = await db.execute(
+            insert(KnowledgeItem.__table__).returning(*ITEM_COLUMNS, sort_by_parameter_order=True), rows
+        )
+        created = enrich_rows(result.all(), now)
+        await db.commit()
+        await insight_cache.bump(user_id)
+
+    content = {"created": created, "errors": errors}
+    return FastJSONResponse(content, status_code=201) if orjson_safe(created) else content
 
 
 # ── GET /api/items ─────────────────────────────────────────────────────────────
 
 @router.get("/", response_model=List[ItemOut])
 async def list_items(
-    db:      AsyncSession = Depends(get_db),
-    user_id: int          = Depends(get_current_user_id),
+    response: Response,
+    limit:    int           = Query(100, ge=1, le=500),
+    after:    Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    sort:     str           = Query("id", pattern=SORT_PATTERN),
+    topic:    Optional[str] = Query(None, max_length=200, description="Topic prefix, case-insensitive"),
+    include:  Optional[str] = Query(None, pattern=INCLUDE_PATTERN, description="\"content\" to load item notes"),
+    db:       AsyncSession  = Depends(get_db),
+    user_id:  int           = Depends(get_current_user_id),
 ):
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.user_id == user_id))
-    items  = result.scalars().all()
-    return [_enrich(i) for i in items]
+    """
+    One page of items, keyset-paginated on (sort key, id). `sort` is one of
+    SORT_KEYS, prefixed with "-" for descending. Retention pages are ordered
+    by K(t) at the moment of the first page so later pages stay consistent.
+    `content` is null unless include=content.
+
+    Every sort but retention reads one index range per page. K(t) depends
+    on the snapshot time, so no index can serve it: each retention page
+    evaluates it for all of the user's items past the cursor and keeps the
+    top `limit` — a scan of the user's items, not bounded by the page size.
+    """
+    now        = datetime.now(timezone.utc)
+    key        = sort.lstrip("-")
+    descending = sort.startswith("-")
+    cursor     = _decode_cursor(after, sort) if after else None
+
+    if key == "retention":
+        snapshot = cursor["t"] if cursor else now
+        sort_col = retention_expr(snapshot)
+    else:
+        sort_col = SORT_KEYS[key]
+
+    query = select(*item_columns(include == "content"), sort_col.label("sort_value")).where(KnowledgeItem.user_id == user_id)
+    if topic:
+        query = query.where(topic_prefix_filter(topic))
+    if cursor:
+        position = tuple_(sort_col, KnowledgeItem.id)
+        boundary = tuple_(literal(cursor["v"], sort_col.type), literal(cursor["id"]))
+        query    = query.where(position < boundary if descending else position > boundary)
+
+    order = (sort_col.desc(), KnowledgeItem.id.desc()) if descending else (sort_col, KnowledgeItem.id)
+    rows  = (await db.execute(query.order_by(*order).limit(limit + 1))).all()
+
+    page = rows[:limit]
+    if len(rows) > limit:
+        last = page[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor({
+            "s":  sort,
+            "v":  last.sort_value.isoformat() if key == "created_at" else last.sort_value,
+            "id": last.id,
+            "t":  snapshot.isoformat() if key == "retention" else None,
+        })
+    return encode_items(enrich_rows(page, now), response=response)
 
 
 # ── GET /api/items/decaying ────────────────────────────────────────────────────
 
 @router.get("/decaying", response_model=List[ItemOut])
 async def get_decaying_items(
-    threshold: float = 60.0,
-    db:        AsyncSession = Depends(get_db),
-    user_id:   int          = Depends(get_current_user_id),
+    threshold: float         = 60.0,
+    include:   Optional[str] = Query(None, pattern=INCLUDE_PATTERN, description="\"content\" to load item notes"),
+    db:        AsyncSession  = Depends(get_db),
+    user_id:   int           = Depends(get_current_user_id),
 ):
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.user_id == user_id))
-    items  = result.scalars().all()
-    enriched = [_enrich(i) for i in items]
-    return [e for e in enriched if e["current_retention"] < threshold]
+    # The database evaluates K(t) and returns only candidates; the slack covers
+    # rounding (the response filters on the 2-dp value) and SQL clock precision.
+    now    = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(*item_columns(include == "content")).where(
+            KnowledgeItem.user_id == user_id,
+            retention_expr(now) < threshold + DECAYING_SLACK,
+        )
+    )
+    enriched = enrich_rows(result.all(), now)
+    return encode_items([e for e in enriched if e["current_retention"] < threshold])
 
 
 # ── GET /api/items/{id} ────────────────────────────────────────────────────────
@@ -145,8 +324,11 @@ async def update_item(
         item.base_memory, item.attention,
         item.revision_frequency, item.usage_frequency,
     )
+    item.reschedule_alert(item.last_reviewed or item.created_at)
     await db.flush()
     await db.refresh(item)
+    await db.commit()
+    await insight_cache.bump(user_id)
     return _enrich(item)
 
 
@@ -162,3 +344,5 @@ async def delete_item(
     if not item or item.user_id != user_id:
         raise HTTPException(status_code=404, detail="Item not found")
     await db.delete(item)
+    await db.commit()
+    await insight_cache.bump(user_id)
@@ -1,13 +1,18 @@
+from collections import defaultdict
 from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import get_db
-from app.models import KnowledgeItem
-from app.schemas import ReviewSubmit, ItemOut
+from app.schemas import ReviewBatchEntry, ReviewSubmit, ItemOut
 from app.auth import get_current_user_id
-from app.decay import compute_decay_rate, compute_retention, compute_half_life, compute_time_to_forget, update_ema
+from app.insight_cache import insight_cache
+from app.review_log import apply_reviews, as_utc, event_kind, preview_review, record_events, review_update
+from app.serializers import encode_items, enrich_rows
 
 router = APIRouter(prefix="/items", tags=["reviews"])
 
@@ -25,44 +30,65 @@ async def submit_review(
     - If used_in_practice=False → increments Rf (passive review)
     - If used_in_practice=True  → increments U  (active usage, 2× more effective)
 
-    After updating Rf/U, k is recomputed. last_reviewed is always updated.
+    After updating Rf/U, k is recomputed. last_reviewed is always updated —
+    all in one UPDATE … RETURNING, so concurrent reviews can't overwrite each
+    other. The review is appended to the review log; with
+    REVIEW_AGGREGATES=deferred the item row is left to the flusher and the
+    response shows the item with its still-queued reviews and this one
+    folded in, without writing it.
     """
-    item = await db.get(KnowledgeItem, item_id)
-    if not item or item.user_id != user_id:
+    now      = datetime.now(timezone.utc)
+    kind     = event_kind(payload.used_in_practice)
+    deferred = settings.REVIEW_AGGREGATES == "deferred"
+
+    if deferred:
+        state = await preview_review(db, item_id, user_id, kind, now)
+        item  = SimpleNamespace(**state) if state is not None else None
+    else:
+        item = (await db.execute(review_update(item_id, user_id, kind, now))).first()
+    if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
+    await record_events(db, user_id, [(item_id, kind, now)], queue=deferred)
 
-    now = datetime.now(timezone.utc)
+    await db.commit()
+    if not deferred:
+        await insight_cache.bump(user_id)
+    return encode_items(enrich_rows([item], now)[0])
 
-    if payload.used_in_practice:
-        # Real-world usage — increment U via EMA
-        item.usage_frequency = update_ema(item.usage_frequency)
-        item.last_used       = now
-    else:
-        # Passive review — increment Rf via EMA
-        item.revision_frequency = update_ema(item.revision_frequency)
-
-    item.last_reviewed = now
-
-    # Recompute decay rate with new Rf / U
-    item.decay_rate = compute_decay_rate(
-        difficulty         = item.difficulty,
-        interest           = item.interest,
-        sleep_quality      = item.sleep_quality,
-        base_memory        = item.base_memory,
-        attention          = item.attention,
-        revision_frequency = item.revision_frequency,
-        usage_frequency    = item.usage_frequency,
-    )
-
-    await db.flush()
-    await db.refresh(item)
-
-    # Build enriched response
-    d = {c.name: getattr(item, c.name) for c in item.__table__.columns}
-    d["current_retention"] = round(
-        compute_retention(item.k0_initial_strength, item.decay_rate, 0, item.memory_floor), 2
-    )
-    d["half_life_days"]    = round(compute_half_life(item.decay_rate), 2)
-    d["days_to_forget"]    = round(compute_time_to_forget(item.k0_initial_strength, item.decay_rate, item.memory_floor), 2)
-    d["days_since_review"] = 0.0
-    return d
+
+# ── POST /api/items/reviews/batch ──────────────────────────────────────────────
+
+@router.post("/reviews/batch", response_model=List[ItemOut])
+async def submit_reviews_batch(
+    payload: List[ReviewBatchEntry] = Body(..., min_length=1, max_length=settings.REVIEW_BATCH_MAX),
+    db:      AsyncSession           = Depends(get_db),
+    user_id: int                    = Depends(get_current_user_id),
+):
+    """
+    Apply many (possibly offline) reviews in one transaction.
+
+    All target items are loaded with one query, each item's reviews are
+    folded exactly as submit_review would have applied them one by one, and
+    the final state goes out as one bulk UPDATE; the reviews are appended to
+    the review log. Batches are always folded inline. Timestamps in the
+    future are clamped to now, and last_reviewed / last_used never move
+    backwards. Returns each reviewed item once, in order of first mention.
+    """
+    now    = datetime.now(timezone.utc)
+    events = [(e.item_id, event_kind(e.used_in_practice), min(as_utc(e.reviewed_at) or now, now)) for e in payload]
+
+    by_item = defaultdict(list)
+    for item_id, kind, ts in sorted(events, key=lambda e: e[2]):
+        by_item[item_id].append((kind, ts))
+
+    states  = await apply_reviews(db, by_item, user_id=user_id)
+    missing = [i for i in by_item if i not in states]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Items not found: {sorted(missing)}")
+    await record_events(db, user_id, events)
+
+    await db.commit()
+    await insight_cache.bump(user_id)
+
+    ids = dict.fromkeys(e.item_id for e in payload)
+    return encode_items(enrich_rows([SimpleNamespace(**states[i]) for i in ids], now))
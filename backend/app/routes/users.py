@@ -0,0 +1,107 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import Update
+
+from app.config import settings
+from app.database import get_db
+from app.models import KnowledgeItem, User
+from app.schemas import UserSettingsOut, UserSettingsUpdate
+from app.auth import get_current_user_id
+from app.insight_cache import insight_cache
+from app.decay_sql import alert_due_at_expr, decay_rate_expr
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+SETTINGS_FIELDS = ("sleep_quality", "base_memory", "memory_floor")   # copied onto every item
+USER_COLUMNS    = (User.sleep_quality, User.base_memory, User.memory_floor, User.telegram_chat_id)
+
+
+def _items_update(user_id: int, changes: dict) -> Update:
+    """
+    One UPDATE of all `user_id`'s items: set the changed settings and
+    recompute k and alert_due_at from them. SET expressions see the old row,
+    so the new values go into the formulas as literals.
+    """
+    item  = KnowledgeItem.__table__.c
+    value = {f: literal(changes[f]) if f in changes else item[f] for f in SETTINGS_FIELDS}
+    k     = decay_rate_expr(
+        item.difficulty, item.interest, value["sleep_quality"], value["base_memory"],
+        item.attention, item.revision_frequency, item.usage_frequency,
+    )
+    return (
+        update(KnowledgeItem.__table__)
+        .where(item.user_id == user_id)
+        .values(
+            **changes,
+            decay_rate   = k,
+            alert_due_at = alert_due_at_expr(
+                item.k0_initial_strength, k, value["memory_floor"],
+                func.coalesce(item.last_reviewed, item.created_at),
+            ),
+        )
+    )
+
+
+# ── PUT /api/users/me/settings ─────────────────────────────────────────────────
+
+@router.put("/me/settings", response_model=UserSettingsOut)
+async def update_settings(
+    payload: UserSettingsUpdate,
+    chunked: bool         = False,
+    db:      AsyncSession = Depends(get_db),
+    user_id: int          = Depends(get_current_user_id),
+):
+    """
+    Update the user's sleep quality / base memory / memory floor and apply
+    them to every item — what PATCH /items/{id} does for one item, as a
+    single set-based UPDATE. telegram_chat_id only changes the users row.
+
+    With chunked=true the items are updated SETTINGS_CHUNK_SIZE at a time
+    (keyset by id), one transaction each, so a very large library never
+    holds all its row locks at once. A failure part-way leaves earlier
+    chunks applied; repeating the request finishes the job.
+    """
+    user_changes = payload.model_dump(exclude_none=True)
+    if user_changes.get("telegram_chat_id") == "":
+        user_changes["telegram_chat_id"] = None
+    changes = {f: v for f, v in user_changes.items() if f in SETTINGS_FIELDS}
+
+    if user_changes:
+        user = (await db.execute(
+            update(User).where(User.id == user_id).values(**user_changes).returning(*USER_COLUMNS)
+        )).first()
+    else:
+        user = (await db.execute(select(*USER_COLUMNS).where(User.id == user_id))).first()
+
+    updated = 0
+    if changes and not chunked:
+        updated = (await db.execute(_items_update(user_id, changes))).rowcount
+        await db.commit()
+    elif changes:
+        await db.commit()
+        last_id = 0
+        while True:
+            page = (
+                select(KnowledgeItem.id)
+                .where(KnowledgeItem.user_id == user_id, KnowledgeItem.id > last_id)
+                .order_by(KnowledgeItem.id)
+                .limit(settings.SETTINGS_CHUNK_SIZE)
+            )
+            ids = (await db.execute(
+                _items_update(user_id, changes)
+                .where(KnowledgeItem.__table__.c.id.in_(page))
+                .returning(KnowledgeItem.__table__.c.id)
+            )).scalars().all()
+            await db.commit()
+            if not ids:
+                break
+            updated += len(ids)
+            last_id  = max(ids)
+
+    if updated:
+        await insight_cache.bump(user_id)
+
+    # The dev user (no token) may have no users row; report what was applied
+    current = user._asdict() if user is not None else {f: changes.get(f) for f in SETTINGS_FIELDS}
+    return UserSettingsOut(**current, items_updated=updated)
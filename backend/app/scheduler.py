@@ -1,64 +1,208 @@
 """
 APScheduler job — runs every 6 hours.
 
-For every knowledge item:
-  1. Compute current K(t)
-  2. If K(t) < 60 % → enqueue decay alert in Redis Stream 'decay_alerts'
+For every knowledge item whose precomputed `alert_due_at` has passed
+(an index range scan, so cost tracks the number of due items):
+  1. Compute current K(t) and its escalation band (60 % → 40 % → near floor)
+  2. If the item entered a deeper band than last alerted, or the cool-down
+     since its last alert has passed → enqueue decay alert in Redis Stream
+     'decay_alerts' and record the band/time on the row
+
+Due items are read in keyset-paginated chunks (`(alert_due_at, id) > cursor
+ORDER BY alert_due_at, id LIMIT n`, which walks the idx_alert_due_at_id
+index), projecting only the columns the retention math needs, so memory
+stays flat however large the table grows. Alerts for each chunk go out
+through pipelined XADDs (ALERT_BATCH_SIZE per round trip) with a MAXLEN or
+MINID trim so the stream stays bounded.
 
 The worker.py process reads from this stream and sends Telegram notifications.
+
+A second, nightly job writes the retention_daily rollup (see app/rollup.py).
+With REVIEW_AGGREGATES=deferred a third folds queued review events into their
+items every REVIEW_FLUSH_INTERVAL_S (see app/review_log.py). An hourly job
+purges expired Idempotency-Key fallback rows (see app/idempotency.py).
 """
 
+import time
+import tracemalloc
 from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable, Sequence
 
+import numpy as np
 import redis.asyncio as aioredis
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy import select
+from sqlalchemy import Row, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.database import AsyncSessionLocal
-from app.decay import compute_retention
+from app.decay import ALERT_THRESHOLD, column, compute_item_batch
+from app.idempotency import purge_expired_keys
 from app.models import KnowledgeItem
-
-ALERT_THRESHOLD = 60.0    # Enqueue items below this retention %
+from app.redis_client import get_redis
+from app.review_log import flush_review_events
+from app.rollup import run_retention_rollup
+
+ALERT_STREAM = "decay_alerts"
+
+
+# Only what compute_item_batch and the alert payload need — never `content`.
+SCAN_COLUMNS = (
+    KnowledgeItem.id,
+    KnowledgeItem.user_id,
+    KnowledgeItem.topic,
+    KnowledgeItem.k0_initial_strength,
+    KnowledgeItem.decay_rate,
+    KnowledgeItem.memory_floor,
+    KnowledgeItem.last_reviewed,
+    KnowledgeItem.created_at,
+    KnowledgeItem.last_alerted_at,
+    KnowledgeItem.alerted_band,
+    KnowledgeItem.alert_due_at,
+)
+
+
+async def iter_due_chunks(
+    db: AsyncSession,
+    now: datetime,
+    chunk_size: int,
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Yield due items as lightweight rows, `chunk_size` at a time, keyset-paginated
+    on (alert_due_at, id) so every page is one range read of idx_alert_due_at_id.
+    """
+    cursor = None
+    while True:
+        query = (
+            select(*SCAN_COLUMNS)
+            .where(KnowledgeItem.alert_due_at <= now)
+            .order_by(KnowledgeItem.alert_due_at, KnowledgeItem.id)
+            .limit(chunk_size)
+        )
+        if cursor is not None:
+            query = query.where(tuple_(KnowledgeItem.alert_due_at, KnowledgeItem.id) > tuple_(*cursor))
+        rows = (await db.execute(query)).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        cursor = (rows[-1].alert_due_at, rows[-1].id)
+
+
+def _trim_kwargs() -> dict:
+    """XADD trim arguments for the configured retention policy (approximate `~`)."""
+    if settings.ALERT_STREAM_MAX_AGE_HOURS > 0:
+        cutoff_ms = int((time.time() - settings.ALERT_STREAM_MAX_AGE_HOURS * 3600) * 1000)
+        return {"minid": f"{cutoff_ms}-0", "approximate": True}
+    if settings.ALERT_STREAM_MAXLEN > 0:
+        return {"maxlen": settings.ALERT_STREAM_MAXLEN, "approximate": True}
+    return {}
+
+
+async def enqueue_alerts(r: aioredis.Redis, alerts: Iterable[dict]) -> int:
+    """XADD alerts onto the stream, ALERT_BATCH_SIZE commands per pipeline round trip."""
+    trim  = _trim_kwargs()
+    pipe  = r.pipeline(transaction=False)
+    added = 0
+    for fields in alerts:
+        pipe.xadd(ALERT_STREAM, fields, **trim)
+        added += 1
+        if len(pipe) >= settings.ALERT_BATCH_SIZE:
+            await pipe.execute()
+    if len(pipe):
+        await pipe.execute()
+    return added
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def alert_bands(retention: np.ndarray, memory_floor: np.ndarray) -> np.ndarray:
+    """
+    Escalation band per item.
+
+    0 = at or above ALERT_THRESHOLD, 1 = below it, one more per crossed
+    ALERT_ESCALATION_BANDS threshold, and the deepest band when retention is
+    within ALERT_FLOOR_MARGIN points of the memory floor.
+    """
+    bands = (retention < ALERT_THRESHOLD).astype(np.int64)
+    for threshold in settings.ALERT_ESCALATION_BANDS:
+        bands += retention < threshold
+    near_floor = (bands > 0) & (retention < memory_floor * 100 + settings.ALERT_FLOOR_MARGIN)
+    return np.where(near_floor, len(settings.ALERT_ESCALATION_BANDS) + 2, bands)
+
+
+def should_alert(rows: Sequence[Row], bands: np.ndarray, now: datetime) -> np.ndarray:
+    """Mask of rows that entered a deeper band or whose cool-down has expired."""
+    cutoff    = now.timestamp() - settings.ALERT_COOLDOWN_HOURS * 3600
+    last_band = np.fromiter((r.alerted_band or 0 for r in rows), dtype=np.int64, count=len(rows))
+    cooled    = np.fromiter(
+        (r.last_alerted_at is None or _utc(r.last_alerted_at).timestamp() <= cutoff for r in rows),
+        dtype=bool,
+        count=len(rows),
+    )
+    return (bands > 0) & ((bands > last_band) | cooled)
 
 
 async def check_all_items_and_enqueue() -> None:
-    r = await aioredis.from_url(settings.REDIS_URL)
+    r = get_redis()
+
+    # tracemalloc slows every allocation in the process, so it is opt-in
+    started_tracing = settings.SCHEDULER_TRACE_MEMORY and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    peak_chunk_bytes = 0
+    checked = enqueued = chunks = largest_chunk = 0
+    t0 = time.perf_counter()
 
     async with AsyncSessionLocal() as db:
-        result = await db.execute(select(KnowledgeItem))
-        items  = result.scalars().all()
-
-        enqueued = 0
-        for item in items:
-            last = item.last_reviewed or item.created_at
-            if last and last.tzinfo is None:
-                last = last.replace(tzinfo=timezone.utc)
-
-            days_since = (datetime.now(timezone.utc) - last).total_seconds() / 86400
-
-            k_t = compute_retention(
-                item.k0_initial_strength,
-                item.decay_rate,
-                days_since,
-                item.memory_floor,
-            )
-
-            if k_t < ALERT_THRESHOLD:
-                await r.xadd(
-                    "decay_alerts",
-                    {
-                        "item_id":   str(item.id),
-                        "topic":     item.topic,
-                        "retention": f"{k_t:.1f}",
-                        "user_id":   str(item.user_id),
-                    },
-                )
-                enqueued += 1
+        now = datetime.now(timezone.utc)
+        async for rows in iter_due_chunks(db, now, settings.SCHEDULER_CHUNK_SIZE):
+            if started_tracing:
+                tracemalloc.reset_peak()
 
-        print(f"[SCHEDULER] Checked {len(items)} items, enqueued {enqueued} alerts")
+            retention = compute_item_batch(rows, now).retention
+            bands     = alert_bands(retention, column(rows, "memory_floor"))
+            selected  = np.flatnonzero(should_alert(rows, bands, now)).tolist()
 
-    await r.aclose()
+            if selected:
+                enqueued += await enqueue_alerts(r, (
+                    {
+                        "item_id":   str(rows[idx].id),
+                        "topic":     rows[idx].topic,
+                        "retention": f"{retention[idx]:.1f}",
+                        "user_id":   str(rows[idx].user_id),
+                        "band":      str(bands[idx]),
+                    }
+                    for idx in selected
+                ))
+                await db.execute(
+                    update(KnowledgeItem),
+                    [
+                        {"id": rows[idx].id, "last_alerted_at": now, "alerted_band": int(bands[idx])}
+                        for idx in selected
+                    ],
+                )
+                await db.commit()
+
+            checked      += len(rows)
+            chunks       += 1
+            largest_chunk = max(largest_chunk, len(rows))
+            if started_tracing:
+                peak_chunk_bytes = max(peak_chunk_bytes, tracemalloc.get_traced_memory()[1])
+
+    if started_tracing:
+        tracemalloc.stop()
+
+    elapsed = time.perf_counter() - t0
+    rate    = checked / elapsed if elapsed > 0 else 0.0
+    memory  = f", peak chunk memory {peak_chunk_bytes / 1024 / 1024:.1f} MiB" if started_tracing else ""
+    print(
+        f"[SCHEDULER] Checked {checked} items in {chunks} chunks (largest {largest_chunk} rows), "
+        f"enqueued {enqueued} alerts in {elapsed:.2f}s ({rate:,.0f} rows/s{memory})"
+    )
 
 
 def create_scheduler() -> AsyncIOScheduler:
@@ -70,4 +214,30 @@ def create_scheduler() -> AsyncIOScheduler:
         id="decay_check",
         replace_existing=True,
     )
+    scheduler.add_job(
+        run_retention_rollup,
+        trigger="cron",
+        hour=settings.ROLLUP_HOUR_UTC,
+        minute=settings.ROLLUP_MINUTE,
+        timezone="UTC",
+        id="retention_rollup",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        purge_expired_keys,
+        trigger="interval",
+        hours=1,
+        id="idempotency_purge",
+        replace_existing=True,
+    )
+    if settings.REVIEW_AGGREGATES == "deferred":
+        scheduler.add_job(
+            flush_review_events,
+            trigger="interval",
+            seconds=settings.REVIEW_FLUSH_INTERVAL_S,
+            id="review_flush",
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True,
+        )
     return scheduler
@@ -37,6 +37,7 @@ class ItemOut(BaseModel):
     user_id:            int
     topic:              str
     content:            Optional[str]
+    content_preview:    Optional[str] = None   # always set, even where content is left out
     attention:          float
     interest:           float
     difficulty:         float
@@ -50,6 +51,7 @@ class ItemOut(BaseModel):
     last_reviewed:      Optional[datetime]
     last_used:          Optional[datetime]
     created_at:         datetime
+    alert_due_at:       Optional[datetime] = None
     # Computed fields (added by route)
     current_retention:  Optional[float] = None
     half_life_days:     Optional[float] = None
@@ -60,6 +62,16 @@ class ItemOut(BaseModel):
         from_attributes = True
 
 
+class BulkRowError(BaseModel):
+    index:  int           # position in the request array
+    errors: list[dict]    # pydantic errors: loc, msg, type
+
+
+class ItemBulkResult(BaseModel):
+    created: list[ItemOut]
+    errors:  list[BulkRowError] = []
+
+
 # ── Review schemas ─────────────────────────────────────────────────────────────
 
 class ReviewSubmit(BaseModel):
@@ -69,6 +81,11 @@ class ReviewSubmit(BaseModel):
     )
 
 
+class ReviewBatchEntry(ReviewSubmit):
+    item_id:     int
+    reviewed_at: Optional[datetime] = Field(None, description="When the review happened offline; default now")
+
+
 # ── Insight schemas ────────────────────────────────────────────────────────────
 
 class WeakItem(BaseModel):
@@ -93,6 +110,17 @@ class InsightSummary(BaseModel):
     items_near_floor: int
 
 
+class InsightDashboard(BaseModel):
+    """Any subset of the insight sections, computed from one load of the user's items."""
+    summary:          Optional[InsightSummary]       = None
+    weakest:          Optional[list[WeakItem]]       = None
+    hardest:          Optional[list[WeakItem]]       = None
+    timeline:         Optional[list[DailyRetention]] = None
+    upcoming_forgets: Optional[list[dict]]           = None
+    most_reviewed:    Optional[list[dict]]           = None
+    sleep_impact:     Optional[list[dict]]           = None
+
+
 # ── Auth schemas ───────────────────────────────────────────────────────────────
 
 class UserCreate(BaseModel):
@@ -100,6 +128,22 @@ class UserCreate(BaseModel):
     password: str = Field(..., min_length=6)
 
 
+class UserSettingsUpdate(BaseModel):
+    """Omitted fields keep each item's current value."""
+    sleep_quality: Optional[float] = Field(None, ge=0, le=1)
+    base_memory:   Optional[float] = Field(None, ge=0, le=1)
+    memory_floor:  Optional[float] = Field(None, ge=0.05, le=0.20)
+    telegram_chat_id: Optional[str] = Field(None, max_length=64, description='decay alert chat; "" clears it')
+
+
+class UserSettingsOut(BaseModel):
+    sleep_quality: Optional[float]
+    base_memory:   Optional[float]
+    memory_floor:  Optional[float]
+    telegram_chat_id: Optional[str] = None
+    items_updated: int
+
+
 class Token(BaseModel):
     access_token: str
     token_type:   str = "bearer"
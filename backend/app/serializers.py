@@ -0,0 +1,131 @@
+"""
+Fast item serialization — rows straight to ItemOut-shaped JSON bytes.
+
+The usual path (dict per row → ItemOut validation → jsonable_encoder →
+json.dumps) costs more than the query for large lists. Here the ItemOut
+field order is resolved once, stored values are pulled with one precompiled
+getter, the four computed fields come from a single decay batch, and
+orjson encodes the result.
+
+The bytes match the pydantic/Starlette output: same key order, datetimes
+with "Z" for UTC (OPT_UTC_Z), compact separators, raw UTF-8. The one place
+the encoders differ is exponent notation (1e-05 vs 0.00001) and non-finite
+floats, so a page containing such a value is handed back to FastAPI's
+regular path instead.
+"""
+
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, List, Optional, Sequence, Union
+
+import orjson
+from fastapi import Response
+from sqlalchemy import case, func, null
+from sqlalchemy.sql.expression import ColumnElement
+
+from app.decay import compute_item_batch
+from app.models import CONTENT_PREVIEW_CHARS, KnowledgeItem
+from app.schemas import ItemOut
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+# ── ItemOut layout, resolved once ──────────────────────────────────────────────
+
+ITEM_FIELDS   = tuple(ItemOut.model_fields)
+COMPUTED      = ("current_retention", "half_life_days", "days_to_forget", "days_since_review")
+STORED        = tuple(f for f in ITEM_FIELDS if f not in COMPUTED)
+
+
+def _content_preview() -> ColumnElement:
+    """KnowledgeItem.content_preview in SQL; only reads the first characters of content."""
+    content = KnowledgeItem.__table__.c.content
+    n       = CONTENT_PREVIEW_CHARS
+    return case(
+        (func.substr(content, n + 1, 1) != "", func.substr(content, 1, n).concat("…")),
+        else_=content,
+    ).label("content_preview")
+
+
+# For Core selects
+ITEM_COLUMNS = tuple(
+    _content_preview() if f == "content_preview" else KnowledgeItem.__table__.c[f] for f in STORED
+)
+
+_stored_values = attrgetter(*STORED)
+_float_slots   = tuple(i for i, f in enumerate(ITEM_FIELDS)
+                       if ItemOut.model_fields[f].annotation in (float, Optional[float]))
+
+assert ITEM_FIELDS == STORED + COMPUTED, "computed ItemOut fields must come last"
+
+
+def item_columns(include_content: bool = False) -> tuple:
+    """
+    ITEM_COLUMNS for a Core select. Unless `include_content`, the unbounded
+    `content` column is replaced by a NULL literal so it never leaves the
+    database, while rows keep the same shape; `content_preview` is always
+    there for list views.
+    """
+    if include_content:
+        return ITEM_COLUMNS
+    return tuple(null().label("content") if c.name == "content" else c for c in ITEM_COLUMNS)
+
+
+def _plain(value: Optional[float]) -> bool:
+    """True if orjson and json.dumps format this float identically."""
+    return value is None or value == 0 or 1e-4 <= abs(value) < 1e16
+
+
+def enrich_rows(rows: Sequence, now: Optional[datetime] = None) -> List[dict]:
+    """ItemOut-shaped dicts (stored fields + computed decay fields) for ORM objects or Core rows."""
+    if not rows:
+        return []
+    batch = compute_item_batch(rows, now)
+
+    out = []
+    for row, retention, half_life, days_forget, days_elapsed in zip(
+        rows,
+        batch.retention.tolist(),
+        batch.half_life.tolist(),
+        batch.time_to_forget.tolist(),
+        batch.days_elapsed.tolist(),
+    ):
+        values = _stored_values(row)
+        out.append(dict(zip(ITEM_FIELDS, (
+            *values,
+            round(retention, 2),
+            round(half_life, 2),
+            round(days_forget, 2),
+            round(days_elapsed, 2),
+        ))))
+    return out
+
+
+def orjson_safe(items: Sequence[dict]) -> bool:
+    """True if every enriched item encodes identically with orjson."""
+    return all(
+        all(_plain(values[i]) for i in _float_slots)
+        for values in (tuple(d.values()) for d in items)
+    )
+
+
+def encode_items(
+    content: Union[List[dict], dict],
+    status_code: int = 200,
+    response: Optional[Response] = None,
+) -> Union[Response, List[dict], dict]:
+    """
+    Encode enrich_rows() output (a list, or one dict) as a response, carrying
+    over headers set on the route's injected `response`. Returns the dicts
+    unchanged — FastAPI then validates and encodes them as usual — when a
+    float would be formatted differently by orjson.
+    """
+    if not orjson_safe([content] if isinstance(content, dict) else content):
+        return content
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
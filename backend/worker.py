@@ -1,105 +1,597 @@
 """
-Worker process — reads from Redis Stream 'decay_alerts' and sends Telegram notifications.
+Worker process — reads from Redis Stream 'decay_alerts' and sends Telegram notifications
+through the pooled, rate-limited notifier in app/notifier.py, each to the
+alerted user's own chat (users.telegram_chat_id, else TELEGRAM_CHAT_ID).
+
+Each process joins the 'workers' consumer group under its own name and runs
+up to WORKER_CONCURRENCY handlers at once; entries are XACKed only after a
+handler succeeds, and entries left pending by dead consumers are reclaimed
+with XAUTOCLAIM. Scale out by running more replicas.
+
+With ALERT_DELIVERY_MODE=digest, alerts are buffered per user and sent as
+one summary message every DIGEST_WINDOW_S instead of one message per item.
+
+Failed sends are retried with exponential backoff via a delayed retry set;
+after WORKER_MAX_ATTEMPTS they land in 'decay_alerts:dead'. Alerts for a chat
+that is over its rate limit are parked in the same set until the chat has a
+token again, without counting an attempt.
 
 Run:  python worker.py
+      python worker.py dead list [--count N]
+      python worker.py dead replay (--all | <id> ...)
 Docker: see docker-compose.yml 'worker' service
 """
 
+import argparse
 import asyncio
+import json
 import os
+import random
+import socket
 import sys
+import time
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 import redis.asyncio as aioredis
+from sqlalchemy import select
 
 # Ensure app package is importable
 sys.path.insert(0, os.path.dirname(__file__))
 
 from app.config import settings
 from app.database import AsyncSessionLocal
-from app.decay import compute_time_to_forget
-from app.models import KnowledgeItem
+from app.decay import column, compute_time_to_forget_batch
+from app.models import KnowledgeItem, User
+from app.notifier import Notifier, RateLimited, build_notifier
+from app.redis_client import close_redis, get_redis
 
+STREAM = "decay_alerts"
+GROUP  = "workers"
 
-async def notify_user(item_data: dict) -> None:
-    """Send a Telegram message for a decaying item."""
-    if not settings.TELEGRAM_BOT_TOKEN or not settings.TELEGRAM_CHAT_ID:
-        print(f"[WORKER] Telegram not configured — skipping notification for {item_data.get('topic')}")
-        return
 
-    try:
-        from telegram import Bot
+class AlertTarget(NamedTuple):
+    t_forget: float
+    chat_id:  Optional[str]     # None → TELEGRAM_CHAT_ID
 
-        async with AsyncSessionLocal() as db:
-            item = await db.get(KnowledgeItem, int(item_data[b"item_id"].decode()))
 
-        if not item:
-            return
+async def load_alert_targets(item_ids: Iterable[int]) -> Dict[int, AlertTarget]:
+    """
+    Days-to-forget and the owner's Telegram chat for every item referenced
+    by one read batch.
 
-        t_forget = compute_time_to_forget(
-            item.k0_initial_strength,
-            item.decay_rate,
-            item.memory_floor,
-            threshold=10.0,
+    One session and one `WHERE id IN (...)` query projecting only the decay
+    columns, outer-joined to users for telegram_chat_id; days-to-forget is
+    computed in a single vectorised pass. Items that no longer exist are
+    simply absent from the result.
+    """
+    ids = set(item_ids)
+    if not ids:
+        return {}
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(
+                KnowledgeItem.id,
+                KnowledgeItem.k0_initial_strength,
+                KnowledgeItem.decay_rate,
+                KnowledgeItem.memory_floor,
+                User.telegram_chat_id,
+            )
+            .outerjoin(User, User.id == KnowledgeItem.user_id)
+            .where(KnowledgeItem.id.in_(ids))
         )
+        rows = result.all()
 
-        topic     = item_data[b"topic"].decode()
-        retention = item_data[b"retention"].decode()
+    t_forget = compute_time_to_forget_batch(
+        column(rows, "k0_initial_strength"),
+        column(rows, "decay_rate"),
+        column(rows, "memory_floor"),
+        threshold=10.0,
+    )
+    return {r.id: AlertTarget(t, r.telegram_chat_id) for r, t in zip(rows, t_forget.tolist())}
+
+
+def _item_id(data: dict) -> int:
+    return int(data[b"item_id"].decode())
+
+
+def _user_id(data: dict) -> str:
+    return data.get(b"user_id", b"").decode()
+
+
+# Set by consume_queue(); None when Telegram isn't configured.
+notifier: Optional[Notifier] = None
+
+
+async def notify_user(
+    item_data: dict,
+    t_forget:  Optional[float],
+    chat_id:   Optional[str] = None,
+    reserved:  bool = False,
+) -> None:
+    """
+    Send a notification for a decaying item (t_forget=None → item was deleted)
+    to the user's chat, or TELEGRAM_CHAT_ID if they have none. `reserved`: the
+    chat's token was already taken with notifier.reserve().
+
+    Send failures propagate so the stream entry stays pending.
+    """
+    if t_forget is None:
+        return
+
+    chat_id = chat_id or settings.TELEGRAM_CHAT_ID
+    if notifier is None or not chat_id:
+        print(f"[WORKER] Telegram not configured — skipping notification for {item_data[b'topic'].decode()}")
+        return
+
+    topic     = item_data[b"topic"].decode()
+    retention = item_data[b"retention"].decode()
+
+    msg = (
+        f"🧠 *Memory Decay Alert*\n\n"
+        f"Topic: {topic}\n"
+        f"Current retention: {retention}%\n"
+        f"Days until forgotten: {round(t_forget, 1)}\n\n"
+        f"Review now to reset decay rate."
+    )
+
+    await notifier.send(chat_id, msg, timeout=settings.WORKER_HANDLER_TIMEOUT_S, reserved=reserved)
+    print(f"[WORKER] ✅ Notified: {topic} at {retention}%")
+
+
+# ── Digest mode ────────────────────────────────────────────────────────────────
+
+class DigestAlert(NamedTuple):
+    msg_id:    bytes
+    item_id:   int
+    topic:     str
+    retention: float
+    t_forget:  float
 
-        msg = (
-            f"🧠 *Memory Decay Alert*\n\n"
-            f"Topic: {topic}\n"
-            f"Current retention: {retention}%\n"
-            f"Days until forgotten: {round(t_forget, 1)}\n\n"
-            f"Review now to reset decay rate."
-        )
 
-        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-        await bot.send_message(
-            chat_id    = settings.TELEGRAM_CHAT_ID,
-            text       = msg,
-            parse_mode = "Markdown",
+def format_digest(alerts: List[DigestAlert], top_n: int) -> str:
+    """One summary message: the `top_n` weakest items and how long until each is forgotten."""
+    worst = sorted(alerts, key=lambda a: a.retention)[:top_n]
+    lines = [f"• {a.topic} — {a.retention:.1f}% (forgotten in {round(a.t_forget, 1)} days)" for a in worst]
+    more  = len(alerts) - len(worst)
+
+    return (
+        f"🧠 *Memory Decay Digest*\n\n"
+        f"{len(alerts)} topic{'s' if len(alerts) != 1 else ''} fading. Weakest first:\n"
+        + "\n".join(lines)
+        + (f"\n…and {more} more." if more else "")
+        + "\n\nReview now to reset decay rates."
+    )
+
+
+async def notify_digest(user_id: str, alerts: List[DigestAlert], chat_id: Optional[str] = None) -> None:
+    """Send one digest message summarising all pending alerts for a user."""
+    chat_id = chat_id or settings.TELEGRAM_CHAT_ID
+    if notifier is None or not chat_id:
+        print(f"[WORKER] Telegram not configured — skipping digest of {len(alerts)} alerts for user {user_id}")
+        return
+
+    text = format_digest(alerts, settings.DIGEST_TOP_N)
+    await notifier.send(chat_id, text, timeout=settings.WORKER_HANDLER_TIMEOUT_S)
+    print(f"[WORKER] ✅ Digest sent to user {user_id}: {len(alerts)} alerts")
+
+
+class DigestBuffer:
+    """
+    Collects alerts per user_id and sends one digest per user every window.
+
+    Entries stay pending in the stream while buffered and are XACKed only
+    after their digest has been handed to notify_digest.
+    """
+
+    def __init__(self, r: aioredis.Redis, in_flight: set):
+        self.r         = r
+        self.in_flight = in_flight
+        self._reset()
+
+    def _reset(self) -> None:
+        self.alerts:  Dict[str, Dict[int, DigestAlert]] = defaultdict(dict)   # latest per item
+        self.entries: Dict[str, Dict[bytes, dict]]      = defaultdict(dict)   # everything to ack
+        self.chats:   Dict[str, Optional[str]]          = {}
+
+    def add(self, msg_id: bytes, data: dict, t_forget: float, chat_id: Optional[str] = None) -> None:
+        user_id = _user_id(data)
+        alert   = DigestAlert(
+            msg_id    = msg_id,
+            item_id   = _item_id(data),
+            topic     = data[b"topic"].decode(),
+            retention = float(data[b"retention"]),
+            t_forget  = t_forget,
         )
-        print(f"[WORKER] ✅ Notified: {topic} at {retention}%")
+        self.alerts[user_id][alert.item_id] = alert
+        self.entries[user_id][msg_id] = data
+        self.chats[user_id] = chat_id
+
+    async def flush(self) -> None:
+        alerts, entries, chats = self.alerts, self.entries, self.chats
+        self._reset()
+        for user_id, by_item in alerts.items():
+            pending = entries[user_id]
+            try:
+                await notify_digest(user_id, list(by_item.values()), chats[user_id])
+                await self.r.xack(STREAM, GROUP, *pending)
+            except Exception as e:
+                print(f"[WORKER] ❌ Digest for user {user_id} failed: {e!r}")
+                await self._retry(by_item, pending, e)
+            finally:
+                self.in_flight.difference_update(pending)
+
+    async def _retry(self, by_item: Dict[int, DigestAlert], pending: Dict[bytes, dict], error: Exception) -> None:
+        latest = {a.msg_id for a in by_item.values()}
+        try:
+            for msg_id, data in pending.items():
+                if msg_id in latest:
+                    await retry_or_dead_letter(self.r, msg_id, data, repr(error))
+                else:                                   # superseded by a newer alert for the item
+                    await self.r.xack(STREAM, GROUP, msg_id)
+        except Exception as e:
+            print(f"[WORKER] Could not schedule digest retry (left pending): {e}")
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.DIGEST_WINDOW_S)
+            await self.flush()
+
+
+# ── Retry & dead letters ───────────────────────────────────────────────────────
+#
+# A failed alert is XACKed and parked in the RETRY_KEY sorted set (score = due
+# time) with its `attempts` count bumped; a mover puts due entries back on the
+# stream. After WORKER_MAX_ATTEMPTS it goes to DEAD_STREAM instead, from where
+# `python worker.py dead list|replay` can inspect or re-enqueue it. An alert
+# whose chat is rate-limited is parked the same way by defer(), attempts as is.
+
+RETRY_KEY   = f"{STREAM}:retry"
+DEAD_STREAM = f"{STREAM}:dead"
+DEAD_FIELDS = ("error", "failed_at", "original_id")
+
+# Atomically move due retries back onto the stream (safe with many replicas).
+MOVE_DUE_RETRIES = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(due) do
+    redis.call('ZREM', KEYS[1], member)
+    local args = {}
+    for k, v in pairs(cjson.decode(member)) do
+        args[#args + 1] = k
+        args[#args + 1] = v
+    end
+    redis.call('XADD', KEYS[2], '*', unpack(args))
+end
+return #due
+"""
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff (base × 2^(attempts-1), capped) with jitter in the upper half."""
+    ceiling = min(settings.RETRY_MAX_DELAY_S, settings.RETRY_BASE_DELAY_S * 2 ** (attempts - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _decode(data: dict) -> Dict[str, str]:
+    return {k.decode(): v.decode() for k, v in data.items()}
+
+
+async def retry_or_dead_letter(r: aioredis.Redis, msg_id: bytes, data: dict, error: str) -> str:
+    """Schedule a delayed retry (or dead-letter after max attempts) and XACK, in one MULTI."""
+    fields   = _decode(data)
+    attempts = int(fields.get("attempts", 0)) + 1
+    fields["attempts"] = str(attempts)
+
+    pipe = r.pipeline(transaction=True)
+    if attempts >= settings.WORKER_MAX_ATTEMPTS:
+        fields.update(error=error[:500], failed_at=str(int(time.time())), original_id=msg_id.decode())
+        pipe.xadd(DEAD_STREAM, fields)
+        outcome = "dead-lettered"
+    else:
+        pipe.zadd(RETRY_KEY, {json.dumps(fields, sort_keys=True): time.time() + retry_delay(attempts)})
+        outcome = f"retry #{attempts} scheduled"
+    pipe.xack(STREAM, GROUP, msg_id)
+    await pipe.execute()
+    return outcome
 
-    except Exception as e:
-        print(f"[WORKER] ❌ Telegram error: {e}")
+
+async def defer(r: aioredis.Redis, msg_id: bytes, data: dict, delay: float) -> None:
+    """Park an alert in RETRY_KEY for `delay` seconds and XACK it, in one MULTI; not a failed attempt."""
+    pipe = r.pipeline(transaction=True)
+    pipe.zadd(RETRY_KEY, {json.dumps(_decode(data), sort_keys=True): time.time() + delay})
+    pipe.xack(STREAM, GROUP, msg_id)
+    await pipe.execute()
+
+
+async def requeue_due_retries(r: aioredis.Redis) -> None:
+    """Move retries whose backoff has elapsed back onto the stream."""
+    move = r.register_script(MOVE_DUE_RETRIES)
+    while True:
+        try:
+            while await move(keys=[RETRY_KEY, STREAM], args=[time.time(), settings.WORKER_READ_COUNT]):
+                pass
+        except Exception as e:
+            print(f"[WORKER] Retry mover error: {e}")
+        await asyncio.sleep(settings.RETRY_POLL_INTERVAL_S)
+
+
+async def list_dead(r: aioredis.Redis, count: int) -> List[Tuple[bytes, dict]]:
+    return await r.xrange(DEAD_STREAM, count=count)
+
+
+async def replay_dead(r: aioredis.Redis, ids: Optional[List[str]] = None) -> int:
+    """Re-enqueue dead letters (all of them, or just `ids`) with a fresh attempt count."""
+    if ids:
+        entries = []
+        for dead_id in ids:
+            entries += await r.xrange(DEAD_STREAM, min=dead_id, max=dead_id)
+    else:
+        entries = await r.xrange(DEAD_STREAM)
+
+    for dead_id, data in entries:
+        fields = {k: v for k, v in _decode(data).items() if k not in DEAD_FIELDS}
+        fields["attempts"] = "0"
+        pipe = r.pipeline(transaction=True)
+        pipe.xadd(STREAM, fields)
+        pipe.xdel(DEAD_STREAM, dead_id)
+        await pipe.execute()
+    return len(entries)
+
+
+def consumer_name() -> str:
+    """Unique consumer name per process so replicas can share the group."""
+    return settings.WORKER_CONSUMER_NAME or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def claim_idle_ms(digest: bool) -> int:
+    """
+    How long an entry must sit unacked before XAUTOCLAIM may take it: at least
+    WORKER_CLAIM_IDLE_MS, and longer than a live consumer can hold one, or a
+    slow entry would be claimed and sent twice. Rate-limited chats are
+    deferred rather than waited on, so a consumer holds an entry for its batch
+    to get through the slots — one handler timeout per wave of
+    WORKER_CONCURRENCY, plus one more for handlers already running — and
+    for the global bucket to pass the batch.
+    """
+    waves   = -(-settings.WORKER_READ_COUNT // settings.WORKER_CONCURRENCY) + 1
+    longest = (waves * settings.WORKER_HANDLER_TIMEOUT_S
+               + (settings.WORKER_READ_COUNT + settings.WORKER_CONCURRENCY) / settings.NOTIFY_GLOBAL_RATE)
+    min_idle_ms = max(settings.WORKER_CLAIM_IDLE_MS, int(longest * 1000))
+    if digest:
+        # Buffered digest entries sit idle for a whole window — don't steal them
+        min_idle_ms = max(min_idle_ms, int(settings.DIGEST_WINDOW_S * 2 * 1000))
+    return min_idle_ms
+
+
+class Dispatcher:
+    """
+    Runs alert handlers concurrently, at most WORKER_CONCURRENCY at a time.
+
+    Entries are XACKed only after their handler succeeds. A handler that
+    raises, or whose send exceeds WORKER_HANDLER_TIMEOUT_S, is handed to
+    retry_or_dead_letter, so one slow downstream never holds a slot for long;
+    if even that fails the entry stays pending for XAUTOCLAIM.
+
+    A chat's send token is reserved before a slot is taken. When the chat is
+    over its rate limit (or answers 429) the entry is deferred to the retry
+    set for as long as the chat needs, so a burst for one chat never fills
+    the slots other chats are waiting for, and never counts as a failure.
+    """
+
+    def __init__(self, r: aioredis.Redis, concurrency: int, digest: bool = False):
+        self.r         = r
+        self.slots     = asyncio.Semaphore(concurrency)
+        self.in_flight: set[bytes] = set()
+        self.tasks:     set[asyncio.Task] = set()
+        self.digest    = DigestBuffer(r, self.in_flight) if digest else None
+
+    async def submit_batch(self, entries: List[Tuple[bytes, dict]]) -> None:
+        """Look up every item in the batch (and its owner's chat) at once, then hand entries to handlers."""
+        entries = [(msg_id, data) for msg_id, data in entries if msg_id not in self.in_flight]
+        if not entries:
+            return
+        targets = await load_alert_targets(_item_id(data) for _msg_id, data in entries)
+        for msg_id, data in entries:
+            target = targets.get(_item_id(data))
+            if target is None:                  # item deleted since the alert
+                await self.submit(msg_id, data, None)
+            else:
+                await self.submit(msg_id, data, target.t_forget, target.chat_id)
+
+    async def submit(
+        self,
+        msg_id: bytes,
+        data: dict,
+        t_forget: Optional[float],
+        chat_id: Optional[str] = None,
+    ) -> None:
+        if msg_id in self.in_flight:
+            return
+        chat_id  = chat_id or settings.TELEGRAM_CHAT_ID or None
+        reserved = False
+        if notifier is not None and chat_id and t_forget is not None and self.digest is None:
+            wait = notifier.reserve(chat_id)
+            if wait:
+                await self._defer(msg_id, data, wait)
+                return
+            reserved = True
+
+        await self.slots.acquire()          # back-pressure: wait for a free slot
+        self.in_flight.add(msg_id)
+        task = asyncio.create_task(self._run(msg_id, data, t_forget, chat_id, reserved))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(
+        self,
+        msg_id:   bytes,
+        data:     dict,
+        t_forget: Optional[float],
+        chat_id:  Optional[str],
+        reserved: bool = False,
+    ) -> None:
+        buffered = False
+        try:
+            topic     = data[b"topic"].decode()
+            retention = data[b"retention"].decode()
+            print(f"[WORKER] ⚠️  {topic} at {retention}% retention")
+
+            if self.digest is not None and t_forget is not None:
+                self.digest.add(msg_id, data, t_forget, chat_id)   # acked when the digest goes out
+                buffered = True
+                return
+
+            await notify_user(data, t_forget, chat_id, reserved)
+            await self.r.xack(STREAM, GROUP, msg_id)
+        except RateLimited as e:
+            await self._defer(msg_id, data, e.retry_after)
+        except Exception as e:
+            print(f"[WORKER] ❌ Alert {msg_id!r} failed: {e!r}")
+            await self._retry(msg_id, data, e)
+        finally:
+            if not buffered:
+                self.in_flight.discard(msg_id)
+            self.slots.release()
+
+    async def _defer(self, msg_id: bytes, data: dict, delay: float) -> None:
+        try:
+            await defer(self.r, msg_id, data, delay)
+        except Exception as e:
+            print(f"[WORKER] Could not defer {msg_id!r} (left pending): {e}")
+
+    async def _retry(self, msg_id: bytes, data: dict, error: Exception) -> None:
+        try:
+            outcome = await retry_or_dead_letter(self.r, msg_id, data, repr(error))
+            print(f"[WORKER] {msg_id!r}: {outcome}")
+        except Exception as e:
+            print(f"[WORKER] Could not schedule retry for {msg_id!r} (left pending): {e}")
+
+    async def drain(self) -> None:
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.digest is not None:
+            await self.digest.flush()
+
+
+async def reclaim_pending(r: aioredis.Redis, dispatcher: Dispatcher, consumer: str) -> None:
+    """Periodically XAUTOCLAIM entries left pending by crashed or stuck consumers."""
+    min_idle_ms = claim_idle_ms(dispatcher.digest is not None)
+
+    while True:
+        try:
+            start = "0-0"
+            while True:
+                start, entries, *_deleted = await r.xautoclaim(
+                    STREAM, GROUP, consumer,
+                    min_idle_time = min_idle_ms,
+                    start_id      = start,
+                    count         = settings.WORKER_READ_COUNT,
+                )
+                # Entries trimmed from the stream come back as (None, None) on Redis 6.2
+                await dispatcher.submit_batch([(m, d) for m, d in entries if m is not None])
+                if start in (b"0-0", "0-0"):
+                    break
+        except Exception as e:
+            print(f"[WORKER] Reclaim error: {e}")
+
+        await asyncio.sleep(settings.WORKER_CLAIM_INTERVAL_S)
 
 
 async def consume_queue() -> None:
-    r = await aioredis.from_url(settings.REDIS_URL)
+    global notifier
+    r        = get_redis()
+    consumer = consumer_name()
+    notifier = build_notifier()
 
     # Create consumer group if it doesn't exist
     try:
-        await r.xgroup_create("decay_alerts", "workers", id="0", mkstream=True)
+        await r.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
         print("[WORKER] Consumer group created")
     except Exception:
         pass   # Already exists
 
-    print("[WORKER] Listening for decay alerts...")
+    digest     = settings.ALERT_DELIVERY_MODE == "digest"
+    dispatcher = Dispatcher(r, settings.WORKER_CONCURRENCY, digest=digest)
+    background = [
+        asyncio.create_task(reclaim_pending(r, dispatcher, consumer)),
+        asyncio.create_task(requeue_due_retries(r)),
+    ]
+    if dispatcher.digest is not None:
+        background.append(asyncio.create_task(dispatcher.digest.run()))
+    print(f"[WORKER] {consumer} listening for decay alerts "
+          f"(concurrency={settings.WORKER_CONCURRENCY}, mode={settings.ALERT_DELIVERY_MODE})...")
 
-    while True:
-        try:
-            messages = await r.xreadgroup(
-                "workers", "w1",
-                {"decay_alerts": ">"},
-                count=10,
-                block=5000,    # block for 5 s if empty
-            )
+    error_delay = 0.5
+    try:
+        while True:
+            try:
+                messages = await r.xreadgroup(
+                    GROUP, consumer,
+                    {STREAM: ">"},
+                    count=settings.WORKER_READ_COUNT,
+                    block=5000,    # block for 5 s if empty
+                )
 
-            if messages:
-                for _stream, entries in messages:
-                    for msg_id, data in entries:
-                        topic     = data[b"topic"].decode()
-                        retention = data[b"retention"].decode()
-                        print(f"[WORKER] ⚠️  {topic} at {retention}% retention")
+                for _stream, entries in messages or []:
+                    await dispatcher.submit_batch(entries)
+                error_delay = 0.5
 
-                        await notify_user(data)
-                        await r.xack("decay_alerts", "workers", msg_id)
+            except Exception as e:
+                # Read/lookup failures back off exponentially; in-flight handlers keep running
+                print(f"[WORKER] Error: {e} — retrying in {error_delay:.1f}s")
+                await asyncio.sleep(error_delay)
+                error_delay = min(error_delay * 2, 30.0)
+    finally:
+        for task in background:
+            task.cancel()
+        await dispatcher.drain()
+        if notifier is not None:
+            await notifier.close()
+        await close_redis()
 
-        except Exception as e:
-            print(f"[WORKER] Error: {e}")
-            await asyncio.sleep(5)
+
+# ── CLI ────────────────────────────────────────────────────────────────────────
+
+async def _dead_command(args: argparse.Namespace) -> None:
+    r = get_redis()
+    try:
+        if args.action == "list":
+            entries = await list_dead(r, args.count)
+            for dead_id, data in entries:
+                fields = _decode(data)
+                print(f"{dead_id.decode()}  item={fields.get('item_id')} topic={fields.get('topic')!r} "
+                      f"attempts={fields.get('attempts')} error={fields.get('error')}")
+            print(f"{await r.xlen(DEAD_STREAM)} dead letter(s) in {DEAD_STREAM}")
+        else:
+            if not args.ids and not args.all:
+                raise SystemExit("replay: pass dead-letter ids or --all")
+            replayed = await replay_dead(r, None if args.all else args.ids)
+            print(f"Replayed {replayed} dead letter(s) onto {STREAM}")
+    finally:
+        await close_redis()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Decay-alert worker")
+    sub    = parser.add_subparsers(dest="command")
+    sub.add_parser("run", help="consume decay alerts (default)")
+
+    dead        = sub.add_parser("dead", help=f"inspect or replay {DEAD_STREAM}")
+    dead_action = dead.add_subparsers(dest="action", required=True)
+    ls = dead_action.add_parser("list", help="show dead letters, oldest first")
+    ls.add_argument("--count", type=int, default=20)
+    replay = dead_action.add_parser("replay", help="re-enqueue dead letters onto the stream")
+    replay.add_argument("ids", nargs="*", help="dead-letter stream ids")
+    replay.add_argument("--all", action="store_true", help="replay every dead letter")
+
+    args = parser.parse_args(argv)
+    if args.command == "dead":
+        asyncio.run(_dead_command(args))
+    else:
+        asyncio.run(consume_queue())
 
 
 if __name__ == "__main__":
-    asyncio.run(consume_queue())
+    main()
@@ -1,4 +1,4 @@
-import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
+import { useInfiniteQuery, useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import { apiClient } from './client';
 
 // ── Types ──────────────────────────────────────────────────────────────────────
@@ -7,7 +7,8 @@ export interface KnowledgeItem {
   id: number;
   user_id: number;
   topic: string;
-  content?: string;
+  content?: string | null;   // list endpoints: null unless include=content
+  content_preview?: string | null;   // first 80 characters, "…" if cut
   attention: number;
   interest: number;
   difficulty: number;
@@ -21,6 +22,7 @@ export interface KnowledgeItem {
   last_reviewed?: string;
   last_used?: string;
   created_at: string;
+  alert_due_at?: string;
   current_retention: number;
   half_life_days: number;
   days_to_forget: number;
@@ -62,16 +64,49 @@ export interface DailyRetention {
 
 // ── Items ──────────────────────────────────────────────────────────────────────
 
-export const useItems = () =>
+// Server-side sort keys for GET /items; prefix with '-' for descending
+export type ItemSort = 'id' | 'created_at' | 'decay_rate' | 'retention' | 'topic';
+
+export interface ItemQuery {
+  sort?:  ItemSort | `-${ItemSort}`;
+  topic?: string;      // prefix match, case-insensitive
+  limit?: number;      // page size, max 500
+  include?: 'content'; // notes are left out of list responses otherwise
+}
+
+export interface ItemPage {
+  items:      KnowledgeItem[];
+  nextCursor: string | null;
+}
+
+const fetchItemPage = (query: ItemQuery, after?: string | null): Promise<ItemPage> =>
+  apiClient
+    .get('/items/', { params: { ...query, after: after ?? undefined } })
+    .then((r: { data: any; headers: any }) => ({
+      items:      r.data,
+      nextCursor: r.headers['x-next-cursor'] ?? null,
+    }));
+
+// First page only — enough for overviews
+export const useItems = (query: ItemQuery = {}) =>
   useQuery<KnowledgeItem[]>({
-    queryKey: ['items'],
-    queryFn:  () => apiClient.get('/items/').then((r: { data: any; }) => r.data),
+    queryKey: ['items', 'page', query],
+    queryFn:  () => fetchItemPage(query).then(p => p.items),
   });
 
-export const useDecayingItems = (threshold = 60) =>
+// Cursor-paginated list; call fetchNextPage() while hasNextPage
+export const useItemPages = (query: ItemQuery = {}) =>
+  useInfiniteQuery<ItemPage>({
+    queryKey:         ['items', 'pages', query],
+    queryFn:          ({ pageParam }) => fetchItemPage(query, pageParam as string | null),
+    initialPageParam: null,
+    getNextPageParam: (last) => last.nextCursor,
+  });
+
+export const useDecayingItems = (threshold = 60, include?: 'content') =>
   useQuery<KnowledgeItem[]>({
-    queryKey: ['items', 'decaying', threshold],
-    queryFn:  () => apiClient.get(`/items/decaying?threshold=${threshold}`).then((r: { data: any; }) => r.data),
+    queryKey: ['items', 'decaying', threshold, include],
+    queryFn:  () => apiClient.get('/items/decaying', { params: { threshold, include } }).then((r: { data: any; }) => r.data),
     refetchInterval: 1000 * 60 * 5,   // Refresh every 5 min
   });
 
@@ -140,10 +175,12 @@ export const useHardestTopics = (limit = 10) =>
     queryFn:  () => apiClient.get(`/insights/hardest?limit=${limit}`).then((r: { data: any; }) => r.data),
   });
 
-export const useRetentionTimeline = () =>
+export const useRetentionTimeline = (days = 30, granularity: 'daily' | 'weekly' = 'daily') =>
   useQuery<DailyRetention[]>({
-    queryKey: ['insights', 'timeline'],
-    queryFn:  () => apiClient.get('/insights/timeline').then((r: { data: any; }) => r.data),
+    queryKey: ['insights', 'timeline', days, granularity],
+    queryFn:  () => apiClient
+      .get(`/insights/timeline?days=${days}&granularity=${granularity}`)
+      .then((r: { data: any; }) => r.data),
   });
 
 export const useUpcomingForgets = (days = 30) =>
@@ -164,6 +201,25 @@ export const useSleepImpact = () =>
     queryFn:  () => apiClient.get('/insights/sleep-impact').then((r: { data: any; }) => r.data),
   });
 
+export interface InsightDashboard {
+  summary?:          InsightSummary;
+  weakest?:          WeakItem[];
+  hardest?:          WeakItem[];
+  timeline?:         DailyRetention[];
+  upcoming_forgets?: any[];
+  most_reviewed?:    any[];
+  sleep_impact?:     any[];
+}
+
+// One request for any subset of the sections above, e.g. ['summary', 'weakest']
+export const useInsightDashboard = (sections: string[] = [], limit = 10, days = 30) =>
+  useQuery<InsightDashboard>({
+    queryKey: ['insights', 'dashboard', sections.join(','), limit, days],
+    queryFn:  () => apiClient
+      .get(`/insights/dashboard?sections=${sections.join(',')}&limit=${limit}&days=${days}`)
+      .then((r: { data: any; }) => r.data),
+  });
+
 // ── Auth ───────────────────────────────────────────────────────────────────────
 
 export const useLogin = () =>
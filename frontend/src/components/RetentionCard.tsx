@@ -48,9 +48,9 @@ export default function RetentionCard({ item, index = 0 }: Props) {
           <h3 style={{ fontSize: 22, fontWeight: 900, color: 'var(--color-cream)', textTransform: 'uppercase', marginBottom: 8, lineHeight: 1.1 }}>
             {item.topic}
           </h3>
-          {item.content && (
+          {item.content_preview && (
             <p style={{ fontSize: 14, color: 'var(--color-cream)', opacity: 0.8, lineHeight: 1.5, fontFamily: 'monospace' }}>
-              {item.content.slice(0, 80)}{item.content.length > 80 ? '…' : ''}
+              {item.content_preview}
             </p>
           )}
         </div>
@@ -1,35 +1,39 @@
 import { useState } from 'react';
-import { useItems } from '../api/queries';
+import { useItemPages } from '../api/queries';
 import RetentionCard from '../components/RetentionCard';
 import ReviewModal from '../components/ReviewModal';
-import type { KnowledgeItem } from '../api/queries';
+import type { ItemQuery, KnowledgeItem } from '../api/queries';
 
 type SortKey = 'retention' | 'half_life' | 'created_at' | 'topic';
 
+// Shortest half-life first = highest decay rate first
+const SERVER_SORT: Record<SortKey, ItemQuery['sort']> = {
+  retention:  'retention',
+  half_life:  '-decay_rate',
+  topic:      'topic',
+  created_at: '-created_at',
+};
+
 export default function AllItems() {
-  const { data: items = [], isLoading } = useItems();
   const [sortBy, setSortBy]     = useState<SortKey>('retention');
   const [filter, setFilter]     = useState('');
   const [reviewing, setReviewing] = useState<KnowledgeItem | null>(null);
 
-  const sorted = [...items]
-    .filter(i => i.topic.toLowerCase().includes(filter.toLowerCase()))
-    .sort((a, b) => {
-      if (sortBy === 'retention')  return a.current_retention - b.current_retention;
-      if (sortBy === 'half_life')  return a.half_life_days - b.half_life_days;
-      if (sortBy === 'topic')      return a.topic.localeCompare(b.topic);
-      return new Date(b.created_at).getTime() - new Date(a.created_at).getTime();
-    });
+  // Sorting and topic filtering happen server-side, one page at a time; the
+  // filter matches the start of the topic, ignoring case
+  const { data, isLoading, hasNextPage, fetchNextPage, isFetchingNextPage } =
+    useItemPages({ sort: SERVER_SORT[sortBy], topic: filter || undefined });
+  const sorted = data?.pages.flatMap(p => p.items) ?? [];
 
   return (
     <div style={{ padding: '3rem', maxWidth: 1400, margin: '0 auto' }}>
       <h1 className="brutalist-header" style={{ fontSize: 48, marginBottom: 8, color: 'var(--color-cream)' }}>DATABASE LOGS</h1>
-      <p style={{ color: 'var(--color-lime)', marginBottom: 32, fontWeight: 700, textTransform: 'uppercase', letterSpacing: '0.05em' }}>{items.length} ASSETS REGISTERED</p>
+      <p style={{ color: 'var(--color-lime)', marginBottom: 32, fontWeight: 700, textTransform: 'uppercase', letterSpacing: '0.05em' }}>{sorted.length}{hasNextPage ? '+' : ''} ASSETS REGISTERED</p>
 
       {/* Controls */}
       <div style={{ display: 'flex', gap: 16, marginBottom: 32, flexWrap: 'wrap' }}>
         <input
-          placeholder="QUERY TOPIC..."
+          placeholder="TOPIC STARTS WITH..."
           value={filter}
           onChange={e => setFilter(e.target.value)}
           style={{
@@ -67,6 +71,19 @@ export default function AllItems() {
         </div>
       )}
 
+      {hasNextPage && (
+        <button
+          onClick={() => fetchNextPage()}
+          disabled={isFetchingNextPage}
+          style={{
+            marginTop: 32, padding: '12px 24px', background: 'var(--color-lime)', border: '3px solid var(--color-cream)',
+            color: 'var(--color-void)', fontSize: 16, fontWeight: 900, textTransform: 'uppercase', cursor: 'pointer'
+          }}
+        >
+          {isFetchingNextPage ? 'LOADING...' : 'LOAD MORE'}
+        </button>
+      )}
+
       {reviewing && <ReviewModal item={reviewing} onClose={() => setReviewing(null)} />}
     </div>
   );
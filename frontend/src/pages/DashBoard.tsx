@@ -6,7 +6,7 @@ import ItemCreateForm from '../components/ItemCreateForm';
 import SettingsPanel from '../components/SettingsPanel';
 
 export default function DashBoard() {
-  const { data: allItems   = [], isLoading: loadingAll } = useItems();
+  const { data: allItems   = [], isLoading: loadingAll } = useItems({ sort: 'retention', limit: 100 });
   const { data: decaying   = [], isLoading: loadingDecay } = useDecayingItems(60);
   const { data: summary } = useInsightSummary();
 
@@ -19,7 +19,7 @@ export default function DashBoard() {
             SYSTEM OVERVIEW
           </h1>
           <p style={{ color: 'var(--color-lime)', marginTop: 8, fontWeight: 700, textTransform: 'uppercase', letterSpacing: '0.05em' }}>
-            STATUS: ACTIVE /// TRACKING {allItems.length} LOGS
+            STATUS: ACTIVE /// TRACKING {summary?.total_items ?? allItems.length} LOGS
           </p>
         </div>
         <div style={{ display: 'flex', gap: 16 }}>
@@ -70,13 +70,10 @@ export default function DashBoard() {
       {!loadingAll && allItems.length > 0 && (
         <div>
           <h2 className="brutalist-header" style={{ fontSize: 32, marginBottom: 24, color: 'var(--color-cream)' }}>
-            DATABASE ({allItems.length})
+            DATABASE ({summary?.total_items ?? allItems.length})
           </h2>
           <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fill, minmax(360px, 1fr))', gap: 24 }}>
-            {[...allItems]
-              .sort((a, b) => a.current_retention - b.current_retention)
-              .map((item, i) => <RetentionCard key={item.id} item={item} index={i} />)
-            }
+            {allItems.map((item, i) => <RetentionCard key={item.id} item={item} index={i} />)}
           </div>
         </div>
       )}
@@ -4,6 +4,10 @@ Tests validate: K₀ encoding, decay rate sensitivity, retention curve, and edge
 """
 
 import math
+from array import array
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
 import pytest
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
@@ -15,6 +19,13 @@ from app.decay import (
     compute_half_life,
     compute_time_to_forget,
     update_ema,
+    compute_alert_due_at,
+    compute_decay_rate_batch,
+    compute_retention_batch,
+    compute_half_life_batch,
+    compute_time_to_forget_batch,
+    compute_item_batch,
+    retention_series_batch,
 )
 
 
@@ -191,6 +202,23 @@ class TestComputeTimeToForget:
         assert compute_time_to_forget(80, 0, 10.0) == float("inf")
 
 
+# ── Alert scheduling tests ─────────────────────────────────────────────────────
+
+class TestComputeAlertDueAt:
+    ANCHOR = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def test_retention_at_due_time_equals_threshold(self):
+        due  = compute_alert_due_at(80, 0.1, 0.1, self.ANCHOR, threshold=60.0)
+        days = (due - self.ANCHOR).total_seconds() / 86400
+        assert compute_retention(80, 0.1, days, 0.1) == pytest.approx(60.0)
+
+    def test_starts_below_threshold_is_due_immediately(self):
+        assert compute_alert_due_at(50, 0.1, 0.1, self.ANCHOR, threshold=60.0) == self.ANCHOR
+
+    def test_zero_decay_rate_is_never_due(self):
+        assert compute_alert_due_at(80, 0, 0.1, self.ANCHOR, threshold=60.0) is None
+
+
 # ── EMA update tests ───────────────────────────────────────────────────────────
 
 class TestUpdateEma:
@@ -214,6 +242,71 @@ class TestUpdateEma:
         assert val < 0.01
 
 
+# ── Batch (column-wise) tests ─────────────────────────────────────────────────
+
+class TestBatchFunctions:
+    K0     = [80.0, 50.0, 95.0, 30.0]
+    K      = [0.1, 0.5, 0.0, 0.02]
+    DAYS   = [0.0, 3.5, 10.0, 400.0]
+    FLOORS = [10.0, 5.0, 0.1, 20.0]
+
+    def test_retention_matches_scalar(self):
+        batch = compute_retention_batch(self.K0, self.K, self.DAYS, self.FLOORS)
+        for got, k0, k, t, m in zip(batch, self.K0, self.K, self.DAYS, self.FLOORS):
+            assert got == pytest.approx(compute_retention(k0, k, t, m))
+
+    def test_accepts_array_d(self):
+        batch = compute_retention_batch(array("d", self.K0), array("d", self.K),
+                                        array("d", self.DAYS), array("d", self.FLOORS))
+        assert len(batch) == 4
+
+    def test_half_life_matches_scalar_with_inf_guard(self):
+        batch = compute_half_life_batch(self.K)
+        assert list(batch) == [pytest.approx(compute_half_life(k)) for k in self.K]
+        assert batch[2] == float("inf")
+
+    def test_time_to_forget_matches_scalar(self):
+        for threshold in (10.0, 60.0):
+            batch = compute_time_to_forget_batch(self.K0, self.K, self.FLOORS, threshold)
+            for got, k0, k, m in zip(batch, self.K0, self.K, self.FLOORS):
+                expected = compute_time_to_forget(k0, k, m, threshold)
+                if math.isinf(expected):
+                    assert got == expected
+                else:
+                    assert got == pytest.approx(expected)
+
+    def test_decay_rate_matches_scalar(self):
+        args = ([0.5, 0.9], [0.5, 0.0], [0.8, 0.0], [0.7, 0.0], [0.8, 0.0], [0.0, 0.3], [0.2, 0.0])
+        batch = compute_decay_rate_batch(*args)
+        for idx, got in enumerate(batch):
+            assert got == pytest.approx(compute_decay_rate(*(a[idx] for a in args)))
+
+    def test_item_batch_uses_last_review_or_creation(self):
+        now   = datetime(2026, 1, 10, tzinfo=timezone.utc)
+        items = [
+            SimpleNamespace(k0_initial_strength=80.0, decay_rate=0.1, memory_floor=0.1,
+                            last_reviewed=None, created_at=now - timedelta(days=4)),
+            SimpleNamespace(k0_initial_strength=80.0, decay_rate=0.1, memory_floor=0.1,
+                            last_reviewed=(now - timedelta(days=1)).replace(tzinfo=None),
+                            created_at=now - timedelta(days=30)),
+        ]
+        batch = compute_item_batch(items, now)
+        assert list(batch.days_elapsed) == pytest.approx([4.0, 1.0])
+        assert batch.retention[0] == pytest.approx(compute_retention(80.0, 0.1, 4.0, 0.1))
+
+    def test_retention_series_matches_per_day_loop(self):
+        start   = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+        created = [start - 86400 * 3.5, start + 86400 * 2.25, start - 86400 * 40, start]
+        expected = []
+        for d in range(30):
+            elapsed = [max(math.floor((start + d * 86400 - c) / 86400), 0) for c in created]
+            expected.append(compute_retention_batch(self.K0, self.K, elapsed, self.FLOORS).mean())
+
+        for max_cells in (1_000_000, 7):        # one grid, and chunked by a couple of days
+            series = retention_series_batch(self.K0, self.K, self.FLOORS, created, start, 30, max_cells)
+            assert series.tolist() == expected
+
+
 # ── Integration scenario tests ────────────────────────────────────────────────
 
 class TestIntegrationScenarios:
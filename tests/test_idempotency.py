@@ -0,0 +1,205 @@
+"""
+Tests for Idempotency-Key handling: retries replay the stored response
+instead of repeating the write, through Redis or the database fallback.
+Uses an in-memory SQLite database for isolation.
+"""
+
+import hashlib
+import json
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import app.idempotency as idempotency
+from app.main import app
+from app.database import Base, get_db
+from app.insight_cache import insight_cache
+
+TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
+engine = create_async_engine(TEST_DB_URL, echo=False)
+TestSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+ITEM = {"topic": "Retried", "attention": 0.6, "interest": 0.5, "difficulty": 0.5}
+
+
+async def override_get_db():
+    async with TestSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def no_bump(user_id):
+    pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.down = False
+        self.fail_completes = False     # down between reserving a key and storing its response
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis down")
+
+    async def set(self, key, value, nx=False, ex=None):
+        self._check()
+        if self.fail_completes and not nx and key != idempotency.FALLBACK_MARKER:
+            raise ConnectionError("redis down")
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode()
+        return True
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def delete(self, key):
+        self._check()
+        self.data.pop(key, None)
+
+    async def exists(self, key):
+        self._check()
+        return int(key in self.data)
+
+
+@pytest.fixture(params=["redis", "database"])
+def store(request, monkeypatch):
+    r = FakeRedis()
+    r.down = request.param == "database"
+    monkeypatch.setattr(idempotency, "get_redis", lambda: r)
+    for attr in ("_down_until", "_db_written", "_db_announced"):
+        monkeypatch.setattr(idempotency.idempotency_store, attr, 0.0)
+    return r
+
+
+def redis_back(r):
+    r.down = r.fail_completes = False
+    r.data = {k: v for k, v in r.data.items() if k == idempotency.FALLBACK_MARKER}    # locks expired
+    idempotency.idempotency_store._down_until = 0.0
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db(monkeypatch):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(idempotency, "AsyncSessionLocal", TestSessionLocal)
+    monkeypatch.setattr(insight_cache, "bump", no_bump)
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+@pytest.mark.asyncio
+async def test_retried_create_returns_first_item(client, store):
+    headers = {"Idempotency-Key": "create-1"}
+    first   = await client.post("/api/items/", json=ITEM, headers=headers)
+    retry   = await client.post("/api/items/", json=ITEM, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.content == first.content
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert len((await client.get("/api/items/")).json()) == 1
+
+
+@pytest.mark.asyncio
+async def test_retried_review_applies_once(client, store):
+    item_id = (await client.post("/api/items/", json=ITEM)).json()["id"]
+    for _ in range(3):
+        r = await client.post(f"/api/items/{item_id}/review", json={"used_in_practice": False},
+                              headers={"Idempotency-Key": "review-1"})
+        assert r.status_code == 200
+    assert (await client.get(f"/api/items/{item_id}")).json()["revision_frequency"] == pytest.approx(0.1)
+
+    # A new key is a new review
+    await client.post(f"/api/items/{item_id}/review", json={"used_in_practice": False},
+                      headers={"Idempotency-Key": "review-2"})
+    assert (await client.get(f"/api/items/{item_id}")).json()["revision_frequency"] == pytest.approx(0.19)
+
+
+@pytest.mark.asyncio
+async def test_key_reuse_for_other_request_rejected(client, store):
+    headers = {"Idempotency-Key": "shared"}
+    await client.post("/api/items/", json=ITEM, headers=headers)
+    r = await client.post("/api/items/", json={**ITEM, "topic": "Other"}, headers=headers)
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_in_progress_and_failed_attempts(client, store):
+    body        = json.dumps(ITEM).encode()
+    fingerprint = hashlib.sha256(b"POST\n/api/items/\n\n" + body).hexdigest()
+    await idempotency.idempotency_store.reserve("idem:1:busy", fingerprint)
+    r = await client.post("/api/items/", content=body, headers={"Idempotency-Key": "busy"})
+    assert r.status_code == 409
+
+    # Client errors are stored like any other response; requests without a key are untouched
+    bad = {"Idempotency-Key": "bad"}
+    assert (await client.post("/api/items/", json={"topic": ""}, headers=bad)).status_code == 422
+    assert (await client.post("/api/items/", json={"topic": ""}, headers=bad)).headers["idempotent-replayed"] == "true"
+    await client.post("/api/items/", json=ITEM)
+    await client.post("/api/items/", json=ITEM)
+    assert len((await client.get("/api/items/")).json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_overlong_key_rejected(client):
+    r = await client.post("/api/items/", json=ITEM, headers={"Idempotency-Key": "k" * 500})
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_key_reuse_with_other_query_rejected(client, store):
+    headers = {"Idempotency-Key": "bulk"}
+    rows    = [ITEM, {**ITEM, "topic": ""}]
+    assert (await client.post("/api/items/bulk?atomic=true", json=rows, headers=headers)).status_code == 422
+    r = await client.post("/api/items/bulk?atomic=false", json=rows, headers=headers)
+    assert r.status_code == 422 and "different request" in r.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_retry_after_outage_replays_from_database(client, store):
+    store.down = True
+    headers = {"Idempotency-Key": "outage"}
+    first   = await client.post("/api/items/", json=ITEM, headers=headers)
+
+    redis_back(store)
+    idempotency.idempotency_store._db_written = 0.0     # another replica wrote it; only the marker tells
+    idempotency.idempotency_store._db_announced = 0.0
+    store.data[idempotency.FALLBACK_MARKER] = b"1"
+    retry = await client.post("/api/items/", json=ITEM, headers=headers)
+
+    assert retry.content == first.content and retry.headers["idempotent-replayed"] == "true"
+    assert len((await client.get("/api/items/")).json()) == 1
+
+
+@pytest.mark.asyncio
+async def test_response_kept_when_redis_fails_before_complete(client, store):
+    store.fail_completes = True
+    headers = {"Idempotency-Key": "flaky"}
+    first   = await client.post("/api/items/", json=ITEM, headers=headers)
+    assert first.status_code == 201
+
+    redis_back(store)
+    retry = await client.post("/api/items/", json=ITEM, headers=headers)
+    assert retry.content == first.content and retry.headers["idempotent-replayed"] == "true"
+    assert len((await client.get("/api/items/")).json()) == 1
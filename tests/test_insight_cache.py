@@ -0,0 +1,200 @@
+"""
+Tests for the per-user insight cache: hits, generation-based invalidation and
+falling back to direct computation when Redis is down.
+"""
+
+from collections import OrderedDict
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import app.insight_cache as cache_module
+from app.insight_cache import insight_cache
+from app.main import app
+from app.database import Base, get_db
+
+TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
+engine = create_async_engine(TEST_DB_URL, echo=False)
+TestSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def override_get_db():
+    async with TestSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def set(self, key, value, ex=None):
+        self.calls.append((key, value))
+
+    async def execute(self):
+        for key, value in self.calls:
+            self.redis.data[key] = value.encode()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data  = {}
+        self.down  = False
+        self.calls = 0
+
+    def _check(self):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("redis down")
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self._check()
+        return [self.data.get(k) for k in keys]
+
+    async def incr(self, key):
+        self._check()
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    def pipeline(self, transaction=True):
+        self._check()
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    r = FakeRedis()
+    monkeypatch.setattr(cache_module, "get_redis", lambda: r)
+    monkeypatch.setattr(insight_cache, "local", OrderedDict())
+    monkeypatch.setattr(insight_cache, "stats", dict.fromkeys(insight_cache.stats, 0))
+    monkeypatch.setattr(insight_cache, "generations", OrderedDict())
+    monkeypatch.setattr(insight_cache, "_unsent_bumps", set())
+    monkeypatch.setattr(insight_cache, "_down_until", 0.0)
+    return r
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def create_item(client, topic="Topic"):
+    r = await client.post("/api/items/", json={
+        "topic": topic, "attention": 0.6, "interest": 0.5, "difficulty": 0.5,
+    })
+    return r.json()
+
+
+@pytest.mark.asyncio
+async def test_repeat_request_is_served_from_local_lru(client, fake_redis):
+    await create_item(client)
+    first  = (await client.get("/api/insights/summary")).json()
+    second = (await client.get("/api/insights/summary")).json()
+
+    assert first == second
+    assert insight_cache.stats["misses"] == 1
+    assert insight_cache.stats["local_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_hit_after_local_eviction(client, fake_redis):
+    await create_item(client)
+    await client.get("/api/insights/weakest")
+    insight_cache.local.clear()                 # e.g. a different API process
+    await client.get("/api/insights/weakest")
+    assert insight_cache.stats["redis_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dashboard_reuses_cached_sections(client, fake_redis):
+    await create_item(client)
+    await client.get("/api/insights/summary")
+    r = await client.get("/api/insights/dashboard?sections=summary,timeline")
+    assert set(r.json()) == {"summary", "timeline"}
+    assert insight_cache.stats["local_hits"] == 1
+    assert insight_cache.stats["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_exactly(client, fake_redis):
+    item = await create_item(client)
+    assert (await client.get("/api/insights/summary")).json()["total_items"] == 1
+
+    await create_item(client, "Second")
+    assert (await client.get("/api/insights/summary")).json()["total_items"] == 2
+
+    before = (await client.get("/api/insights/most-reviewed")).json()
+    await client.post(f"/api/items/{item['id']}/review", json={"used_in_practice": True})
+    after  = (await client.get("/api/insights/most-reviewed")).json()
+    assert after != before
+
+    await client.patch(f"/api/items/{item['id']}", json={"sleep_quality": 0.1})
+    await client.delete(f"/api/items/{item['id']}")
+    assert (await client.get("/api/insights/summary")).json()["total_items"] == 1
+    assert fake_redis.data["insights:gen:1"] == b"5"         # 2 creates, review, patch, delete
+
+
+@pytest.mark.asyncio
+async def test_redis_down_falls_back_to_direct_compute(client, fake_redis):
+    fake_redis.down = True
+    await create_item(client)
+    r = await client.get("/api/insights/summary")
+    assert r.status_code == 200 and r.json()["total_items"] == 1
+    assert insight_cache.stats["errors"] >= 1
+
+    stats = (await client.get("/api/insights/cache-stats")).json()
+    assert {"local_hits", "redis_hits", "misses", "errors"} <= set(stats)
+
+
+@pytest.mark.asyncio
+async def test_generation_is_reused_within_its_ttl(client, fake_redis):
+    await create_item(client)
+    await client.get("/api/insights/summary")
+    calls = fake_redis.calls
+    for _ in range(3):
+        await client.get("/api/insights/summary")
+    assert fake_redis.calls == calls                # local hits, no GET of the generation
+    assert insight_cache.stats["local_hits"] == 3
+
+    insight_cache.generations[1] = (insight_cache.generations[1][0], 0.0)     # TTL over
+    await client.get("/api/insights/summary")
+    assert fake_redis.calls == calls + 1
+
+
+@pytest.mark.asyncio
+async def test_bump_skips_redis_while_down_and_is_sent_on_recovery(fake_redis, monkeypatch):
+    assert await insight_cache.generation(1) == 0
+    insight_cache._down_until = float("inf")
+    calls = fake_redis.calls
+    await insight_cache.bump(1)
+    await insight_cache.bump(1)
+    assert fake_redis.calls == calls
+
+    insight_cache._down_until = 0.0
+    assert await insight_cache.generation(1) == 1   # pre-outage entries (g0) are not served
@@ -9,7 +9,10 @@ import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
 
 from app.main import app
+from app.config import settings
 from app.database import Base, get_db
+from app.insight_cache import insight_cache
+from app.models import KnowledgeItem
 
 TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
 engine = create_async_engine(TEST_DB_URL, echo=False)
@@ -109,6 +112,23 @@ async def test_timeline_returns_30_days(client):
     assert len(r.json()) == 30
 
 
+@pytest.mark.asyncio
+async def test_timeline_long_range_and_weekly(client):
+    await seed_items(client)
+    daily = (await client.get("/api/insights/timeline?days=365")).json()
+    assert len(daily) == 365
+    assert daily[-30:] == (await client.get("/api/insights/timeline")).json()
+
+    weekly = (await client.get("/api/insights/timeline?days=30&granularity=weekly")).json()
+    assert len(weekly) == 5                       # 4 full weeks + a 2-day bucket
+    assert weekly[0]["date"] == daily[-30]["date"]
+    assert weekly[-1]["date"] == daily[-7]["date"]
+
+    too_long = settings.TIMELINE_MAX_DAYS + 1
+    assert (await client.get(f"/api/insights/timeline?days={too_long}")).status_code == 422
+    assert (await client.get("/api/insights/timeline?granularity=hourly")).status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_timeline_empty_with_no_items(client):
     r = await client.get("/api/insights/timeline")
@@ -144,3 +164,57 @@ async def test_sleep_impact(client):
     for row in r.json():
         assert row["k_poor_sleep"] > row["k_good_sleep"]
         assert row["decay_multiplier"] > 1.0
+
+
+@pytest.mark.asyncio
+async def test_dashboard_matches_individual_endpoints(client):
+    await seed_items(client)
+    r = await client.get("/api/insights/dashboard")
+    assert r.status_code == 200
+    data = r.json()
+    assert set(data) == {"summary", "weakest", "hardest", "timeline",
+                         "upcoming_forgets", "most_reviewed", "sleep_impact"}
+    for section, path in [("summary", "summary"), ("weakest", "weakest"), ("hardest", "hardest"),
+                          ("timeline", "timeline"), ("upcoming_forgets", "upcoming-forgets"),
+                          ("most_reviewed", "most-reviewed"), ("sleep_impact", "sleep-impact")]:
+        assert data[section] == (await client.get(f"/api/insights/{path}")).json()
+
+
+@pytest.mark.asyncio
+async def test_dashboard_sections_filter(client):
+    await seed_items(client)
+    r = await client.get("/api/insights/dashboard?sections=summary,upcoming-forgets&days=90")
+    assert r.status_code == 200
+    assert set(r.json()) == {"summary", "upcoming_forgets"}
+
+
+@pytest.mark.asyncio
+async def test_dashboard_rejects_unknown_section(client):
+    r = await client.get("/api/insights/dashboard?sections=summary,bogus")
+    assert r.status_code == 422
+    assert "bogus" in r.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_top_k_matches_full_sort(client):
+    await seed_items(client, n=6)
+    full = (await client.get("/api/insights/dashboard?sections=weakest,hardest&limit=100")).json()
+    for limit in (1, 3, 6):
+        assert (await client.get(f"/api/insights/weakest?limit={limit}")).json() == full["weakest"][:limit]
+        assert (await client.get(f"/api/insights/hardest?limit={limit}")).json() == full["hardest"][:limit]
+
+
+@pytest.mark.asyncio
+async def test_hardest_ties_on_rounded_half_life_break_by_id(client):
+    # Half-lives 3.0006 and 2.9942 both show as 3.0; the lower id ranks first
+    async with TestSessionLocal() as db:
+        for k in (0.2310, 0.2315, 0.5):
+            db.add(KnowledgeItem(user_id=1, topic=f"k={k}", attention=0.5, interest=0.5, difficulty=0.5,
+                                 k0_initial_strength=80.0, decay_rate=k, memory_floor=0.1))
+        await db.commit()
+    await insight_cache.bump(1)
+
+    full    = (await client.get("/api/insights/dashboard?sections=hardest&limit=100")).json()["hardest"]
+    hardest = (await client.get("/api/insights/hardest?limit=2")).json()
+    assert [i["id"] for i in full] == [3, 1, 2]
+    assert hardest == full[:2]
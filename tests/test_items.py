@@ -3,9 +3,15 @@ Integration tests for /api/items endpoints.
 Uses an in-memory SQLite database for isolation.
 """
 
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 import sys, os
@@ -13,6 +19,10 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
 
 from app.main import app
 from app.database import Base, get_db
+from app.decay import compute_retention, compute_time_to_forget
+from app.decay_sql import EXP_FLOOR, retention_expr
+from app.models import KnowledgeItem
+from app.routes.items import topic_prefix_filter
 
 TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
 
@@ -130,3 +140,294 @@ async def test_computed_fields_present(client):
     assert "half_life_days"    in data
     assert "days_to_forget"    in data
     assert "days_since_review" in data
+
+
+@pytest.mark.asyncio
+async def test_create_item_schedules_alert(client):
+    """alert_due_at = creation + time for K(t) to fall to the 60 % alert threshold."""
+    data = (await client.post("/api/items/", json=ITEM_PAYLOAD)).json()
+    due     = datetime.fromisoformat(data["alert_due_at"])
+    created = datetime.fromisoformat(data["created_at"])
+    expected_days = compute_time_to_forget(
+        data["k0_initial_strength"], data["decay_rate"], data["memory_floor"], threshold=60.0
+    )
+    assert (due - created).total_seconds() / 86400 == pytest.approx(expected_days, abs=0.01)
+
+
+async def seed_aged_items():
+    now = datetime.now(timezone.utc)
+    async with TestSessionLocal() as db:
+        for i in range(12):
+            db.add(KnowledgeItem(
+                user_id=1, topic=f"Aged {i}", attention=0.5, interest=0.5, difficulty=0.5,
+                k0_initial_strength=60.0 + 3 * i, decay_rate=0.02 + 0.05 * (i % 4), memory_floor=0.1,
+                created_at=now - timedelta(days=2 * i + 0.3),
+                last_reviewed=now - timedelta(days=i) if i % 3 == 0 else None,
+            ))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_retention_expr_matches_python():
+    await seed_aged_items()
+    now = datetime.now(timezone.utc)
+    async with TestSessionLocal() as db:
+        rows = (await db.execute(select(KnowledgeItem, retention_expr(now)))).all()
+    for item, sql_retention in rows:
+        anchor  = (item.last_reviewed or item.created_at).replace(tzinfo=timezone.utc)
+        elapsed = max((now - anchor).total_seconds() / 86400, 0)
+        expected = compute_retention(item.k0_initial_strength, item.decay_rate, elapsed, item.memory_floor)
+        assert sql_retention == pytest.approx(expected, abs=1e-4)
+
+
+def test_retention_expr_clamps_exponent_on_postgres():
+    sql = str(retention_expr(datetime.now(timezone.utc)).compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True},
+    ))
+    assert "exp(greatest(" in sql and f", {EXP_FLOOR})" in sql
+
+
+@pytest.mark.asyncio
+async def test_decaying_survives_exponent_underflow(client):
+    now = datetime.now(timezone.utc)
+    async with TestSessionLocal() as db:
+        db.add(KnowledgeItem(
+            user_id=1, topic="Ancient", attention=0.5, interest=0.5, difficulty=0.5,
+            k0_initial_strength=90.0, decay_rate=5.0, memory_floor=0.1,
+            created_at=now - timedelta(days=400),
+        ))
+        await db.commit()
+    r = await client.get("/api/items/decaying?threshold=50")
+    assert r.status_code == 200
+    assert r.json()[0]["current_retention"] == pytest.approx(0.1)
+
+
+@pytest.mark.asyncio
+async def test_decaying_matches_python_filter(client):
+    await seed_aged_items()
+    everything = (await client.get("/api/items/")).json()
+    for threshold in (10, 40, 55.5, 60, 70, 95):
+        r = await client.get(f"/api/items/decaying?threshold={threshold}")
+        expected = {i["id"] for i in everything if i["current_retention"] < threshold}
+        assert {i["id"] for i in r.json()} == expected
+
+
+async def walk_pages(client, query: str, limit: int) -> list:
+    pages, cursor = [], None
+    while True:
+        url = f"/api/items/?limit={limit}&{query}" + (f"&after={cursor}" if cursor else "")
+        r = await client.get(url)
+        assert r.status_code == 200
+        assert len(r.json()) <= limit
+        pages.append(r.json())
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            return [item for page in pages for item in page]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort,key", [
+    ("id",          lambda i: i["id"]),
+    ("-created_at", lambda i: (i["created_at"], i["id"])),
+    ("decay_rate",  lambda i: (i["decay_rate"], i["id"])),
+    ("-retention",  lambda i: (i["current_retention"], i["id"])),
+    ("topic",       lambda i: (i["topic"], i["id"])),
+])
+async def test_keyset_pages_cover_everything_in_order(client, sort, key):
+    await seed_aged_items()
+    walked = await walk_pages(client, f"sort={sort}", limit=5)
+    assert len(walked) == 12 and len({i["id"] for i in walked}) == 12
+    ordered = sorted(walked, key=key, reverse=sort.startswith("-"))
+    if sort.lstrip("-") == "retention":
+        # rounding to 2 dp can tie values the database ordered exactly
+        assert [i["current_retention"] for i in walked] == [i["current_retention"] for i in ordered]
+    else:
+        assert [i["id"] for i in walked] == [i["id"] for i in ordered]
+
+
+@pytest.mark.asyncio
+async def test_topic_prefix_filter_escapes_wildcards(client):
+    for topic in ("Python basics", "Python 100%", "Pyramids", "Rust"):
+        await client.post("/api/items/", json={**ITEM_PAYLOAD, "topic": topic})
+    topics = lambda r: sorted(i["topic"] for i in r.json())
+    assert topics(await client.get("/api/items/?topic=Py")) == ["Pyramids", "Python 100%", "Python basics"]
+    assert topics(await client.get("/api/items/?topic=Python%20100%25")) == ["Python 100%"]
+    assert topics(await client.get("/api/items/?topic=_y")) == []
+    assert topics(await client.get("/api/items/?topic=pYTHON")) == ["Python 100%", "Python basics"]
+
+
+def test_topic_filter_is_case_insensitive_on_postgres():
+    sql = str(topic_prefix_filter("Py%").compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True},
+    ))
+    assert sql.startswith("lower(knowledge_items.topic) LIKE 'py/")
+
+
+@pytest.mark.parametrize("sort, index", [
+    ("topic", "idx_user_topic_id"),
+    ("-decay_rate", "idx_user_decay_rate_id"),
+    ("created_at", "idx_user_created_at"),
+])
+@pytest.mark.asyncio
+async def test_indexed_sorts_need_no_sort_step(client, sort, index):
+    await seed_aged_items()
+    cursor = (await client.get(f"/api/items/?limit=3&sort={sort}")).headers["x-next-cursor"]
+    queries = []
+
+    def capture(conn, cursor_, statement, parameters, *args):
+        if "ORDER BY" in statement:
+            queries.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await client.get(f"/api/items/?limit=3&sort={sort}&after={cursor}")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    (statement, parameters), = queries
+    async with engine.connect() as conn:
+        plan = " ".join(row[-1] for row in await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+    assert index in plan and "TEMP B-TREE" not in plan
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_rejected(client):
+    assert (await client.get("/api/items/?after=not-a-cursor")).status_code == 400
+    await seed_aged_items()
+    cursor = (await client.get("/api/items/?limit=2&sort=id")).headers["x-next-cursor"]
+    assert (await client.get(f"/api/items/?sort=topic&after={cursor}")).status_code == 400
+    assert (await client.get("/api/items/?sort=content")).status_code == 422
+
+
+@pytest.mark.parametrize("sort, position", [
+    ("retention",   {"v": 50.0, "id": 1}),                              # no snapshot time
+    ("retention",   {"v": 50.0, "id": 1, "t": 12}),                     # snapshot not a string
+    ("retention",   {"v": 50.0, "id": 1, "t": "yesterday"}),
+    ("retention",   {"v": "50", "id": 1, "t": "2026-01-01T00:00:00+00:00"}),
+    ("created_at",  {"v": 1700000000, "id": 1}),
+    ("created_at",  {"v": "not a date", "id": 1}),
+    ("-decay_rate", {"v": "0.1", "id": 1}),
+    ("-decay_rate", {"v": float("nan"), "id": 1}),
+    ("topic",       {"v": ["a"], "id": 1}),
+    ("id",          {"v": 3, "id": "3"}),
+    ("id",          {"v": True, "id": 3}),
+])
+@pytest.mark.asyncio
+async def test_tampered_cursor_rejected(client, sort, position):
+    await seed_aged_items()
+    cursor = base64.urlsafe_b64encode(json.dumps({"s": sort, **position}).encode()).decode()
+    r = await client.get(f"/api/items/?sort={sort}&after={cursor}")
+    assert r.status_code == 400 and r.json()["detail"].startswith("Invalid cursor")
+
+
+def pydantic_bytes(content) -> bytes:
+    """What FastAPI's default response_model path would send."""
+    from fastapi.responses import JSONResponse
+    from app.schemas import ItemOut
+    if isinstance(content, dict):
+        return JSONResponse(ItemOut.model_validate(content).model_dump(mode="json")).body
+    return JSONResponse([ItemOut.model_validate(d).model_dump(mode="json") for d in content]).body
+
+
+def test_fast_encoding_matches_pydantic_bytes():
+    from app.serializers import FastJSONResponse, encode_items, enrich_rows
+    base = dict(
+        id=1, user_id=1, topic="Ünïcode — 日本語  ", content=None, attention=0.6, interest=0.5,
+        difficulty=0.5, k0_initial_strength=61.3, decay_rate=0.123456789, revision_frequency=0.0,
+        usage_frequency=0.1, base_memory=0.5, sleep_quality=0.7, memory_floor=0.1,
+        last_reviewed=None, last_used=None, alert_due_at=None,
+    )
+    items = [
+        KnowledgeItem(**base, created_at=datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)),
+        KnowledgeItem(**{
+            **base, "id": 2, "content": 'quote " and \\ and \n',
+            "last_reviewed": datetime(2024, 3, 1, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+        }, created_at=datetime(2024, 1, 2, 3, 4, 5)),
+    ]
+    enriched = enrich_rows(items)
+    fast     = encode_items(enriched)
+    assert isinstance(fast, FastJSONResponse)
+    assert fast.body == pydantic_bytes(enriched)
+    assert encode_items(enriched[0]).body == pydantic_bytes(enriched[0])
+
+    # Exponent-formatted floats go back to the default encoder
+    items[0].decay_rate = 1e-5
+    assert isinstance(encode_items(enrich_rows(items)), list)
+
+
+@pytest.mark.asyncio
+async def test_fast_list_keeps_cursor_header(client):
+    for i in range(3):
+        await client.post("/api/items/", json={"topic": f"T{i}", "attention": 0.5, "interest": 0.5, "difficulty": 0.5})
+    r = await client.get("/api/items/?limit=2")
+    assert r.headers["content-type"] == "application/json"
+    assert "x-next-cursor" in r.headers and len(r.json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_list_content_only_on_request(client):
+    await client.post("/api/items/", json={
+        "topic": "Notes", "content": "long notes " * 100, "attention": 0.5, "interest": 0.5, "difficulty": 0.5,
+    })
+    for path in ("/api/items/", "/api/items/decaying?threshold=101"):
+        lean = (await client.get(path)).json()
+        full = (await client.get(path + ("&" if "?" in path else "?") + "include=content")).json()
+        assert lean[0]["content"] is None
+        assert full[0]["content"].startswith("long notes")
+        assert {**full[0], "content": None} == lean[0]
+
+    assert (await client.get("/api/items/?include=topic")).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_list_content_preview(client):
+    for topic, content in [("Long", "é" * 81), ("Exact", "x" * 80), ("None", None)]:
+        await client.post("/api/items/", json={
+            "topic": topic, "content": content, "attention": 0.5, "interest": 0.5, "difficulty": 0.5,
+        })
+    previews = {i["topic"]: i["content_preview"] for i in (await client.get("/api/items/")).json()}
+    assert previews == {"Long": "é" * 80 + "…", "Exact": "x" * 80, "None": None}
+
+    created = (await client.get("/api/items/1")).json()
+    assert created["content_preview"] == previews["Long"]
+
+
+def bulk_row(i: int, **overrides) -> dict:
+    return {"topic": f"Bulk {i}", "attention": 0.2 + (i % 7) / 10, "interest": 0.5, "difficulty": 0.3 + (i % 5) / 10,
+            **overrides}
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_matches_single_create(client):
+    single = (await client.post("/api/items/", json=bulk_row(3, content="notes"))).json()
+    r = await client.post("/api/items/bulk", json=[bulk_row(i) for i in range(200)] + [bulk_row(3, content="notes")])
+    assert r.status_code == 201
+    body = r.json()
+    assert body["errors"] == [] and len(body["created"]) == 201
+    assert [c["topic"] for c in body["created"]][:3] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+
+    twin = body["created"][-1]
+    assert twin["content"] == single["content"]
+    for field in ("k0_initial_strength", "decay_rate", "current_retention", "half_life_days"):
+        assert twin[field] == pytest.approx(single[field])
+    assert twin["alert_due_at"][:16] == single["alert_due_at"][:16]
+
+    assert len((await client.get("/api/items/?limit=500")).json()) == 202
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reports_row_errors(client):
+    rows = [bulk_row(0), bulk_row(1, attention=1.5), {"topic": ""}, bulk_row(3)]
+    body = (await client.post("/api/items/bulk", json=rows)).json()
+    assert [c["topic"] for c in body["created"]] == ["Bulk 0", "Bulk 3"]
+    assert [e["index"] for e in body["errors"]] == [1, 2]
+    assert body["errors"][0]["errors"][0]["loc"] == ["attention"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_atomic_rejects_everything(client):
+    rows = [bulk_row(0), bulk_row(1, difficulty=-1)]
+    r = await client.post("/api/items/bulk?atomic=true", json=rows)
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["index"] == 1
+    assert (await client.get("/api/items/")).json() == []
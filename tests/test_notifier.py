@@ -0,0 +1,102 @@
+"""
+Tests for the notifier: token-bucket throttling, Retry-After handling and
+the in-memory transport.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from app.config import settings
+from app.notifier import (
+    MemoryTransport,
+    Notifier,
+    RateLimited,
+    TokenBucket,
+    Transport,
+    build_notifier,
+)
+
+
+class FlakyTransport(Transport):
+    """429s the first `failures` sends with the given Retry-After."""
+
+    def __init__(self, failures: int, retry_after: float):
+        self.failures    = failures
+        self.retry_after = retry_after
+        self.sent        = []
+
+    async def send(self, chat_id, text):
+        if self.failures:
+            self.failures -= 1
+            raise RateLimited(self.retry_after)
+        self.sent.append((chat_id, text))
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start  = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    # First token is free, the other five arrive at 50/s
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_per_chat_limit_does_not_throttle_other_chats():
+    notifier = Notifier(MemoryTransport(), global_rate=1000, per_chat_rate=1)
+    start    = time.monotonic()
+    await asyncio.gather(*(notifier.send(f"chat-{i}", "hi") for i in range(20)))
+    assert time.monotonic() - start < 0.5
+    assert len(notifier.transport.sent) == 20
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured():
+    transport = FlakyTransport(failures=1, retry_after=0.2)
+    notifier  = Notifier(transport, global_rate=1000, per_chat_rate=1000)
+    start     = time.monotonic()
+    await notifier.send("chat", "hello")
+    assert time.monotonic() - start >= 0.2
+    assert transport.sent == [("chat", "hello")]
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries():
+    notifier = Notifier(FlakyTransport(failures=5, retry_after=0.01),
+                        global_rate=1000, per_chat_rate=1000, max_retries=2)
+    with pytest.raises(RateLimited):
+        await notifier.send("chat", "hello")
+
+
+@pytest.mark.asyncio
+async def test_idle_chats_are_forgotten():
+    notifier = Notifier(MemoryTransport(), global_rate=1000, per_chat_rate=1000)
+    await asyncio.gather(*(notifier.send(f"chat-{i}", "hi") for i in range(50)))
+    assert len(notifier.chats) == 50
+
+    busy = notifier._chat("busy")
+    busy.in_flight = 1
+    await asyncio.sleep(0.01)                  # every bucket refills
+    notifier.swept_at -= 3600
+    await notifier.send("chat-new", "hi")
+    assert set(notifier.chats) == {"busy", "chat-new"}
+
+
+def test_build_notifier_memory_transport(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFIER_TRANSPORT", "memory")
+    assert isinstance(build_notifier().transport, MemoryTransport)
+
+    monkeypatch.setattr(settings, "NOTIFIER_TRANSPORT", "telegram")
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "")
+    assert build_notifier() is None
+
+
+def test_transport_is_abstract():
+    with pytest.raises(TypeError):
+        Transport()
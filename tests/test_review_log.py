@@ -0,0 +1,173 @@
+"""
+Tests for the append-only review log: events written on every review,
+deferred folding by the flusher, and replaying history into item state.
+Uses an in-memory SQLite database for isolation.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import app.review_log as review_log
+from app.main import app
+from app.config import settings
+from app.database import Base, get_db
+from app.insight_cache import insight_cache
+from app.models import KnowledgeItem, ReviewEvent, ReviewEventQueue
+
+TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
+engine = create_async_engine(TEST_DB_URL, echo=False)
+TestSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+AGGREGATES = ("revision_frequency", "usage_frequency", "decay_rate", "last_reviewed", "last_used", "alert_due_at")
+
+
+async def override_get_db():
+    async with TestSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def no_bump(user_id):
+    pass
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db(monkeypatch):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(review_log, "AsyncSessionLocal", TestSessionLocal)
+    monkeypatch.setattr(insight_cache, "bump", no_bump)
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def create_items(client, n: int) -> list:
+    return [
+        (await client.post("/api/items/", json={
+            "topic": f"Topic {i}", "attention": 0.7, "interest": 0.5, "difficulty": 0.6,
+        })).json()["id"]
+        for i in range(n)
+    ]
+
+
+async def events() -> list:
+    async with TestSessionLocal() as db:
+        return (await db.execute(select(ReviewEvent).order_by(ReviewEvent.id))).scalars().all()
+
+
+async def stored(item_id: int) -> dict:
+    async with TestSessionLocal() as db:
+        item = await db.get(KnowledgeItem, item_id)
+        return {f: getattr(item, f) for f in AGGREGATES}
+
+
+@pytest.mark.asyncio
+async def test_every_review_is_logged(client):
+    a, b = await create_items(client, 2)
+    await client.post(f"/api/items/{a}/review", json={"used_in_practice": True})
+    offline = datetime(2026, 1, 5, 8, 30, tzinfo=timezone.utc)
+    await client.post("/api/items/reviews/batch", json=[
+        {"item_id": b, "reviewed_at": offline.isoformat()}, {"item_id": a},
+    ])
+
+    logged = await events()
+    assert [(e.item_id, e.kind) for e in logged] == [(a, "usage"), (b, "review"), (a, "review")]
+    assert logged[1].ts.replace(tzinfo=timezone.utc) == offline
+
+
+@pytest.mark.asyncio
+async def test_deferred_reviews_fold_like_inline(client, monkeypatch):
+    inline, deferred = await create_items(client, 2)
+    kinds = [False, True, True, False, False]
+    for used in kinds:
+        await client.post(f"/api/items/{inline}/review", json={"used_in_practice": used})
+
+    monkeypatch.setattr(settings, "REVIEW_AGGREGATES", "deferred")
+    before = await stored(deferred)
+    responses = [
+        (await client.post(f"/api/items/{deferred}/review", json={"used_in_practice": used})).json()
+        for used in kinds
+    ]
+    assert await stored(deferred) == before                     # nothing folded yet
+    assert responses[0]["revision_frequency"] == pytest.approx(0.1)
+    assert responses[3]["revision_frequency"] == pytest.approx(0.19)    # sees the queued reviews
+
+    assert await review_log.flush_review_events(limit=2) == len(kinds)
+    assert await review_log.flush_review_events() == 0
+    want, got = await stored(inline), await stored(deferred)
+    for field in ("revision_frequency", "usage_frequency", "decay_rate"):
+        assert got[field] == pytest.approx(want[field])
+        assert responses[-1][field] == pytest.approx(want[field])
+    async with TestSessionLocal() as db:
+        assert (await db.execute(select(ReviewEventQueue))).first() is None
+
+
+@pytest.mark.asyncio
+async def test_deferred_review_reads_without_locking(client, monkeypatch):
+    item_id, other = await create_items(client, 2)
+    statements = []
+
+    async def no_locking(*args, **kwargs):
+        raise AssertionError("deferred review locked the item row")
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    monkeypatch.setattr(settings, "REVIEW_AGGREGATES", "deferred")
+    await client.post(f"/api/items/{other}/review", json={"used_in_practice": False})
+    monkeypatch.setattr(review_log, "_load_states", no_locking)
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        r = await client.post(f"/api/items/{item_id}/review", json={"used_in_practice": True})
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    assert r.status_code == 200 and r.json()["usage_frequency"] == pytest.approx(0.1)
+    assert r.json()["revision_frequency"] == 0.0             # the other item's queued review
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+    assert (await client.post("/api/items/9999/review", json={"used_in_practice": True})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_replay_rebuilds_item_state(client):
+    item_id, untouched = await create_items(client, 2)
+    base = datetime.now(timezone.utc) - timedelta(days=3)
+    await client.post("/api/items/reviews/batch", json=[
+        {"item_id": item_id, "used_in_practice": i % 2 == 0, "reviewed_at": (base + timedelta(hours=i)).isoformat()}
+        for i in range(6)
+    ])
+    want = await stored(item_id)
+
+    async with TestSessionLocal() as db:
+        await db.execute(update(KnowledgeItem).values(revision_frequency=0.9, usage_frequency=0.0, decay_rate=1.0))
+        await db.commit()
+        states = await review_log.rebuild_items(db, [item_id, untouched])
+        await db.commit()
+
+    got = await stored(item_id)
+    for field in ("revision_frequency", "usage_frequency", "decay_rate"):
+        assert got[field] == pytest.approx(want[field])
+    assert got["last_reviewed"] == want["last_reviewed"]
+    assert states[untouched]["revision_frequency"] == 0.0
+    assert (await stored(untouched))["usage_frequency"] == 0.0
@@ -3,6 +3,10 @@ Tests for the review submission endpoint.
 Validates Rf/U EMA updates and k recomputation.
 """
 
+from datetime import datetime, timedelta, timezone
+
+import asyncio
+
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
@@ -13,6 +17,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
 
 from app.main import app
 from app.database import Base, get_db
+from app.decay import compute_alert_due_at
 
 TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
 engine = create_async_engine(TEST_DB_URL, echo=False)
@@ -103,7 +108,102 @@ async def test_usage_slows_decay_more_than_revision(client):
     assert active["decay_rate"] < passive["decay_rate"]
 
 
+@pytest.mark.asyncio
+async def test_review_pushes_alert_due_at_later(client, item_id):
+    before = (await client.get(f"/api/items/{item_id}")).json()
+    after  = (await client.post(f"/api/items/{item_id}/review", json={"used_in_practice": True})).json()
+    due = lambda d: datetime.fromisoformat(d["alert_due_at"]).replace(tzinfo=None)
+    assert due(after) > due(before)
+
+
 @pytest.mark.asyncio
 async def test_review_404(client):
     r = await client.post("/api/items/9999/review", json={"used_in_practice": False})
     assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_sequential_reviews(client):
+    payload = {"attention": 0.7, "interest": 0.5, "difficulty": 0.7}
+    seq_a, seq_b, bat_a, bat_b = [
+        (await client.post("/api/items/", json={**payload, "topic": t})).json()["id"]
+        for t in ("seq a", "seq b", "batch a", "batch b")
+    ]
+    kinds = [True, False, False, True, False]
+    for used in kinds:
+        await client.post(f"/api/items/{seq_a}/review", json={"used_in_practice": used})
+    await client.post(f"/api/items/{seq_b}/review", json={"used_in_practice": True})
+
+    base = datetime.now(timezone.utc) - timedelta(hours=6)
+    entries = [
+        {"item_id": bat_a, "used_in_practice": used, "reviewed_at": (base + timedelta(minutes=i)).isoformat()}
+        for i, used in enumerate(kinds)
+    ][::-1] + [{"item_id": bat_b, "used_in_practice": True, "reviewed_at": base.isoformat()}]
+    r = await client.post("/api/items/reviews/batch", json=entries)
+    assert r.status_code == 200
+    out = {i["id"]: i for i in r.json()}
+    assert list(out) == [bat_a, bat_b]
+
+    for seq, bat in ((seq_a, bat_a), (seq_b, bat_b)):
+        expected = (await client.get(f"/api/items/{seq}")).json()
+        stored   = (await client.get(f"/api/items/{bat}")).json()
+        for field in ("revision_frequency", "usage_frequency", "decay_rate"):
+            assert stored[field] == pytest.approx(expected[field]) == pytest.approx(out[bat][field])
+
+    last = datetime.fromisoformat(out[bat_a]["last_reviewed"].replace("Z", "+00:00"))
+    assert last == base + timedelta(minutes=len(kinds) - 1)
+    assert out[bat_a]["days_since_review"] == pytest.approx(0.25, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_batch_with_unknown_item_changes_nothing(client, item_id):
+    r = await client.post("/api/items/reviews/batch", json=[
+        {"item_id": item_id}, {"item_id": 9999, "used_in_practice": True},
+    ])
+    assert r.status_code == 404
+    assert (await client.get(f"/api/items/{item_id}")).json()["revision_frequency"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_review_sets_alert_due_at_like_python(client, item_id):
+    after = (await client.post(f"/api/items/{item_id}/review", json={"used_in_practice": True})).json()
+    parse    = lambda s: datetime.fromisoformat(s.replace("Z", "+00:00")).replace(tzinfo=timezone.utc)
+    expected = compute_alert_due_at(
+        after["k0_initial_strength"], after["decay_rate"], after["memory_floor"], parse(after["last_reviewed"]),
+    )
+    assert abs((parse(after["alert_due_at"]) - expected).total_seconds()) < 1
+
+
+@pytest.mark.asyncio
+async def test_parallel_reviews_all_apply(tmp_path):
+    """Concurrent reviews of one item each apply their EMA step — no lost updates."""
+    file_engine  = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stress.db'}", connect_args={"timeout": 30})
+    FileSession  = async_sessionmaker(file_engine, class_=AsyncSession, expire_on_commit=False)
+    async with file_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def file_db():
+        async with FileSession() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    app.dependency_overrides[get_db] = file_db
+    n = 25
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        item = (await c.post("/api/items/", json={
+            "topic": "Contended", "attention": 0.7, "interest": 0.6, "difficulty": 0.6,
+        })).json()
+        results = await asyncio.gather(*(
+            c.post(f"/api/items/{item['id']}/review", json={"used_in_practice": i % 2 == 0})
+            for i in range(2 * n)
+        ))
+        assert all(r.status_code == 200 for r in results)
+        final = (await c.get(f"/api/items/{item['id']}")).json()
+    await file_engine.dispose()
+
+    assert final["revision_frequency"] == pytest.approx(1 - 0.9 ** n)
+    assert final["usage_frequency"]    == pytest.approx(1 - 0.9 ** n)
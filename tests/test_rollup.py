@@ -0,0 +1,210 @@
+"""
+Tests for the nightly retention_daily rollup and the timeline reading from it.
+Uses an in-memory SQLite database for isolation.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import app.rollup as rollup
+from app.main import app
+from app.database import Base, get_db
+from app.insight_cache import insight_cache
+from app.decay import compute_decay_rate, compute_retention, update_ema
+from app.models import KnowledgeItem, RetentionDaily, ReviewEvent
+
+TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
+engine = create_async_engine(TEST_DB_URL, echo=False)
+TestSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+NOW   = datetime.now(timezone.utc)
+TODAY = NOW.date()
+
+
+async def override_get_db():
+    async with TestSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def no_bump(user_id):
+    pass
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db(monkeypatch):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(rollup, "AsyncSessionLocal", TestSessionLocal)
+    monkeypatch.setattr(insight_cache, "bump", no_bump)
+    monkeypatch.setattr(insight_cache, "_down_until", float("inf"))    # no Redis here
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def seed(user_id: int = 1, age_days: int = 10, reviewed_days_ago=None) -> None:
+    async with TestSessionLocal() as db:
+        for i in range(3):
+            db.add(KnowledgeItem(
+                user_id=user_id, topic=f"Topic {i}", attention=0.5, interest=0.5, difficulty=0.5,
+                k0_initial_strength=80.0, decay_rate=0.1 + i / 10, memory_floor=0.1,
+                created_at=NOW - timedelta(days=age_days),
+                last_reviewed=None if reviewed_days_ago is None else NOW - timedelta(days=reviewed_days_ago),
+            ))
+        await db.commit()
+
+
+async def stored_days(user_id: int = 1) -> list:
+    async with TestSessionLocal() as db:
+        result = await db.execute(
+            select(RetentionDaily.day).where(RetentionDaily.user_id == user_id).order_by(RetentionDaily.day)
+        )
+        return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_first_run_backfills_from_creation_then_is_incremental():
+    await seed(age_days=10)
+    assert await rollup.run_retention_rollup(TODAY) == 11
+    days = await stored_days()
+    assert days[0] == TODAY - timedelta(days=10) and days[-1] == TODAY
+
+    assert await rollup.run_retention_rollup(TODAY) == 0
+    assert await rollup.run_retention_rollup(TODAY + timedelta(days=2)) == 2
+
+
+@pytest.mark.asyncio
+async def test_backfill_is_capped(monkeypatch):
+    monkeypatch.setattr(rollup.settings, "ROLLUP_BACKFILL_DAYS", 5)
+    await seed(age_days=40)
+    assert await rollup.run_retention_rollup(TODAY) == 5
+
+
+@pytest.mark.asyncio
+async def test_todays_row_uses_review_history():
+    await seed(user_id=1, age_days=20)
+    await seed(user_id=2, age_days=20, reviewed_days_ago=0.5)
+    await rollup.run_retention_rollup(TODAY)
+
+    async with TestSessionLocal() as db:
+        rows = (await db.execute(select(RetentionDaily).where(RetentionDaily.day == TODAY))).scalars().all()
+    by_user = {r.user_id: r for r in rows}
+    assert by_user[2].avg_retention > by_user[1].avg_retention
+    assert by_user[1].items_below_60 == 3 and by_user[1].item_count == 3
+
+
+def midnight_days(day, ts) -> int:
+    midnight = datetime.combine(day, datetime.min.time()).replace(tzinfo=timezone.utc)
+    return max(math.floor((midnight - ts).total_seconds() / 86400), 0)
+
+
+@pytest.mark.asyncio
+async def test_backfilled_days_follow_logged_reviews():
+    created, first_review, last_review = NOW - timedelta(days=12), NOW - timedelta(days=8), NOW - timedelta(days=4)
+    static = dict(attention=0.5, interest=0.5, difficulty=0.5, sleep_quality=0.6, base_memory=0.5)
+    k      = [compute_decay_rate(**static, revision_frequency=rf, usage_frequency=0.0)
+              for rf in (0.0, update_ema(0.0), update_ema(update_ema(0.0)))]
+    async with TestSessionLocal() as db:
+        db.add(KnowledgeItem(
+            id=1, user_id=1, topic="Logged", k0_initial_strength=80.0, memory_floor=0.1, **static,
+            revision_frequency=update_ema(update_ema(0.0)), decay_rate=k[2],
+            created_at=created, last_reviewed=last_review,
+        ))
+        db.add_all(ReviewEvent(item_id=1, user_id=1, ts=ts, kind="review") for ts in (first_review, last_review))
+        await db.commit()
+    await rollup.run_retention_rollup(TODAY)
+
+    async with TestSessionLocal() as db:
+        rows = (await db.execute(select(RetentionDaily).order_by(RetentionDaily.day))).scalars().all()
+    assert len(rows) == 13
+    for row in rows[:-1]:
+        reviews = [ts for ts in (first_review, last_review) if ts.date() < row.day]
+        anchor  = reviews[-1] if reviews else created
+        rate    = k[len(reviews)]
+        assert row.avg_retention == pytest.approx(compute_retention(80.0, rate, midnight_days(row.day, anchor), 0.1))
+        assert row.avg_half_life == pytest.approx(math.log(2) / rate)
+
+
+@pytest.mark.asyncio
+async def test_backfill_decays_from_last_review_without_a_log():
+    await seed(age_days=12, reviewed_days_ago=4)
+    await rollup.run_retention_rollup(TODAY)
+
+    async with TestSessionLocal() as db:
+        items = (await db.execute(select(KnowledgeItem))).scalars().all()
+        rows  = (await db.execute(select(RetentionDaily).order_by(RetentionDaily.day))).scalars().all()
+    reviewed = items[0].last_reviewed.replace(tzinfo=timezone.utc)
+    for row in rows[:-1]:
+        anchor   = reviewed if reviewed.date() < row.day else NOW - timedelta(days=12)
+        expected = [compute_retention(80.0, i.decay_rate, midnight_days(row.day, anchor), 0.1) for i in items]
+        assert row.avg_retention == pytest.approx(sum(expected) / len(expected))
+
+
+@pytest.mark.asyncio
+async def test_overlapping_runs_upsert_days():
+    await seed(age_days=5)
+    await rollup.run_retention_rollup(TODAY)
+    async with TestSessionLocal() as db:
+        items = (await db.execute(select(*rollup.ROLLUP_COLUMNS))).all()
+        rows  = rollup.rollup_rows(1, items, TODAY - timedelta(days=2), TODAY)
+        await db.execute(rollup.upsert_rows("sqlite"), rows)     # a second instance, same days
+        await db.commit()
+    assert len(await stored_days()) == 6
+
+
+@pytest.mark.asyncio
+async def test_timeline_longer_than_a_year(client):
+    await seed(age_days=500)
+    r = await client.get("/api/insights/timeline?days=500")
+    assert r.status_code == 200 and len(r.json()) == 500
+
+
+@pytest.mark.asyncio
+async def test_timeline_served_from_rollup(client):
+    async with TestSessionLocal() as db:
+        db.add_all(
+            RetentionDaily(user_id=1, day=TODAY - timedelta(days=d), item_count=1, avg_retention=42.04,
+                           items_below_60=1, items_below_40=0, avg_half_life=5.0)
+            for d in range(5)
+        )
+        await db.commit()
+
+    r = await client.get("/api/insights/timeline?days=5")
+    assert [p["retention"] for p in r.json()] == [42.0] * 5
+
+
+@pytest.mark.asyncio
+async def test_timeline_fills_missing_days_from_items(client):
+    await seed(age_days=10)
+    computed = (await client.get("/api/insights/timeline?days=10")).json()
+
+    async with TestSessionLocal() as db:
+        db.add(RetentionDaily(user_id=1, day=TODAY, item_count=3, avg_retention=99.0,
+                              items_below_60=0, items_below_40=0, avg_half_life=5.0))
+        await db.commit()
+
+    mixed = (await client.get("/api/insights/timeline?days=10")).json()
+    assert mixed[:-1] == computed[:-1]
+    assert mixed[-1]["retention"] == 99.0
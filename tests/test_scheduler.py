@@ -0,0 +1,187 @@
+"""
+Tests for the decay-alert scheduler scan.
+Uses an in-memory SQLite database for isolation.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from app.config import settings
+from app.database import Base
+from app.models import KnowledgeItem
+import app.scheduler as scheduler
+from app.scheduler import alert_bands, enqueue_alerts, iter_due_chunks
+
+TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
+engine = create_async_engine(TEST_DB_URL, echo=False)
+TestSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+NOW = datetime.now(timezone.utc)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis    = redis
+        self.commands = []
+
+    def xadd(self, name, fields, **kwargs):
+        self.commands.append((name, fields, kwargs))
+
+    def __len__(self):
+        return len(self.commands)
+
+    async def execute(self):
+        self.redis.round_trips.append(list(self.commands))
+        self.commands = []
+
+
+class FakeRedis:
+    """Records pipeline round trips instead of talking to a server."""
+
+    def __init__(self):
+        self.round_trips = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+async def seed(n_due: int, n_not_due: int) -> None:
+    async with TestSessionLocal() as db:
+        for i in range(n_due + n_not_due):
+            due = NOW - timedelta(hours=1) if i < n_due else NOW + timedelta(days=3)
+            db.add(KnowledgeItem(
+                user_id=1, topic=f"Topic {i}", content="x" * 100,
+                attention=0.5, interest=0.5, difficulty=0.5,
+                k0_initial_strength=50.0, decay_rate=0.2, memory_floor=0.1,
+                created_at=NOW - timedelta(days=10), alert_due_at=due,
+            ))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_due_scan_pages_through_all_due_items():
+    await seed(n_due=7, n_not_due=4)
+    async with TestSessionLocal() as db:
+        chunks = [rows async for rows in iter_due_chunks(db, NOW, chunk_size=3)]
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    ids = [r.id for c in chunks for r in c]
+    assert ids == sorted(ids) and len(set(ids)) == 7
+
+
+@pytest.mark.asyncio
+async def test_due_scan_does_not_load_content():
+    await seed(n_due=1, n_not_due=0)
+    async with TestSessionLocal() as db:
+        rows = [r async for chunk in iter_due_chunks(db, NOW, chunk_size=10) for r in chunk]
+    assert "content" not in rows[0]._fields
+
+
+@pytest.mark.asyncio
+async def test_due_scan_exact_multiple_of_chunk_size():
+    await seed(n_due=4, n_not_due=0)
+    async with TestSessionLocal() as db:
+        chunks = [rows async for rows in iter_due_chunks(db, NOW, chunk_size=2)]
+    assert [len(c) for c in chunks] == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_due_scan_pages_on_due_time_then_id():
+    async with TestSessionLocal() as db:
+        for i in range(9):
+            db.add(KnowledgeItem(
+                user_id=1, topic=f"Topic {i}", attention=0.5, interest=0.5, difficulty=0.5,
+                k0_initial_strength=50.0, decay_rate=0.2, memory_floor=0.1,
+                created_at=NOW - timedelta(days=10), alert_due_at=NOW - timedelta(hours=(i * 5) % 3),
+            ))
+        await db.commit()
+    async with TestSessionLocal() as db:
+        chunks = [rows async for rows in iter_due_chunks(db, NOW, chunk_size=2)]
+    keys = [(r.alert_due_at, r.id) for c in chunks for r in c]
+    assert [len(c) for c in chunks] == [2, 2, 2, 2, 1]
+    assert keys == sorted(keys) and len({k[1] for k in keys}) == 9
+
+
+@pytest.mark.asyncio
+async def test_enqueue_alerts_batches_round_trips(monkeypatch):
+    monkeypatch.setattr(settings, "ALERT_BATCH_SIZE", 4)
+    r = FakeRedis()
+    added = await enqueue_alerts(r, ({"item_id": str(i)} for i in range(10)))
+    assert added == 10
+    assert [len(batch) for batch in r.round_trips] == [4, 4, 2]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_alerts_trims_stream(monkeypatch):
+    monkeypatch.setattr(settings, "ALERT_STREAM_MAXLEN", 1000)
+    monkeypatch.setattr(settings, "ALERT_STREAM_MAX_AGE_HOURS", 0)
+    r = FakeRedis()
+    await enqueue_alerts(r, [{"item_id": "1"}])
+    assert r.round_trips[0][0][2] == {"maxlen": 1000, "approximate": True}
+
+    monkeypatch.setattr(settings, "ALERT_STREAM_MAX_AGE_HOURS", 24)
+    await enqueue_alerts(r, [{"item_id": "1"}])
+    assert "minid" in r.round_trips[1][0][2]
+
+
+def test_alert_bands_escalate_to_floor():
+    retention = np.array([75.0, 55.0, 35.0, 12.0])
+    floors    = np.full(4, 0.10)
+    assert alert_bands(retention, floors).tolist() == [0, 1, 2, 3]
+
+
+@pytest.fixture
+def fake_env(monkeypatch):
+    r = FakeRedis()
+    monkeypatch.setattr(scheduler, "AsyncSessionLocal", TestSessionLocal)
+    monkeypatch.setattr(scheduler, "get_redis", lambda: r)
+    return r
+
+
+def enqueued(r):
+    return [fields for batch in r.round_trips for _name, fields, _kw in batch]
+
+
+@pytest.mark.asyncio
+async def test_repeat_run_is_suppressed_during_cooldown(fake_env):
+    await seed(n_due=3, n_not_due=2)
+    await scheduler.check_all_items_and_enqueue()
+    assert len(enqueued(fake_env)) == 3
+
+    await scheduler.check_all_items_and_enqueue()
+    assert len(enqueued(fake_env)) == 3
+
+
+@pytest.mark.asyncio
+async def test_expired_cooldown_or_deeper_band_realerts(fake_env, monkeypatch):
+    await seed(n_due=2, n_not_due=0)
+    await scheduler.check_all_items_and_enqueue()
+
+    async with TestSessionLocal() as db:
+        first, second = (await db.execute(select(KnowledgeItem).order_by(KnowledgeItem.id))).scalars().all()
+        first.alerted_band     = 1                                   # alerted at a shallower band
+        second.last_alerted_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        await db.commit()
+
+    await scheduler.check_all_items_and_enqueue()
+    assert [f["item_id"] for f in enqueued(fake_env)[2:]] == [str(first.id)]
+
+    monkeypatch.setattr(settings, "ALERT_COOLDOWN_HOURS", 0.5)
+    await scheduler.check_all_items_and_enqueue()
+    assert [f["item_id"] for f in enqueued(fake_env)[3:]] == [str(second.id)]
@@ -0,0 +1,153 @@
+"""
+Integration tests for PUT /api/users/me/settings.
+Uses an in-memory SQLite database for isolation.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from app.main import app
+from app.config import settings
+from app.database import Base, get_db
+from app.decay import compute_alert_due_at, compute_decay_rate
+from app.models import KnowledgeItem, User
+
+TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
+
+engine = create_async_engine(TEST_DB_URL, echo=False)
+TestSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def override_get_db():
+    async with TestSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def seed_items(n: int, user_id: int = 1) -> None:
+    created = datetime.now(timezone.utc) - timedelta(days=3)
+    async with TestSessionLocal() as db:
+        for i in range(n):
+            db.add(KnowledgeItem(
+                user_id             = user_id,
+                topic               = f"Topic {i}",
+                attention           = 0.3 + 0.1 * (i % 5),
+                interest            = 0.9 - 0.1 * (i % 4),
+                difficulty          = 0.2 + 0.15 * (i % 4),
+                k0_initial_strength = 50.0 + i,
+                decay_rate          = 0.5,
+                revision_frequency  = 0.05 * (i % 3),
+                usage_frequency     = 0.1 * (i % 2),
+                memory_floor        = 0.10,
+                created_at          = created,
+                last_reviewed       = created + timedelta(days=1) if i % 2 else None,
+            ))
+        await db.commit()
+
+
+async def load_items(user_id: int = 1):
+    async with TestSessionLocal() as db:
+        return (await db.execute(
+            select(KnowledgeItem).where(KnowledgeItem.user_id == user_id).order_by(KnowledgeItem.id)
+        )).scalars().all()
+
+
+def assert_recomputed(items, sleep_quality: float) -> None:
+    for item in items:
+        assert item.sleep_quality == sleep_quality
+        assert item.decay_rate == pytest.approx(compute_decay_rate(
+            item.difficulty, item.interest, item.sleep_quality, item.base_memory, item.attention,
+            item.revision_frequency, item.usage_frequency,
+        ), rel=1e-12)
+        anchor   = (item.last_reviewed or item.created_at).replace(tzinfo=timezone.utc)
+        expected = compute_alert_due_at(item.k0_initial_strength, item.decay_rate, item.memory_floor, anchor)
+        assert abs(item.alert_due_at.replace(tzinfo=timezone.utc) - expected) < timedelta(seconds=1)
+
+
+@pytest.mark.asyncio
+async def test_settings_recompute_all_items(client):
+    await seed_items(6)
+    await seed_items(2, user_id=2)
+
+    r = await client.put("/api/users/me/settings", json={"sleep_quality": 0.3})
+    assert r.status_code == 200
+    assert r.json() == {
+        "sleep_quality": 0.3, "base_memory": None, "memory_floor": None, "telegram_chat_id": None, "items_updated": 6,
+    }
+
+    items = await load_items()
+    assert_recomputed(items, 0.3)
+    assert {i.base_memory for i in items} == {0.7}         # omitted fields are left alone
+    assert {i.sleep_quality for i in await load_items(user_id=2)} == {0.8}
+
+
+@pytest.mark.asyncio
+async def test_chunked_matches_single_update(client, monkeypatch):
+    monkeypatch.setattr(settings, "SETTINGS_CHUNK_SIZE", 2)
+    await seed_items(5)
+
+    r = await client.put("/api/users/me/settings?chunked=true", json={"sleep_quality": 0.4, "memory_floor": 0.2})
+    assert r.json()["items_updated"] == 5
+
+    items = await load_items()
+    assert {i.memory_floor for i in items} == {0.2}
+    assert_recomputed(items, 0.4)
+
+
+@pytest.mark.asyncio
+async def test_user_row_updated(client):
+    async with TestSessionLocal() as db:
+        db.add(User(id=1, username="learner", hashed_password="x"))
+        await db.commit()
+    await seed_items(1)
+
+    r = await client.put("/api/users/me/settings", json={"base_memory": 0.9})
+    assert r.json() == {
+        "sleep_quality": 0.8, "base_memory": 0.9, "memory_floor": 0.1, "telegram_chat_id": None, "items_updated": 1,
+    }
+    assert (await client.put("/api/users/me/settings", json={})).json()["base_memory"] == 0.9
+    assert (await client.put("/api/users/me/settings", json={"sleep_quality": 2})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_telegram_chat_only_touches_user_row(client):
+    async with TestSessionLocal() as db:
+        db.add(User(id=1, username="learner", hashed_password="x"))
+        await db.commit()
+    await seed_items(2)
+
+    r = await client.put("/api/users/me/settings", json={"telegram_chat_id": "12345"})
+    assert r.json()["telegram_chat_id"] == "12345" and r.json()["items_updated"] == 0
+    assert {i.decay_rate for i in await load_items()} == {0.5}
+
+    r = await client.put("/api/users/me/settings", json={"telegram_chat_id": ""})
+    assert r.json()["telegram_chat_id"] is None
@@ -0,0 +1,546 @@
+"""
+Tests for the decay-alert worker: bounded concurrency, ack-after-success and
+batched item lookup. Uses an in-memory SQLite database for isolation.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+import pytest
+import pytest_asyncio
+from redis.commands.core import AsyncScript
+from redis.connection import Encoder
+from redis.exceptions import NoScriptError
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import worker
+from app.config import settings
+from app.database import Base
+from app.decay import compute_time_to_forget
+from app.models import KnowledgeItem, User
+from app.notifier import MemoryTransport, Notifier, RateLimited
+
+TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
+engine = create_async_engine(TEST_DB_URL, echo=False)
+TestSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db(monkeypatch):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(worker, "AsyncSessionLocal", TestSessionLocal)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+async def seed(n: int) -> list:
+    async with TestSessionLocal() as db:
+        items = [
+            KnowledgeItem(
+                user_id=1, topic=f"Topic {i}", attention=0.5, interest=0.5, difficulty=0.5,
+                k0_initial_strength=70.0 + i, decay_rate=0.1 + i / 100, memory_floor=0.1,
+            )
+            for i in range(n)
+        ]
+        db.add_all(items)
+        await db.commit()
+        return items
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        if self.redis.fail_pipelines:
+            raise ConnectionError("redis down")
+        for name, args, kwargs in self.calls:
+            await getattr(self.redis, name)(*args, **kwargs)
+
+
+def stream_seq(msg_id) -> tuple:
+    msg_id = msg_id.decode() if isinstance(msg_id, bytes) else msg_id
+    return tuple(int(part) for part in msg_id.split("-"))
+
+
+class FakeRedis:
+    """
+    Just enough of XACK/XADD/XRANGE/XDEL/ZADD/XAUTOCLAIM to exercise the worker,
+    plus EVALSHA of MOVE_DUE_RETRIES (run as its Python equivalent — there's
+    no Lua here) through redis-py's own Script object.
+    """
+
+    def __init__(self):
+        self.acked   = []
+        self.streams = {}
+        self.zsets   = {}
+        self.pending = {}       # msg_id → [data, delivered_at (s), consumer]; data None once trimmed
+        self.scripts = {}
+        self.fail_pipelines = False
+
+    def get_encoder(self):
+        return Encoder("utf-8", "strict", False)
+
+    def register_script(self, script):
+        return AsyncScript(self, script)
+
+    async def script_load(self, script):
+        sha = hashlib.sha1(script.encode()).hexdigest()
+        self.scripts[sha] = script
+        return sha
+
+    async def evalsha(self, sha, numkeys, *args):
+        if sha not in self.scripts:
+            raise NoScriptError("NOSCRIPT No matching script")
+        assert self.scripts[sha] == worker.MOVE_DUE_RETRIES
+        (retry_key, stream), (max_score, count) = args[:numkeys], args[numkeys:]
+        zset = self.zsets.get(retry_key, {})
+        due  = sorted((m for m, score in zset.items() if score <= float(max_score)), key=zset.get)[:int(count)]
+        for member in due:
+            del zset[member]
+            await self.xadd(stream, json.loads(member))
+        return len(due)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def xack(self, stream, group, *ids):
+        self.acked.extend(ids)
+        for msg_id in ids:
+            self.pending.pop(msg_id, None)
+        return len(ids)
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time, start_id="0-0", count=100):
+        now  = time.time()
+        idle = sorted(
+            (i for i, (_data, delivered, _owner) in self.pending.items()
+             if stream_seq(i) >= stream_seq(start_id) and (now - delivered) * 1000 >= min_idle_time),
+            key=stream_seq,
+        )
+        claimed, rest = idle[:count], idle[count:]
+        entries = []
+        for msg_id in claimed:
+            data = self.pending[msg_id][0]
+            self.pending[msg_id][1:] = [now, consumer]
+            entries.append((msg_id, data) if data is not None else (None, None))
+        return rest[0] if rest else b"0-0", entries, []
+
+    async def xadd(self, name, fields, **kwargs):
+        entries = self.streams.setdefault(name, [])
+        msg_id  = f"{len(entries) + 1}-0".encode()
+        entries.append((msg_id, {k.encode(): v.encode() for k, v in fields.items()}))
+        return msg_id
+
+    async def xrange(self, name, min="-", max="+", count=None):
+        entries = self.streams.get(name, [])
+        if min != "-":
+            entries = [e for e in entries if e[0].decode() == min]
+        return entries[:count] if count else entries
+
+    async def xdel(self, name, *ids):
+        self.streams[name] = [e for e in self.streams.get(name, []) if e[0] not in ids]
+
+    async def zadd(self, name, mapping):
+        self.zsets.setdefault(name, {}).update(mapping)
+
+
+def message(i: int, user_id: int = 1, retention: float = 50.0) -> tuple:
+    return f"{i}-0".encode(), {
+        b"item_id":   str(i).encode(),
+        b"topic":     f"Topic {i}".encode(),
+        b"retention": f"{retention:.1f}".encode(),
+        b"user_id":   str(user_id).encode(),
+    }
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_bounds_concurrency_and_acks_all(monkeypatch):
+    running = peak = 0
+
+    async def fake_notify(data, t_forget, chat_id=None, reserved=False):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    monkeypatch.setattr(worker, "notify_user", fake_notify)
+    r = FakeRedis()
+    dispatcher = worker.Dispatcher(r, concurrency=3)
+    for i in range(20):
+        await dispatcher.submit(*message(i), 5.0)
+    await dispatcher.drain()
+
+    assert peak == 3
+    assert sorted(r.acked) == sorted(message(i)[0] for i in range(20))
+
+
+async def failing_notify(data, t_forget, chat_id=None, reserved=False):
+    raise RuntimeError("downstream unavailable")
+
+
+@pytest.mark.asyncio
+async def test_failed_handler_schedules_retry_with_attempt_count(monkeypatch):
+    monkeypatch.setattr(worker, "notify_user", failing_notify)
+    r = FakeRedis()
+    dispatcher = worker.Dispatcher(r, concurrency=2)
+    await dispatcher.submit(*message(1), 5.0)
+    await dispatcher.drain()
+
+    assert r.acked == [message(1)[0]]
+    (member, due_at), = r.zsets[worker.RETRY_KEY].items()
+    assert json.loads(member)["attempts"] == "1"
+    assert due_at > time.time()
+    assert not dispatcher.in_flight
+
+
+@pytest.mark.asyncio
+async def test_slow_send_times_out_into_retry(monkeypatch):
+    transport = MemoryTransport(latency_s=10)
+    monkeypatch.setattr(worker, "notifier", Notifier(transport, global_rate=100, per_chat_rate=100))
+    monkeypatch.setattr(settings, "WORKER_HANDLER_TIMEOUT_S", 0.05)
+    r = FakeRedis()
+    dispatcher = worker.Dispatcher(r, concurrency=1)
+    await dispatcher.submit(*message(1), 5.0, "chat-1")
+    await dispatcher.drain()
+
+    assert worker.RETRY_KEY in r.zsets
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_waits_are_not_failures(monkeypatch):
+    class CountingTransport(MemoryTransport):
+        in_flight = peak = 0
+
+        async def send(self, chat_id, text):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await super().send(chat_id, text)
+            self.in_flight -= 1
+
+    # 10 alerts to one chat at 5 msg/s: five go at once, the rest are parked for the chat's next tokens
+    transport = CountingTransport(latency_s=0.02)
+    monkeypatch.setattr(worker, "notifier", Notifier(transport, global_rate=1000, per_chat_rate=5))
+    monkeypatch.setattr(settings, "WORKER_HANDLER_TIMEOUT_S", 0.2)
+    r = FakeRedis()
+    dispatcher = worker.Dispatcher(r, concurrency=10)
+    for i in range(10):
+        await dispatcher.submit(*message(i), 5.0, "chat-1")
+    await dispatcher.drain()
+
+    assert len(r.acked) == 10 and len(transport.sent) == 5
+    assert transport.peak <= 5
+    deferred = r.zsets[worker.RETRY_KEY]
+    assert len(deferred) == 5 and all("attempts" not in json.loads(m) for m in deferred)
+    due = sorted(deferred.values())
+    assert due[0] > time.time() and all(b - a == pytest.approx(0.2, abs=0.05) for a, b in zip(due, due[1:]))
+
+
+@pytest.mark.asyncio
+async def test_busy_chat_does_not_hold_slots(monkeypatch):
+    transport = MemoryTransport(latency_s=0.01)
+    monkeypatch.setattr(worker, "notifier", Notifier(transport, global_rate=1000, per_chat_rate=10))
+    r = FakeRedis()
+    dispatcher = worker.Dispatcher(r, concurrency=4)
+    for i in range(20):
+        await dispatcher.submit(*message(i), 5.0, "chat-1")
+    await dispatcher.submit(*message(20, user_id=2), 5.0, "chat-2")
+    await dispatcher.drain()
+
+    chats = [chat for chat, _text in transport.sent]
+    assert chats.index("chat-2") <= 10 and chats.count("chat-1") == 10
+    assert len(r.zsets[worker.RETRY_KEY]) == 10
+
+
+@pytest.mark.asyncio
+async def test_429_defers_without_counting_an_attempt(monkeypatch):
+    class LimitedTransport(MemoryTransport):
+        async def send(self, chat_id, text):
+            raise RateLimited(3.0)
+
+    monkeypatch.setattr(worker, "notifier", Notifier(LimitedTransport(), global_rate=1000, per_chat_rate=1000))
+    r = FakeRedis()
+    dispatcher = worker.Dispatcher(r, concurrency=2)
+    await dispatcher.submit(*message(1), 5.0, "chat-1")
+    await dispatcher.drain()
+
+    (member, due_at), = r.zsets[worker.RETRY_KEY].items()
+    assert "attempts" not in json.loads(member) and due_at >= time.time() + 2.5
+    assert r.acked == [message(1)[0]]
+
+
+def test_claim_idle_outlasts_a_consumers_longest_hold(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_CLAIM_IDLE_MS", 1000)
+    monkeypatch.setattr(settings, "WORKER_READ_COUNT", 100)
+    monkeypatch.setattr(settings, "WORKER_CONCURRENCY", 32)
+    monkeypatch.setattr(settings, "WORKER_HANDLER_TIMEOUT_S", 30.0)
+    monkeypatch.setattr(settings, "NOTIFY_GLOBAL_RATE", 25.0)
+    # 4 waves of 32 for the batch + 1 already running, each up to 30 s; 132 sends at 25/s
+    assert worker.claim_idle_ms(digest=False) == int((5 * 30 + 132 / 25) * 1000)
+
+    monkeypatch.setattr(settings, "WORKER_CLAIM_IDLE_MS", 10_000_000)
+    assert worker.claim_idle_ms(digest=False) == 10_000_000
+
+
+@pytest.mark.asyncio
+async def test_failed_handler_left_pending_when_retry_cannot_be_scheduled(monkeypatch):
+    monkeypatch.setattr(worker, "notify_user", failing_notify)
+    r = FakeRedis()
+    r.fail_pipelines = True
+    dispatcher = worker.Dispatcher(r, concurrency=2)
+    await dispatcher.submit(*message(1), 5.0)
+    await dispatcher.drain()
+
+    assert r.acked == []
+    assert not dispatcher.in_flight
+
+
+@pytest.mark.asyncio
+async def test_max_attempts_moves_alert_to_dead_letter_stream(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_MAX_ATTEMPTS", 3)
+    r = FakeRedis()
+    msg_id, data = message(1)
+    data[b"attempts"] = b"2"
+
+    assert await worker.retry_or_dead_letter(r, msg_id, data, "boom") == "dead-lettered"
+    (_dead_id, dead), = r.streams[worker.DEAD_STREAM]
+    assert dead[b"attempts"] == b"3" and dead[b"error"] == b"boom"
+    assert r.acked == [msg_id]
+
+
+@pytest.mark.asyncio
+async def test_replay_dead_resets_attempts_and_removes_entry():
+    r = FakeRedis()
+    msg_id, data = message(1)
+    data[b"attempts"] = b"5"
+    await r.xadd(worker.DEAD_STREAM, {**worker._decode(data), "error": "boom", "original_id": "1-0"})
+
+    assert await worker.replay_dead(r) == 1
+    assert r.streams[worker.DEAD_STREAM] == []
+    (_id, replayed), = r.streams[worker.STREAM]
+    assert replayed[b"attempts"] == b"0"
+    assert b"error" not in replayed
+
+
+def test_retry_delay_grows_exponentially_and_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_BASE_DELAY_S", 10.0)
+    monkeypatch.setattr(settings, "RETRY_MAX_DELAY_S", 60.0)
+    assert 5 <= worker.retry_delay(1) <= 10
+    assert 20 <= worker.retry_delay(3) <= 40
+    assert 30 <= worker.retry_delay(10) <= 60
+
+
+def test_consumer_name_is_unique_per_process(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_CONSUMER_NAME", "")
+    assert worker.consumer_name().endswith(f"-{os.getpid()}")
+
+    monkeypatch.setattr(settings, "WORKER_CONSUMER_NAME", "replica-a")
+    assert worker.consumer_name() == "replica-a"
+
+
+@pytest.mark.asyncio
+async def test_load_alert_targets_matches_scalar_and_skips_missing():
+    async with TestSessionLocal() as db:
+        db.add(User(id=1, username="one", hashed_password="x", telegram_chat_id="chat-1"))
+        await db.commit()
+    items   = await seed(3)
+    targets = await worker.load_alert_targets([i.id for i in items] + [9999])
+    assert set(targets) == {i.id for i in items}
+    for item in items:
+        expected = compute_time_to_forget(item.k0_initial_strength, item.decay_rate,
+                                          item.memory_floor, threshold=10.0)
+        assert targets[item.id].t_forget == pytest.approx(expected)
+        assert targets[item.id].chat_id == "chat-1"
+
+
+@pytest.mark.asyncio
+async def test_submit_batch_does_one_lookup_per_batch(monkeypatch):
+    items    = await seed(4)
+    lookups  = []
+    received = {}
+    real_lookup = worker.load_alert_targets
+
+    async def counting_lookup(ids):
+        ids = list(ids)
+        lookups.append(ids)
+        return await real_lookup(ids)
+
+    async def fake_notify(data, t_forget, chat_id=None, reserved=False):
+        received[int(data[b"item_id"])] = t_forget
+
+    monkeypatch.setattr(worker, "load_alert_targets", counting_lookup)
+    monkeypatch.setattr(worker, "notify_user", fake_notify)
+    dispatcher = worker.Dispatcher(FakeRedis(), concurrency=8)
+    await dispatcher.submit_batch([message(i.id) for i in items] + [message(9999)])
+    await dispatcher.drain()
+
+    assert len(lookups) == 1
+    assert received[9999] is None
+    assert all(received[i.id] > 0 for i in items)
+
+
+@pytest.mark.asyncio
+async def test_digest_mode_sends_one_message_per_user(monkeypatch):
+    digests = {}
+
+    async def fake_digest(user_id, alerts, chat_id=None):
+        digests[user_id] = alerts
+
+    async def per_item(data, t_forget, chat_id=None, reserved=False):
+        raise AssertionError("per-item notification sent in digest mode")
+
+    monkeypatch.setattr(worker, "notify_digest", fake_digest)
+    monkeypatch.setattr(worker, "notify_user", per_item)
+    r = FakeRedis()
+    dispatcher = worker.Dispatcher(r, concurrency=4, digest=True)
+    for i in range(5):
+        await dispatcher.submit(*message(i, user_id=1 + i % 2, retention=50 - i), 3.0)
+    await asyncio.gather(*dispatcher.tasks)
+
+    assert r.acked == []                      # nothing acked until the digest goes out
+    await dispatcher.digest.flush()
+
+    assert sorted(digests) == ["1", "2"]
+    assert sorted(a.item_id for a in digests["1"]) == [0, 2, 4]
+    assert len(r.acked) == 5
+    assert not dispatcher.in_flight
+
+
+def test_format_digest_lists_worst_n():
+    alerts = [
+        worker.DigestAlert(msg_id=b"x", item_id=i, topic=f"Topic {i}", retention=50.0 - i, t_forget=2.0 + i)
+        for i in range(5)
+    ]
+    text = worker.format_digest(alerts, top_n=2)
+    assert "5 topics fading" in text
+    assert text.index("Topic 4") < text.index("Topic 3")
+    assert "Topic 0" not in text
+    assert "and 3 more" in text
+
+
+@pytest.mark.asyncio
+async def test_notify_user_sends_through_notifier(monkeypatch):
+    transport = MemoryTransport()
+    monkeypatch.setattr(worker, "notifier", Notifier(transport, global_rate=100, per_chat_rate=100))
+    await worker.notify_user(message(7)[1], 4.25, "chat-1")
+    await worker.notify_user(message(8)[1], None, "chat-1")    # deleted item → nothing sent
+
+    assert len(transport.sent) == 1 and transport.sent[0][0] == "chat-1"
+    assert "Topic 7" in transport.sent[0][1] and "4.2" in transport.sent[0][1]
+
+
+@pytest.mark.asyncio
+async def test_alerts_go_to_each_users_chat(monkeypatch):
+    async with TestSessionLocal() as db:
+        db.add_all([
+            User(id=1, username="one", hashed_password="x", telegram_chat_id="chat-1"),
+            User(id=2, username="two", hashed_password="x"),
+        ])
+        await db.commit()
+    items     = await seed(2)
+    async with TestSessionLocal() as db:
+        await db.execute(update(KnowledgeItem).where(KnowledgeItem.id == items[1].id).values(user_id=2))
+        await db.commit()
+    transport = MemoryTransport()
+    monkeypatch.setattr(worker, "notifier", Notifier(transport, global_rate=100, per_chat_rate=100))
+    monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "fallback")
+
+    dispatcher = worker.Dispatcher(FakeRedis(), concurrency=4)
+    await dispatcher.submit_batch([message(items[0].id, user_id=1), message(items[1].id, user_id=2)])
+    await dispatcher.drain()
+
+    assert sorted(chat for chat, _text in transport.sent) == ["chat-1", "fallback"]
+
+
+async def run_briefly(coro, seconds: float = 0.1) -> None:
+    """Run one of the worker's forever-loops for a moment, then cancel it."""
+    task = asyncio.create_task(coro)
+    await asyncio.sleep(seconds)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_reclaim_redispatches_and_acks_idle_entries(monkeypatch):
+    items = await seed(3)
+    sent  = []
+
+    async def fake_notify(data, t_forget, chat_id=None, reserved=False):
+        sent.append(int(data[b"item_id"]))
+
+    monkeypatch.setattr(worker, "notify_user", fake_notify)
+    monkeypatch.setattr(worker, "claim_idle_ms", lambda digest: 1000)
+    monkeypatch.setattr(settings, "WORKER_CLAIM_INTERVAL_S", 0.01)
+    monkeypatch.setattr(settings, "WORKER_READ_COUNT", 1)      # page through XAUTOCLAIM
+    r = FakeRedis()
+    stale, fresh = time.time() - 60, time.time()
+    r.pending = {
+        message(items[0].id)[0]: [message(items[0].id)[1], stale, "crashed"],
+        message(items[1].id)[0]: [message(items[1].id)[1], stale, "crashed"],
+        message(items[2].id)[0]: [message(items[2].id)[1], fresh, "alive"],     # still being handled
+        b"999-0":                [None, stale, "crashed"],                       # trimmed from the stream
+    }
+    dispatcher = worker.Dispatcher(r, concurrency=2)
+    await run_briefly(worker.reclaim_pending(r, dispatcher, "me"))
+    await dispatcher.drain()
+
+    assert sorted(sent) == [items[0].id, items[1].id]
+    assert sorted(r.acked) == sorted([message(items[0].id)[0], message(items[1].id)[0]])
+    assert r.pending[message(items[2].id)[0]][2] == "alive"
+
+
+@pytest.mark.asyncio
+async def test_mover_requeues_due_retries_and_keeps_future_ones(monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_POLL_INTERVAL_S", 0.01)
+    monkeypatch.setattr(settings, "WORKER_READ_COUNT", 2)      # several moves per pass
+    r = FakeRedis()
+    due = {json.dumps({**worker._decode(message(i)[1]), "attempts": "1"}, sort_keys=True): time.time() - i
+           for i in range(5)}
+    later = json.dumps({**worker._decode(message(9)[1]), "attempts": "2"}, sort_keys=True)
+    r.zsets[worker.RETRY_KEY] = {**due, later: time.time() + 3600}
+
+    await run_briefly(worker.requeue_due_retries(r))
+
+    assert list(r.zsets[worker.RETRY_KEY]) == [later]
+    moved = [data for _id, data in r.streams[worker.STREAM]]
+    assert sorted(int(d[b"item_id"]) for d in moved) == [0, 1, 2, 3, 4]
+    assert all(d[b"attempts"] == b"1" for d in moved)
+
+
+@pytest.mark.asyncio
+async def test_failing_alert_is_dead_lettered_after_the_attempt_cap(monkeypatch):
+    await seed(1)
+    monkeypatch.setattr(worker, "notify_user", failing_notify)
+    monkeypatch.setattr(settings, "WORKER_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "RETRY_POLL_INTERVAL_S", 0.01)
+    r = FakeRedis()
+    await r.xadd(worker.STREAM, worker._decode(message(1)[1]))
+    dispatcher = worker.Dispatcher(r, concurrency=2)
+
+    handled = 0
+    for _attempt in range(3):
+        entries = r.streams[worker.STREAM][handled:]
+        handled = len(r.streams[worker.STREAM])
+        await dispatcher.submit_batch(entries)
+        await dispatcher.drain()
+        r.zsets[worker.RETRY_KEY] = dict.fromkeys(r.zsets.get(worker.RETRY_KEY, {}), 0.0)   # backoff elapsed
+        await run_briefly(worker.requeue_due_retries(r))
+
+    assert len(r.streams[worker.STREAM]) == 3         # the original plus two retries
+    assert not r.zsets[worker.RETRY_KEY]
+    (_dead_id, dead), = r.streams[worker.DEAD_STREAM]
+    assert dead[b"attempts"] == b"3" and b"downstream unavailable" in dead[b"error"]
+    assert dead[b"original_id"] == r.streams[worker.STREAM][-1][0]